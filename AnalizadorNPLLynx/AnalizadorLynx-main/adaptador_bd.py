@@ -11,6 +11,14 @@ class AdaptadorBaseDatos:
         self.bd_escalable = bd_escalable
         self._cache_productos = {}
         self._cache_construido = False
+        self.version = 0
+        self._suscriptores = []
+        
+        # Con el catálogo compartido (AlmacenCatalogo) las listas se
+        # regeneran con cada instantánea publicada, no con otra consulta
+        suscribir = getattr(bd_escalable, 'suscribir', None)
+        if callable(suscribir):
+            suscribir(self._al_publicar_catalogo)
         
     def __getitem__(self, key):
         """Permite acceso como diccionario: adaptador['productos_completos']"""
@@ -29,8 +37,32 @@ class AdaptadorBaseDatos:
         except KeyError:
             return default
     
+    def suscribir(self, callback):
+        """Registra una función a invocar cada vez que se refrescan las listas"""
+        self._suscriptores.append(callback)
+    
+    def refrescar(self):
+        """
+        Vuelve a leer los productos y reemplaza el cache de una sola vez;
+        después notifica a los suscriptores (p. ej. AFDMultipalabra) para que
+        reconstruyan sus índices
+        """
+        self._construir_cache()
+        self.version += 1
+        for callback in list(self._suscriptores):
+            callback()
+    
+    def _al_publicar_catalogo(self, _instantanea):
+        if self._cache_construido:
+            self.refrescar()
+    
     def _construir_cache(self):
         """Construye cache de productos para compatibilidad con AFDs"""
+        self._cache_productos = self._generar_cache()
+        self._cache_construido = True
+    
+    def _generar_cache(self):
+        """Genera el diccionario de listas sin tocar el cache publicado"""
         try:
             # Obtener productos de la base de datos escalable
             productos_raw = self.bd_escalable.obtener_todos_productos()
@@ -43,7 +75,7 @@ class AdaptadorBaseDatos:
             # Clasificar productos
             for producto in productos_raw:
                 nombre = producto.get('nombre', '')
-                categoria = producto.get('categoria', 'General')
+                categoria = producto.get('categoria') or producto.get('categoria_nombre') or 'General'
                 
                 categorias.add(categoria)
                 
@@ -57,7 +89,7 @@ class AdaptadorBaseDatos:
                     productos_completos.append(nombre.lower())
             
             # Construir estructura compatible
-            self._cache_productos = {
+            return {
                 'productos_simples': list(set(productos_simples)),
                 'productos_multi': list(set(productos_multi)),
                 'productos_completos': list(set(productos_completos)),
@@ -69,11 +101,9 @@ class AdaptadorBaseDatos:
                 'modificadores': ['sin', 'con', 'extra', 'menos', 'mas', 'muy', 'poco']
             }
             
-            self._cache_construido = True
-            
         except Exception as e:
             # Fallback a datos básicos
-            self._cache_productos = {
+            return {
                 'productos_simples': ['coca', 'sabritas', 'agua', 'leche'],
                 'productos_multi': ['coca cola', 'agua mineral', 'leche deslactosada'],
                 'productos_completos': ['coca', 'sabritas', 'coca cola', 'agua mineral'],
@@ -84,7 +114,6 @@ class AdaptadorBaseDatos:
                 'operadores': ['>', '<', '=', 'mayor', 'menor'],
                 'modificadores': ['sin', 'con', 'extra']
             }
-            self._cache_construido = True
     
     def keys(self):
         """Devuelve las claves disponibles"""
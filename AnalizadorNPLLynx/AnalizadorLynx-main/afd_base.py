@@ -1,8 +1,8 @@
 # afd_base.py
 from abc import ABC, abstractmethod
-from graphviz import Digraph
 import os
 from datetime import datetime
+from token_lcln import Token
 
 class AFDBase(ABC):
     """Clase base abstracta para todos los AFDs del sistema"""
@@ -15,8 +15,8 @@ class AFDBase(ABC):
         self.estado_inicial = None
         self.estados_finales = set()
         self.tokens_reconocidos = []
+        # El directorio se crea al generar el primer diagrama, no al servir
         self.directorio_salida = "diagramas_afd"
-        self._crear_directorio()
     
     def _crear_directorio(self):
         """Crea el directorio de salida si no existe"""
@@ -54,10 +54,8 @@ class AFDBase(ABC):
     def procesar_cadena(self, cadena, posicion_inicial=0):
         """Procesa una cadena y retorna el token reconocido si existe"""
         estado_actual = self.estado_inicial
-        lexema = ""
         i = posicion_inicial
-        ultima_aceptacion = None
-        ultima_posicion = posicion_inicial
+        ultima_posicion = None
         
         while i < len(cadena):
             simbolo = cadena[i]
@@ -65,26 +63,19 @@ class AFDBase(ABC):
             # Verificar si hay transición
             if estado_actual in self.transiciones and simbolo in self.transiciones[estado_actual]:
                 estado_actual = self.transiciones[estado_actual][simbolo]
-                lexema += simbolo
+                i += 1
                 
                 # Si es estado final, guardar esta posición
                 if estado_actual in self.estados_finales:
-                    ultima_aceptacion = lexema
-                    ultima_posicion = i + 1
-                
-                i += 1
+                    ultima_posicion = i
             else:
                 break
         
-        # Retornar el último token válido encontrado
-        if ultima_aceptacion:
-            return {
-                'tipo': self.get_tipo_token(ultima_aceptacion),
-                'valor': ultima_aceptacion,
-                'posicion_inicial': posicion_inicial,
-                'posicion_final': ultima_posicion,
-                'longitud': len(ultima_aceptacion)
-            }
+        # Retornar el último token válido encontrado (solo el intervalo;
+        # el lexema se recorta una vez para clasificarlo)
+        if ultima_posicion is not None:
+            tipo = self.get_tipo_token(cadena[posicion_inicial:ultima_posicion])
+            return Token(tipo, cadena, posicion_inicial, ultima_posicion)
         
         return None
     
@@ -97,6 +88,9 @@ class AFDBase(ABC):
             estilo_moderno: Si es True, utiliza un estilo más moderno para el diagrama
             formato: Formato de salida ('png', 'svg', 'pdf')
         """
+        # graphviz solo hace falta para generar diagramas
+        from graphviz import Digraph
+
         dot = Digraph(comment=f'AFD {self.nombre}')
         
         # Configuraciones según estilo
@@ -207,6 +201,7 @@ class AFDBase(ABC):
         filename += f"_{timestamp}"
         
         # Renderizar en el formato especificado
+        self._crear_directorio()
         dot.render(filename, format=formato, cleanup=True)
         ruta_completa = f"{filename}.{formato}"
         print(f"Diagrama guardado: {ruta_completa}")
@@ -0,0 +1,199 @@
+# afd_combinado.py
+"""
+Compilador que fusiona los AFDs del analizador en un único autómata
+dirigido por tablas.
+
+Cada estado del autómata combinado es la tupla de estados de los AFDs
+componentes. Las transiciones se guardan en un arreglo denso indexado por
+``estado * num_clases + clase`` y cada estado final lleva como etiqueta el
+índice del AFD de mayor prioridad que acepta en él, de modo que una sola
+pasada de izquierda a derecha reproduce el orden de prioridad de
+``afds_prioritarios`` sin reintentar cada AFD en cada posición.
+
+Dentro de un mismo AFD gana el lexema más largo, salvo que el AFD ordene
+sus estados finales: ``rango_final(estado)`` (0 o 1, menor gana) y
+``prefiere_frontera`` (las coincidencias que cortan una palabra van
+después de todas las demás). AFDMultipalabra usa ambos para que
+PRODUCTO_COMPLETO gane sobre PRODUCTO_MULTI como en la cascada original.
+"""
+from array import array
+
+from token_lcln import Token
+
+SIN_TRANSICION = -1
+SIN_ETIQUETA = -1
+
+# Rangos por AFD: los dos de ``rango_final`` y el de las coincidencias que
+# no terminan en frontera de palabra
+RANGOS_POR_AFD = 3
+RANGO_SIN_FRONTERA = 2
+
+
+class _TablaClases(dict):
+    """Tabla para ``str.translate``: los caracteres fuera del alfabeto van a la clase 0"""
+
+    def __missing__(self, codigo):
+        return 0
+
+
+class AFDCombinado:
+    """Autómata único equivalente a la cascada de AFDs en orden de prioridad"""
+
+    def __init__(self, afds_prioritarios):
+        self.afds = list(afds_prioritarios)
+        self.num_estados = 0
+        self.num_clases = 1
+        self.transiciones = array('i')
+        self.etiquetas = array('i')
+        self.rangos = array('i')
+        self.fronteras = [getattr(afd, 'prefiere_frontera', False) for afd in self.afds]
+        self.tabla_clases = _TablaClases()
+        self.compilar()
+
+    def compilar(self):
+        """Construye el autómata producto y comprime el alfabeto en clases"""
+        alfabeto = sorted(set().union(*(afd.alfabeto for afd in self.afds)))
+        indice_simbolo = {simbolo: i for i, simbolo in enumerate(alfabeto)}
+
+        inicial = tuple(afd.estado_inicial for afd in self.afds)
+        ids = {inicial: 0}
+        pendientes = [inicial]
+        filas = []
+        etiquetas = []
+        rangos = []
+
+        # Exploración en anchura de las tuplas de estados alcanzables
+        while len(filas) < len(pendientes):
+            tupla = pendientes[len(filas)]
+            etiqueta, rango = self._etiqueta(tupla)
+            etiquetas.append(etiqueta)
+            rangos.append(rango)
+            fila = [SIN_TRANSICION] * len(alfabeto)
+
+            salidas = [afd.transiciones.get(estado, {}) for afd, estado in zip(self.afds, tupla)]
+            for simbolo in set().union(*salidas):
+                siguiente = tuple(salida.get(simbolo) for salida in salidas)
+                if siguiente not in ids:
+                    ids[siguiente] = len(ids)
+                    pendientes.append(siguiente)
+                fila[indice_simbolo[simbolo]] = ids[siguiente]
+
+            filas.append(fila)
+
+        # Agrupar símbolos con columnas idénticas en una misma clase; la
+        # clase 0 queda reservada para los símbolos sin transición alguna
+        clases = {}
+        tabla_clases = _TablaClases()
+        for simbolo, columna in indice_simbolo.items():
+            firma = tuple(fila[columna] for fila in filas)
+            if all(destino == SIN_TRANSICION for destino in firma):
+                continue
+            if firma not in clases:
+                clases[firma] = len(clases) + 1
+            tabla_clases[ord(simbolo)] = chr(clases[firma])
+
+        num_clases = len(clases) + 1
+        transiciones = array('i', [SIN_TRANSICION]) * (len(filas) * num_clases)
+        for firma, clase in clases.items():
+            for estado, destino in enumerate(firma):
+                transiciones[estado * num_clases + clase] = destino
+
+        # Publicar las tablas ya completas
+        self.num_estados = len(filas)
+        self.num_clases = num_clases
+        self.transiciones = transiciones
+        self.etiquetas = array('i', etiquetas)
+        self.rangos = array('i', rangos)
+        self.tabla_clases = tabla_clases
+
+    def _etiqueta(self, tupla):
+        """
+        Índice del AFD de mayor prioridad que acepta en la tupla de estados
+        y rango de la aceptación (menor gana)
+        """
+        for i, (afd, estado) in enumerate(zip(self.afds, tupla)):
+            if estado is not None and estado in afd.estados_finales:
+                rango_final = getattr(afd, 'rango_final', None)
+                return i, i * RANGOS_POR_AFD + (rango_final(estado) if rango_final else 0)
+        return SIN_ETIQUETA, RANGOS_POR_AFD * len(self.afds)
+
+    def clasificar(self, texto):
+        """Convierte el texto en la secuencia de clases de carácter"""
+        return [ord(c) for c in texto.translate(self.tabla_clases)]
+
+    def procesar_cadena(self, texto, posicion_inicial=0, clases=None):
+        """
+        Reconoce el token que empieza en ``posicion_inicial``.
+
+        Gana el AFD de mayor prioridad que haya aceptado algún prefijo y,
+        dentro de él, la aceptación de menor rango (ver ``rango_final`` y
+        ``prefiere_frontera``) y, a igual rango, el lexema más largo: el
+        mismo token que daba recorrer ``afds_prioritarios`` uno por uno.
+        """
+        if clases is None:
+            clases = self.clasificar(texto)
+
+        transiciones = self.transiciones
+        etiquetas = self.etiquetas
+        rangos = self.rangos
+        fronteras = self.fronteras
+        num_clases = self.num_clases
+        afds = self.afds
+
+        estado = 0
+        mejor_afd = len(afds)
+        mejor_rango = RANGOS_POR_AFD * len(afds)
+        posicion_final = -1
+        i = posicion_inicial
+        n = len(clases)
+
+        while i < n:
+            estado = transiciones[estado * num_clases + clases[i]]
+            if estado == SIN_TRANSICION:
+                break
+            i += 1
+
+            etiqueta = etiquetas[estado]
+            if etiqueta == SIN_ETIQUETA or etiqueta > mejor_afd:
+                continue
+
+            # Los AFDs que prefieren coincidencias en frontera de palabra
+            # (AFDMultipalabra) dejan al final las que no terminan en
+            # espacio o fin de texto
+            rango = rangos[estado]
+            if fronteras[etiqueta] and i < n and texto[i] != ' ':
+                rango = etiqueta * RANGOS_POR_AFD + RANGO_SIN_FRONTERA
+
+            if rango <= mejor_rango:
+                mejor_afd = etiqueta
+                mejor_rango = rango
+                posicion_final = i
+
+        if posicion_final < 0:
+            return None
+
+        tipo = afds[mejor_afd].get_tipo_token(texto[posicion_inicial:posicion_final])
+        return Token(tipo, texto, posicion_inicial, posicion_final)
+
+    def tokenizar(self, texto):
+        """Recorre el texto completo en una sola pasada y retorna los tokens"""
+        clases = self.clasificar(texto)
+        tokens = []
+        posicion = 0
+        n = len(texto)
+
+        while posicion < n:
+            # Saltar espacios en blanco
+            if texto[posicion].isspace():
+                posicion += 1
+                continue
+
+            token = self.procesar_cadena(texto, posicion, clases)
+            if token:
+                tokens.append(token)
+                posicion = token.fin
+            else:
+                # Si no se encontró token, avanzar un carácter
+                posicion += 1
+
+        return tokens
@@ -1,133 +1,183 @@
 # afd_multipalabra.py
+from typing import Dict, FrozenSet, List, NamedTuple
+
 from afd_base import AFDBase
+from afd_combinado import RANGO_SIN_FRONTERA, RANGOS_POR_AFD
+from indice_frases import SIN_FRASE, IndiceFrases
+from token_lcln import Token
+
+
+class TrieMultipalabra(NamedTuple):
+    """
+    Estado inmutable del autómata: se construye completo y se publica con
+    una sola asignación, así un lector nunca mezcla el trie de una versión
+    con las frases o los rangos de otra.
+    """
+    indice: IndiceFrases
+    completos: FrozenSet[str]
+    productos_por_estado: Dict[str, str]
+    productos_completos: List[str]
+    productos_multi: List[str]
+    productos_multi_all: List[str]
+
 
 class AFDMultipalabra(AFDBase):
     """AFD para reconocer productos de múltiples palabras"""
-    
+
+    # Las coincidencias que terminan en frontera de palabra tienen prioridad
+    # sobre las que cortan una palabra (ver AFDCombinado)
+    prefiere_frontera = True
+
     def __init__(self, base_datos):
         super().__init__("Multipalabra")
         self.base_datos = base_datos
-        # Ordenar productos por longitud (primero los más largos, para dar prioridad a productos completos)
-        self.productos_completos = sorted(base_datos['productos_completos'], key=len, reverse=True)
-        self.productos_multi = sorted(base_datos['productos_multi'], key=len, reverse=True)
-        # Combinar productos completos primero para darles prioridad
-        self.productos_multi_all = self.productos_completos + self.productos_multi
+        self._firma = None
+        self._trie = None
+        self.generacion = 0
         self.construir_automata()
-    
+
+        # Reconstruir el trie cuando el adaptador refresque sus listas
+        if hasattr(base_datos, 'suscribir'):
+            base_datos.suscribir(self.construir_automata)
+
     def construir_automata(self):
-        """Construye el autómata tipo Trie para productos multi-palabra"""
-        self.establecer_estado_inicial('q0')
-        estado_contador = 1
-        
-        # Construir un Trie para cada producto multi-palabra
-        # Ya están ordenados para dar prioridad a productos completos y luego a los más largos
-        for producto in self.productos_multi_all:
-            estado_actual = 'q0'
-            palabras = producto.split()
-            
-            for i, palabra in enumerate(palabras):
-                # Para cada carácter de la palabra
-                for j, char in enumerate(palabra):
-                    estado_siguiente = f'q{estado_contador}'
-                    
-                    # Verificar si ya existe la transición
-                    if (estado_actual in self.transiciones and 
-                        char in self.transiciones[estado_actual]):
-                        estado_siguiente = self.transiciones[estado_actual][char]
-                    else:
-                        self.agregar_estado(estado_siguiente)
-                        self.agregar_transicion(estado_actual, char, estado_siguiente)
-                        estado_contador += 1
-                    
-                    estado_actual = estado_siguiente
-                
-                # Agregar espacio entre palabras (excepto la última)
-                if i < len(palabras) - 1:
-                    estado_espacio = f'q{estado_contador}'
-                    self.agregar_estado(estado_espacio)
-                    self.agregar_transicion(estado_actual, ' ', estado_espacio)
-                    estado_actual = estado_espacio
-                    estado_contador += 1
-            
-            # Marcar el último estado como final
-            self.agregar_estado(estado_actual, es_final=True)
-            
-            # Guardar qué producto corresponde a este estado final
-            if not hasattr(self, 'productos_por_estado'):
-                self.productos_por_estado = {}
-            self.productos_por_estado[estado_actual] = producto
-    
+        """
+        Construye el autómata tipo Trie para productos multi-palabra. Todo se
+        arma en variables locales y se publica al final, de modo que una
+        reconstrucción no deja visible un autómata a medio llenar. Si el
+        conjunto de frases no cambió no se reconstruye nada y ``generacion``
+        se conserva, así el escáner combinado tampoco se recompila.
+        """
+        firma = (frozenset(self.base_datos['productos_completos']),
+                 frozenset(self.base_datos['productos_multi']))
+        if firma == self._firma:
+            return False
+
+        # Ordenar productos por longitud (primero los más largos, para dar prioridad a productos completos)
+        productos_completos = sorted(firma[0], key=len, reverse=True)
+        productos_multi = sorted(firma[1], key=len, reverse=True)
+        # Combinar productos completos primero para darles prioridad
+        productos_multi_all = productos_completos + productos_multi
+
+        indice = IndiceFrases(productos_multi_all)
+        completos = frozenset(p.lower() for p in productos_completos)
+
+        # Tablas del AFD derivadas del trie del índice (estado 'q<nodo>')
+        estados = set()
+        transiciones = {}
+        alfabeto = set()
+        for nodo, hijos in enumerate(indice.hijos):
+            estados.add(f'q{nodo}')
+            if hijos:
+                transiciones[f'q{nodo}'] = {caracter: f'q{hijo}' for caracter, hijo in hijos.items()}
+                alfabeto.update(hijos)
+
+        # Guardar qué producto corresponde a cada estado final
+        productos_por_estado = {
+            f'q{nodo}': indice.frases[id_frase]
+            for nodo, id_frase in enumerate(indice.salida) if id_frase >= 0
+        }
+
+        trie = TrieMultipalabra(indice, completos, productos_por_estado,
+                                productos_completos, productos_multi, productos_multi_all)
+
+        # Las tablas del AFD se publican antes que el trie y ``generacion``
+        # al final: el escáner combinado solo recompila al ver la nueva
+        # generación y para entonces ``rango_final`` ya lee el trie nuevo
+        self.estado_inicial = 'q0'
+        self.estados = estados
+        self.transiciones = transiciones
+        self.alfabeto = alfabeto
+        self.estados_finales = set(productos_por_estado)
+        self._trie = trie
+        self._firma = firma
+        self.generacion += 1
+        return True
+
+    @property
+    def indice(self):
+        return self._trie.indice
+
+    @property
+    def productos_por_estado(self):
+        return self._trie.productos_por_estado
+
+    @property
+    def productos_completos(self):
+        return self._trie.productos_completos
+
+    @property
+    def productos_multi(self):
+        return self._trie.productos_multi
+
+    @property
+    def productos_multi_all(self):
+        return self._trie.productos_multi_all
+
     def get_tipo_token(self, lexema):
         """Retorna el tipo de token para productos multi-palabra"""
-        lexema_lower = lexema.lower()
-        
-        # Debug - verificar el tipo de token
-        print(f"DEBUG - get_tipo_token: verificando '{lexema_lower}'")
-        
-        # Primero verificar si es un producto completo
-        if lexema_lower in [p.lower() for p in self.base_datos['productos_completos']]:
-            print(f"DEBUG - Es PRODUCTO_COMPLETO")
-            return 'PRODUCTO_COMPLETO'
-        # Luego verificar si es un producto multi
-        elif lexema_lower in [p.lower() for p in self.base_datos['productos_multi']]:
-            print(f"DEBUG - Es PRODUCTO_MULTI")
-            return 'PRODUCTO_MULTI'
-        else:
-            # Verificación adicional por si hay problemas de formato/espacios
-            for producto in self.base_datos['productos_completos']:
-                if producto.lower() == lexema_lower:
-                    print(f"DEBUG - Es PRODUCTO_COMPLETO (verificación adicional)")
-                    return 'PRODUCTO_COMPLETO'
-            
-            print(f"DEBUG - No encontrado en listas, asignando PRODUCTO_MULTI")
-            return 'PRODUCTO_MULTI'
-    
+        return self._tipo_producto(self._trie, lexema)
+
+    def rango_final(self, estado):
+        """
+        Rango de un estado final en el escáner combinado: los productos
+        completos (0) ganan sobre los multi (1) aunque sean más cortos
+        """
+        trie = self._trie
+        return self._rango_producto(trie, trie.productos_por_estado[estado])
+
+    @staticmethod
+    def _rango_producto(trie, producto):
+        """0 para productos completos, 1 para los multi"""
+        return 0 if producto.lower() in trie.completos else 1
+
+    @staticmethod
+    def _tipo_producto(trie, producto):
+        """Tipo de token de una frase según el trie que la reconoció"""
+        # Primero verificar si es un producto completo; el resto son multi
+        return 'PRODUCTO_COMPLETO' if producto.lower() in trie.completos else 'PRODUCTO_MULTI'
+
     def procesar_cadena(self, cadena, posicion_inicial=0):
         """
-        Procesa una cadena y retorna el token reconocido si existe
-        Esta versión mejorada prioriza las coincidencias más largas y productos completos
+        Procesa una cadena y retorna el token reconocido si existe.
+
+        Recorre el trie una sola vez desde ``posicion_inicial`` y ordena las
+        frases aceptadas igual que AFDCombinado: primero las que terminan en
+        frontera de palabra, luego PRODUCTO_COMPLETO sobre PRODUCTO_MULTI y,
+        a igual rango, la más larga.
         """
-        # Debug - revisar qué estamos procesando
-        print(f"\nDEBUG AFD Multipalabra - Procesando desde pos {posicion_inicial}: '{cadena[posicion_inicial:]}'")
-        print(f"Productos completos disponibles: {self.productos_completos}")
-        
-        # Construir un diccionario para guardar todas las posibles coincidencias
-        coincidencias = []
-        
-        # Iterar por cada producto completo primero y luego por productos multi
-        for producto in self.productos_multi_all:
-            # Verificar si el producto está presente en la posición actual
-            # Corregido para que compare en minúsculas
-            cadena_lower = cadena.lower()
-            producto_lower = producto.lower()
-            if (cadena_lower[posicion_inicial:].startswith(producto_lower + ' ') or 
-                cadena_lower[posicion_inicial:].startswith(producto_lower) and 
-                (posicion_inicial + len(producto_lower) == len(cadena_lower))):
-                
-                tipo_token = 'PRODUCTO_COMPLETO' if producto in self.base_datos['productos_completos'] else 'PRODUCTO_MULTI'
-                
-                coincidencias.append({
-                    'tipo': tipo_token,
-                    'valor': producto,
-                    'posicion_inicial': posicion_inicial,
-                    'posicion_final': posicion_inicial + len(producto),
-                    'longitud': len(producto)
-                })
-        
-        # Si encontramos alguna coincidencia, retornar la más larga
-        if coincidencias:
-            # Debug - mostrar todas las coincidencias encontradas
-            print(f"DEBUG - Coincidencias encontradas: {len(coincidencias)}")
-            for c in coincidencias:
-                print(f"  - {c['tipo']}: '{c['valor']}' (longitud: {c['longitud']})")
-            
-            # Ordenar primero por tipo (PRODUCTO_COMPLETO tiene prioridad) y luego por longitud (descendente)
-            coincidencias.sort(key=lambda x: (x['tipo'] == 'PRODUCTO_MULTI', -x['longitud']), reverse=False)
-            
-            # Debug - mostrar coincidencia seleccionada
-            print(f"DEBUG - Seleccionada: {coincidencias[0]['tipo']} - '{coincidencias[0]['valor']}'")
-            
-            return coincidencias[0]
-        
-        # Si no hay coincidencias con este enfoque, intentar con el método estándar
-        return super().procesar_cadena(cadena, posicion_inicial)
\ No newline at end of file
+        # Una sola lectura del estado publicado para toda la pasada
+        trie = self._trie
+        indice = trie.indice
+        hijos = indice.hijos
+        salida = indice.salida
+        cadena_lower = cadena.lower()
+        n = len(cadena_lower)
+
+        nodo = 0
+        mejor = None
+        mejor_rango = RANGOS_POR_AFD
+        for i in range(posicion_inicial, n):
+            nodo = hijos[nodo].get(cadena_lower[i])
+            if nodo is None:
+                break
+            id_frase = salida[nodo]
+            if id_frase == SIN_FRASE:
+                continue
+
+            fin = i + 1
+            producto = indice.frases[id_frase]
+            if fin < n and cadena_lower[fin] != ' ':
+                rango = RANGO_SIN_FRONTERA
+            else:
+                rango = self._rango_producto(trie, producto)
+            if rango <= mejor_rango:
+                mejor = (producto, fin)
+                mejor_rango = rango
+
+        if mejor is None:
+            return None
+
+        # El valor es el nombre del catálogo (objeto compartido, no una copia)
+        producto, posicion_final = mejor
+        return Token(self._tipo_producto(trie, producto), cadena, posicion_inicial, posicion_final, producto)
@@ -0,0 +1,643 @@
+# almacen_catalogo.py
+"""
+Catálogo de productos compartido por todos los sistemas LCLN de un proceso.
+
+Antes cada motor (SistemaLCLNSimplificado, SistemaLCLNMejorado, la función
+``obtener_productos_bd`` del servidor y AdaptadorBaseDatos) abría su propia
+conexión, recargaba por su cuenta y guardaba otra copia de los productos con
+una forma de diccionario distinta. El almacén carga una sola vez y publica
+*instantáneas* inmutables:
+
+- ``por_id``: todos los productos (LEFT JOIN con categorías), en orden de id;
+- ``por_nombre``: los disponibles (existencias y categoría), por nombre en
+  minúsculas y en orden de nombre;
+- ``categorias``, ``sinonimos`` y el ``indice`` de búsqueda sobre
+  ``por_nombre``.
+
+Todas las vistas comparten los mismos registros. Una instantánea nunca se
+modifica después de publicada: el refresco arma la siguiente aparte (en un
+delta, con copias superficiales y ``IndiceBusqueda.copiar()``) y la publica
+cambiando una sola referencia, con el número de versión siguiente. Quien
+lee toma ``actual()`` una vez y trabaja con esa instantánea completa aunque
+se publique otra a la mitad.
+
+Cada instantánea nueva se guarda también en ``archivo_instantanea`` (ver
+instantanea_disco), con el índice ya construido y las marcas del refresco
+incremental. Al arrancar, la primera recarga publica esa copia sin tocar
+MySQL y enseguida pide la recarga real: el servicio responde desde el
+primer momento y, si la base de datos no está disponible, sigue sirviendo el
+último catálogo conocido.
+
+Con varios workers de uvicorn ese archivo es además la publicación común:
+el proceso que obtiene el candado ``<archivo>.lock`` (``fcntl.flock``) es el
+único que consulta MySQL y escribe generaciones nuevas; los demás solo
+revisan el archivo cada ``intervalo_seguidor_segundos`` y lo leen cuando
+cambia. Si el líder termina, el candado se libera y otro worker toma su
+lugar. Los seguidores no decodifican la copia: registros, ``por_nombre`` y
+las estructuras grandes del índice son vistas de solo lectura sobre el mapa
+en memoria del archivo (ver catalogo_mapeado), las mismas páginas para todos
+los workers. Solo las categorías y los sinónimos, que son chicos, se
+decodifican en cada proceso. El líder sí arma objetos de Python, porque los
+refrescos incrementales trabajan sobre copias de la instantánea; un
+seguidor que pasa a líder hace primero una recarga completa.
+"""
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import mysql.connector
+
+try:
+    import fcntl
+except ImportError:
+    # Sin fcntl (Windows) cada proceso refresca su propio catálogo
+    fcntl = None
+
+from catalogo_mapeado import CatalogoMapeado, columnas_catalogo
+from indice_busqueda import IndiceBusqueda
+from instantanea_disco import escribir_instantanea, leer_instantanea
+from pool_conexiones import ConexionPrestada, pool_mysql
+from refresco_catalogo import RefrescadorCatalogo, consultar_cambios
+from tamano_memoria import tamano_muestreado, tamano_profundo
+
+
+def configuracion_mysql() -> Dict:
+    """Configuración MySQL de Railway tomada del entorno"""
+    return {
+        'host': os.getenv('MYSQLHOST', os.getenv('MYSQL_HOST', 'mysql.railway.internal')),
+        'port': int(os.getenv('MYSQLPORT', os.getenv('MYSQL_PORT', 3306))),
+        'database': os.getenv('MYSQLDATABASE', os.getenv('MYSQL_DATABASE', 'railway')),
+        'user': os.getenv('MYSQLUSER', os.getenv('MYSQL_USER', 'root')),
+        'password': os.getenv('MYSQLPASSWORD', os.getenv('MYSQL_PASSWORD', '')),
+        'charset': 'utf8mb4',
+        'ssl_disabled': True,
+        'autocommit': True
+    }
+
+
+def ruta_instantanea(config: Dict) -> Optional[str]:
+    """
+    Archivo de la copia en disco del catálogo: ``LCLN_INSTANTANEA`` si está
+    definida (vacía la desactiva) o uno por base de datos en el directorio
+    temporal del sistema
+    """
+    ruta = os.getenv('LCLN_INSTANTANEA')
+    if ruta is not None:
+        return ruta or None
+    nombre = f"lcln_catalogo_{config.get('host')}_{config.get('port')}_{config.get('database')}.bin"
+    return os.path.join(tempfile.gettempdir(), nombre.replace(os.sep, '_'))
+
+
+_CONSULTA_PRODUCTOS = """
+    SELECT p.id_producto, p.nombre, p.precio, p.cantidad, p.imagen,
+           p.id_categoria, c.nombre AS categoria_nombre
+    FROM productos p
+    LEFT JOIN categorias c ON p.id_categoria = c.id_categoria
+"""
+
+
+def registro_producto(fila: Dict) -> Dict:
+    """Registro único de un producto, el mismo para todos los motores"""
+    return {
+        'id': fila['id_producto'],
+        'nombre': fila['nombre'],
+        'precio': float(fila['precio']),
+        'cantidad': fila['cantidad'],
+        'imagen': fila['imagen'] or 'default.jpg',
+        'id_categoria': fila['id_categoria'],
+        'categoria_nombre': fila['categoria_nombre']
+    }
+
+
+def _disponible(registro: Dict) -> bool:
+    return registro['cantidad'] > 0 and registro['categoria_nombre'] is not None
+
+
+class InstantaneaCatalogo:
+    """Versión publicada del catálogo; de solo lectura"""
+
+    __slots__ = ('version', 'creada', 'por_id', 'por_nombre', 'categorias', 'sinonimos', 'indice')
+
+    def __init__(self, version: int, por_id: Dict[Any, Dict], por_nombre: Dict[str, Dict],
+                 categorias: Dict[str, Dict], sinonimos: Dict[Any, List[str]],
+                 indice: IndiceBusqueda, creada: Optional[datetime] = None):
+        asignar = super().__setattr__
+        asignar('version', version)
+        asignar('creada', creada)
+        asignar('por_id', MappingProxyType(por_id))
+        asignar('por_nombre', MappingProxyType(por_nombre))
+        asignar('categorias', MappingProxyType(categorias))
+        asignar('sinonimos', MappingProxyType(sinonimos))
+        asignar('indice', indice)
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError("InstantaneaCatalogo es de solo lectura")
+
+    @classmethod
+    def vacia(cls) -> 'InstantaneaCatalogo':
+        """Instantánea inicial, antes de la primera carga"""
+        return cls(0, {}, {}, {}, {}, IndiceBusqueda([]))
+
+    def productos(self) -> List[Dict]:
+        """Todos los productos en orden de id"""
+        return list(self.por_id.values())
+
+
+class AlmacenCatalogo:
+    """Carga, refresca y publica las instantáneas del catálogo"""
+
+    def __init__(self, mysql_config: Optional[Dict] = None, intervalo_segundos: float = 60.0,
+                 recarga_completa_segundos: float = 1800.0, reintento_segundos: float = 30.0,
+                 reloj: Callable[[], float] = time.monotonic, archivo_instantanea: Optional[str] = None,
+                 intervalo_seguidor_segundos: float = 5.0):
+        self.mysql_config = mysql_config or configuracion_mysql()
+        self.recarga_completa_segundos = recarga_completa_segundos
+        self.archivo_instantanea = archivo_instantanea
+        self.intervalo_segundos = intervalo_segundos
+        self.intervalo_seguidor_segundos = intervalo_seguidor_segundos
+        self._reloj = reloj
+
+        self._actual = InstantaneaCatalogo.vacia()
+        self._suscriptores: List[Callable[[InstantaneaCatalogo], None]] = []
+        # Estado del refresco; solo lo toca la recarga en curso
+        self._ultimo_intento: Optional[float] = None
+        self._ultima_recarga_completa: Optional[float] = None
+        self._forzar_completa = False
+        self._marca_inventario = 0
+        self._max_id_producto = 0
+        # Momento (reloj de pared) de la última recarga completa, para la copia en disco
+        self._recarga_completa_epoch: Optional[float] = None
+        self._disco_leido = False
+        # Archivo leído o escrito por última vez: (inodo, modificación, tamaño)
+        self._firma_disco: Optional[Tuple[int, int, int]] = None
+        # Descriptor del candado mientras este proceso es el líder
+        self._candado_lider: Optional[int] = None
+        self.rol: Optional[str] = None
+        self.disco: Dict[str, Any] = {'cargada': False, 'mapeada': False, 'bytes': None, 'bytes_mapeados': 0,
+                                      'carga_ms': None, 'escritura_ms': None, 'escrituras': 0,
+                                      'ultimo_error': None}
+        # (instantánea, estadísticas de memoria): se miden una vez por versión
+        self._memoria: Optional[Tuple[InstantaneaCatalogo, Dict[str, Any]]] = None
+
+        self.refrescador = RefrescadorCatalogo('catalogo', self._recargar, intervalo_segundos,
+                                               reintento_segundos, reloj)
+
+    # --- Lectura ------------------------------------------------------------
+
+    @property
+    def instantanea(self) -> InstantaneaCatalogo:
+        """Instantánea publicada, sin cargar ni pedir refresco"""
+        return self._actual
+
+    @property
+    def version(self) -> int:
+        return self._actual.version
+
+    def actual(self) -> InstantaneaCatalogo:
+        """Instantánea vigente, asegurando antes que el catálogo esté cargado"""
+        self.asegurar()
+        return self._actual
+
+    def asegurar(self):
+        """
+        Solo la primera carga hace esperar: si todavía no hay catálogo se
+        espera la recarga (una sola aunque lleguen muchas peticiones, y sin
+        reintentar en cada una si acaba de fallar). Con el catálogo vencido
+        se pide el refresco y se sigue usando la instantánea actual.
+        """
+        refrescador = self.refrescador
+        espera = self._segundos_desde_intento()
+        if self._actual.version == 0:
+            if espera is None or espera >= refrescador.reintento_segundos:
+                refrescador.refrescar(esperar=True)
+        elif espera is None or espera >= refrescador.intervalo_segundos:
+            refrescador.solicitar()
+
+    def obtener_todos_productos(self) -> List[Dict]:
+        """Todos los productos (interfaz de base de datos de AdaptadorBaseDatos)"""
+        return self.actual().productos()
+
+    def suscribir(self, callback: Callable[[InstantaneaCatalogo], None]):
+        """Registra una función a la que se avisa con cada instantánea publicada"""
+        self._suscriptores.append(callback)
+
+    # --- Refresco -------------------------------------------------------------
+
+    def refrescar(self, completa: bool = False) -> bool:
+        """Recarga ahora (esperando a la que esté en curso); retorna si tuvo éxito"""
+        if completa:
+            self._forzar_completa = True
+        return self.refrescador.refrescar(esperar=True)
+
+    def _segundos_desde_intento(self) -> Optional[float]:
+        if self._ultimo_intento is None:
+            return None
+        return self._reloj() - self._ultimo_intento
+
+    def _recargar(self) -> str:
+        """
+        Publica una instantánea nueva (lo llama el refrescador). La primera
+        vez publica la copia en disco si existe. Entre recargas completas
+        solo se leen los productos con movimientos en inventorylog y los
+        nuevos; retorna la modalidad usada.
+        """
+        lider = self._es_lider()
+        if not lider:
+            self._ultimo_intento = self._reloj()
+            modalidad = self._seguir_disco()
+            if modalidad is not None:
+                return modalidad
+            # Sin copia publicada todavía: el seguidor carga de MySQL por su
+            # cuenta una sola vez, sin escribir el archivo
+        elif not self._disco_leido and self._actual.version == 0:
+            self._disco_leido = True
+            if self._cargar_disco():
+                # La copia cuenta como intento (asegurar no recarga en la
+                # petición) y la base de datos se consulta enseguida, en
+                # cuanto esta recarga suelte el candado
+                self._ultimo_intento = self._reloj()
+                self.refrescador.programar()
+                return 'disco'
+
+        self._ultimo_intento = self._reloj()
+        # Un seguidor que pasa a líder tiene una instantánea mapeada, sobre la
+        # que no se aplican deltas
+        completa = (self._forzar_completa or self._actual.indice.mapeado or
+                    self._ultima_recarga_completa is None or
+                    self._reloj() - self._ultima_recarga_completa > self.recarga_completa_segundos)
+        self._forzar_completa = False
+
+        instantanea = None if completa else self._aplicar_cambios()
+        modalidad = 'delta'
+        if instantanea is None:
+            instantanea = self._cargar_completo()
+            modalidad = 'completa'
+        elif instantanea is self._actual:
+            # Sin cambios: se conserva la versión (y los caches que dependen de ella)
+            return modalidad
+
+        self._publicar(instantanea)
+        if lider:
+            self._guardar_disco(instantanea)
+        print(f"[CATALOGO] Versión {instantanea.version} ({modalidad}): {len(instantanea.por_id)} productos, "
+              f"{len(instantanea.por_nombre)} disponibles, {len(instantanea.categorias)} categorias")
+        return modalidad
+
+    def _publicar(self, instantanea: InstantaneaCatalogo):
+        self._actual = instantanea
+        for callback in list(self._suscriptores):
+            try:
+                callback(instantanea)
+            except Exception as e:
+                print(f"[CATALOGO] Error notificando la versión {instantanea.version}: {e}")
+
+    def publicar_registros(self, registros: Iterable[Dict],
+                           sinonimos: Optional[Dict[Any, List[str]]] = None) -> InstantaneaCatalogo:
+        """Publica un catálogo completo a partir de registros ya armados"""
+        instantanea = self._construir(registros, sinonimos or {})
+        self._publicar(instantanea)
+        return instantanea
+
+    def _construir(self, registros: Iterable[Dict], sinonimos: Dict[Any, List[str]]) -> InstantaneaCatalogo:
+        """Instantánea completa; ``registros`` viene en orden de nombre"""
+        por_id = {}
+        por_nombre = {}
+        categorias = {}
+        for registro in registros:
+            por_id[registro['id']] = registro
+            if _disponible(registro):
+                por_nombre[registro['nombre'].lower()] = registro
+                categorias.setdefault(registro['categoria_nombre'].lower(), {
+                    'id': registro['id_categoria'],
+                    'nombre': registro['categoria_nombre']
+                })
+
+        por_id = dict(sorted(por_id.items(), key=lambda item: item[0]))
+        return InstantaneaCatalogo(self._actual.version + 1, por_id, por_nombre, categorias, sinonimos,
+                                   IndiceBusqueda(por_nombre.values()), datetime.now())
+
+    def _conectar(self) -> ConexionPrestada:
+        return pool_mysql(self.mysql_config).obtener()
+
+    def _cargar_completo(self) -> InstantaneaCatalogo:
+        """
+        Recarga completa. La instantánea nueva se arma aparte: mientras
+        carga, y si la carga falla, se sigue publicando la anterior.
+        """
+        with self._conectar() as conexion:
+            cursor = conexion.cursor(dictionary=True)
+
+            # Marcas antes de leer: lo que cambie durante la lectura vuelve
+            # a llegar en el siguiente delta
+            marca_inventario, _ = consultar_cambios(cursor, 0)
+            cursor.execute("SELECT COALESCE(MAX(id_producto), 0) AS max_id FROM productos")
+            max_id_producto = cursor.fetchone()['max_id']
+
+            cursor.execute(_CONSULTA_PRODUCTOS + " ORDER BY p.nombre")
+            filas = cursor.fetchall()
+
+            # Sinónimos (opcional, puede no existir la tabla)
+            sinonimos = dict(self._actual.sinonimos)
+            try:
+                cursor.execute("SELECT producto_id, sinonimo FROM producto_sinonimos")
+                sinonimos = {}
+                for fila in cursor.fetchall():
+                    sinonimos.setdefault(fila['producto_id'], []).append(fila['sinonimo'])
+            except mysql.connector.Error:
+                print("[CATALOGO] Tabla producto_sinonimos no existe, usando solo productos")
+
+            cursor.close()
+
+        instantanea = self._construir(map(registro_producto, filas), sinonimos)
+        self._marca_inventario = marca_inventario
+        self._max_id_producto = max_id_producto
+        self._ultima_recarga_completa = self._reloj()
+        self._recarga_completa_epoch = time.time()
+        return instantanea
+
+    def _aplicar_cambios(self) -> Optional[InstantaneaCatalogo]:
+        """
+        Refresco incremental: vuelve a leer solo los productos con
+        movimientos desde la última marca de inventorylog y los de id nuevo,
+        y arma la instantánea siguiente sobre copias de la actual. Retorna
+        la instantánea actual si no hubo cambios, y None si después el
+        conteo no coincide con la base (p. ej. un borrado o un cambio fuera
+        de la bitácora) y hace falta una recarga completa.
+        """
+        with self._conectar() as conexion:
+            cursor = conexion.cursor(dictionary=True)
+            marca_inventario, tocados = consultar_cambios(cursor, self._marca_inventario)
+            if marca_inventario < self._marca_inventario:
+                # Base restaurada o bitácora reiniciada (p. ej. con marcas
+                # tomadas de la copia en disco): el delta no es confiable
+                cursor.close()
+                print(f"[CATALOGO] inventorylog retrocedió ({self._marca_inventario} -> {marca_inventario}): "
+                      f"recarga completa")
+                return None
+
+            condicion = "p.id_producto > %s"
+            parametros = [self._max_id_producto]
+            if tocados:
+                condicion += f" OR p.id_producto IN ({', '.join(['%s'] * len(tocados))})"
+                parametros.extend(tocados)
+
+            cursor.execute(_CONSULTA_PRODUCTOS + f" WHERE {condicion}", parametros)
+            filas = cursor.fetchall()
+
+            cursor.execute("SELECT COUNT(*) AS total FROM productos")
+            total = cursor.fetchone()['total']
+            cursor.close()
+
+        anterior = self._actual
+        # Un producto tocado que ya no aparece fue borrado
+        borrados = set(tocados) - {fila['id_producto'] for fila in filas}
+        if not filas and not borrados and total == len(anterior.por_id):
+            self._marca_inventario = marca_inventario
+            return anterior
+
+        por_id = dict(anterior.por_id)
+        por_nombre = dict(anterior.por_nombre)
+        categorias = dict(anterior.categorias)
+        indice = anterior.indice.copiar()
+
+        def quitar(registro: Dict):
+            nombre_key = registro['nombre'].lower()
+            if por_nombre.get(nombre_key) is registro:
+                del por_nombre[nombre_key]
+                indice.eliminar(registro['id'])
+
+        for id_producto in borrados:
+            registro = por_id.pop(id_producto, None)
+            if registro is not None:
+                quitar(registro)
+
+        max_id_producto = self._max_id_producto
+        for fila in filas:
+            registro = registro_producto(fila)
+            max_id_producto = max(max_id_producto, registro['id'])
+            previo = por_id.get(registro['id'])
+            if previo is not None:
+                quitar(previo)
+            por_id[registro['id']] = registro
+
+            if _disponible(registro):
+                # Como en la carga completa, un nombre repetido se queda
+                # con el último producto
+                desplazado = por_nombre.get(registro['nombre'].lower())
+                if desplazado is not None:
+                    indice.eliminar(desplazado['id'])
+                por_nombre[registro['nombre'].lower()] = registro
+                indice.agregar(registro)
+                categorias.setdefault(registro['categoria_nombre'].lower(), {
+                    'id': registro['id_categoria'],
+                    'nombre': registro['categoria_nombre']
+                })
+
+        self._marca_inventario = marca_inventario
+        self._max_id_producto = max_id_producto
+
+        if total != len(por_id):
+            print(f"[CATALOGO] Delta inconsistente ({len(por_id)} en cache, {total} en BD): recarga completa")
+            return None
+
+        return InstantaneaCatalogo(anterior.version + 1, por_id, por_nombre, categorias, anterior.sinonimos,
+                                   indice, datetime.now())
+
+    # --- Copia en disco -------------------------------------------------------
+
+    def _es_lider(self) -> bool:
+        """
+        Si este proceso refresca desde MySQL. Sin archivo compartido (o sin
+        fcntl) cada proceso es su propio líder; con archivo, lo es solo quien
+        tiene el candado, y los demás lo intentan en cada revisión.
+        """
+        if self._candado_lider is not None:
+            return True
+        if not self.archivo_instantanea or fcntl is None:
+            self.rol = 'independiente'
+            return True
+        try:
+            descriptor = os.open(self.archivo_instantanea + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            print(f"[CATALOGO] No se pudo abrir el candado de {self.archivo_instantanea}: {e}")
+            return True
+        try:
+            fcntl.flock(descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(descriptor)
+            if self.rol != 'seguidor':
+                self.rol = 'seguidor'
+                self.refrescador.intervalo_segundos = self.intervalo_seguidor_segundos
+                print(f"[CATALOGO] Proceso {os.getpid()} sigue el catálogo de {self.archivo_instantanea}")
+            return False
+
+        self._candado_lider = descriptor
+        self.rol = 'lider'
+        self.refrescador.intervalo_segundos = self.intervalo_segundos
+        print(f"[CATALOGO] Proceso {os.getpid()} refresca el catálogo compartido {self.archivo_instantanea}")
+        return True
+
+    def _firma_archivo(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            estado = os.stat(self.archivo_instantanea)
+        except OSError:
+            return None
+        return estado.st_ino, estado.st_mtime_ns, estado.st_size
+
+    def _seguir_disco(self) -> Optional[str]:
+        """
+        Publica la generación escrita por el líder si cambió. Retorna None
+        si no hay nada publicado aún y tampoco hay archivo utilizable.
+        """
+        firma = self._firma_archivo()
+        if firma is not None and firma != self._firma_disco:
+            self._firma_disco = firma
+            if self._cargar_disco(mapeado=True):
+                return 'disco'
+        return 'sin cambios' if self._actual.version else None
+
+
+    def _guardar_disco(self, instantanea: InstantaneaCatalogo):
+        """Guarda la instantánea publicada; un fallo no afecta al servicio"""
+        if not self.archivo_instantanea:
+            return
+        inicio = time.perf_counter()
+        datos = {
+            'version': instantanea.version,
+            'creada': instantanea.creada.timestamp() if instantanea.creada else time.time(),
+            'categorias': dict(instantanea.categorias),
+            'sinonimos': dict(instantanea.sinonimos),
+            'huella_reglas': IndiceBusqueda.huella_reglas(instantanea.indice.reglas),
+            'marca_inventario': self._marca_inventario,
+            'max_id_producto': self._max_id_producto,
+            'recarga_completa': self._recarga_completa_epoch
+        }
+        try:
+            secciones = columnas_catalogo(instantanea.por_id, instantanea.por_nombre, instantanea.indice)
+            self.disco['bytes'] = escribir_instantanea(self.archivo_instantanea, datos, secciones)
+            self._firma_disco = self._firma_archivo()
+        except (OSError, ValueError, TypeError, KeyError, OverflowError) as e:
+            self.disco['ultimo_error'] = str(e)
+            print(f"[CATALOGO] No se pudo guardar la copia en disco {self.archivo_instantanea}: {e}")
+            return
+        self.disco['escritura_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+        self.disco['escrituras'] += 1
+        self.disco['ultimo_error'] = None
+
+    def _cargar_disco(self, mapeado: bool = False) -> bool:
+        """
+        Publica la copia en disco, si hay una utilizable; no toca MySQL. Con
+        ``mapeado`` la instantánea queda sobre vistas del mapa en memoria en
+        lugar de objetos de Python
+        """
+        if not self.archivo_instantanea:
+            return False
+        inicio = time.perf_counter()
+        leido = leer_instantanea(self.archivo_instantanea)
+        if leido is None:
+            return False
+
+        datos, secciones = leido
+        try:
+            catalogo = CatalogoMapeado(secciones)
+            if mapeado:
+                por_id, por_nombre, partes = catalogo.por_id, catalogo.por_nombre, catalogo.partes_indice()
+            else:
+                por_id, por_nombre, partes = catalogo.materializar()
+            indice = IndiceBusqueda.desde_partes(partes, datos['huella_reglas'], mapeado=mapeado)
+            if indice is None:
+                # Las reglas de atributos cambiaron: máscaras y bitmaps se recalculan
+                indice = IndiceBusqueda(por_nombre.values())
+            instantanea = InstantaneaCatalogo(self._actual.version + 1, por_id, por_nombre, datos['categorias'],
+                                              datos['sinonimos'], indice, datetime.fromtimestamp(datos['creada']))
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"[CATALOGO] Copia en disco {self.archivo_instantanea} inválida: {e}")
+            return False
+
+        self._marca_inventario = datos['marca_inventario']
+        self._max_id_producto = datos['max_id_producto']
+        # Si la última recarga completa es reciente, la siguiente puede ser un delta
+        if datos['recarga_completa'] is not None:
+            edad = time.time() - datos['recarga_completa']
+            if 0 <= edad < self.recarga_completa_segundos:
+                self._ultima_recarga_completa = self._reloj() - edad
+                self._recarga_completa_epoch = datos['recarga_completa']
+
+        self._publicar(instantanea)
+        self.disco['cargada'] = True
+        self.disco['mapeada'] = mapeado
+        self.disco['bytes_mapeados'] = catalogo.nbytes
+        self.disco['carga_ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+        print(f"[CATALOGO] Versión {instantanea.version} desde disco en {self.disco['carga_ms']:.1f}ms: "
+              f"{len(por_id)} productos, {len(por_nombre)} disponibles")
+        return True
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado del catálogo publicado y de su refresco"""
+        instantanea = self._actual
+        return {
+            'version': instantanea.version,
+            'creada': instantanea.creada.isoformat() if instantanea.creada else None,
+            'edad_segundos': round((datetime.now() - instantanea.creada).total_seconds(), 3)
+                             if instantanea.creada else None,
+            'productos': len(instantanea.por_id),
+            'disponibles': len(instantanea.por_nombre),
+            'categorias': len(instantanea.categorias),
+            'refresco': self.refrescador.estadisticas(),
+            'disco': dict(self.disco, archivo=self.archivo_instantanea, rol=self.rol, pid=os.getpid())
+        }
+
+    def estadisticas_memoria(self) -> Dict[str, Any]:
+        """
+        Entradas y bytes aproximados de cada estructura de la instantánea
+        publicada. Las instantáneas no cambian: se mide una vez por versión
+        """
+        instantanea = self._actual
+        memoria = self._memoria
+        if memoria is not None and memoria[0] is instantanea:
+            return memoria[1]
+
+        if instantanea.indice.mapeado:
+            # Columnas del mapa en memoria, compartidas con los demás workers:
+            # se cuentan en ``bytes_mapeados``
+            estructuras = {'registros': (len(instantanea.por_id), 0),
+                           'por_nombre': (len(instantanea.por_nombre), 0)}
+        else:
+            estructuras = {
+                'registros': (len(instantanea.por_id), tamano_muestreado(instantanea.por_id)),
+                # Apunta a los mismos registros: solo claves y referencias
+                'por_nombre': (len(instantanea.por_nombre),
+                               tamano_muestreado(instantanea.por_nombre, profundidad_valores=False))
+            }
+        estructuras['categorias'] = (len(instantanea.categorias), tamano_profundo(instantanea.categorias))
+        estructuras['sinonimos'] = (len(instantanea.sinonimos), tamano_muestreado(instantanea.sinonimos))
+        datos: Dict[str, Any] = {nombre: {'entradas': entradas, 'bytes_aproximados': tamano}
+                                 for nombre, (entradas, tamano) in estructuras.items()}
+        datos['indice'] = instantanea.indice.estadisticas()
+        datos['version'] = instantanea.version
+        datos['bytes_aproximados'] = (sum(tamano for _, tamano in estructuras.values()) +
+                                      datos['indice']['bytes_aproximados'])
+        datos['bytes_mapeados'] = self.disco['bytes_mapeados'] if instantanea.indice.mapeado else 0
+        self._memoria = (instantanea, datos)
+        return datos
+
+
+_almacen_compartido: Optional[AlmacenCatalogo] = None
+_lock_compartido = threading.Lock()
+
+
+def almacen_compartido() -> AlmacenCatalogo:
+    """
+    Almacén único del proceso, con la configuración MySQL del entorno y su
+    copia en disco
+    """
+    global _almacen_compartido
+    with _lock_compartido:
+        if _almacen_compartido is None:
+            config = configuracion_mysql()
+            _almacen_compartido = AlmacenCatalogo(config, archivo_instantanea=ruta_instantanea(config))
+        return _almacen_compartido
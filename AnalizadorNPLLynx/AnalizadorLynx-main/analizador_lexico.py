@@ -4,13 +4,15 @@ from afd_multipalabra import AFDMultipalabra
 from afd_numeros import AFDNumeros
 from afd_operadores import AFDOperadores
 from afd_unidades import AFDUnidades
+from afd_combinado import AFDCombinado
 from interpretador_semantico import InterpretadorSemantico
 from corrector_ortografico import CorrectorOrtografico
 from motor_recomendaciones import MotorRecomendaciones
 from adaptador_bd import AdaptadorBaseDatos  # Nuevo adaptador
-from graphviz import Digraph
+from token_lcln import tokens_a_dicts
 from datetime import datetime
 import json
+import time
 
 class AnalizadorLexicoLYNX:
     """Analizador léxico principal que coordina todos los AFDs"""
@@ -54,35 +56,43 @@ class AnalizadorLexicoLYNX:
             self.afd_palabras
         ]
         
+        # Autómata único compilado a partir de los AFDs prioritarios; se
+        # recompila cuando el adaptador refresca los productos (AFDMultipalabra
+        # se suscribió antes y ya habrá reconstruido su índice)
+        self.escaner = AFDCombinado(self.afds_prioritarios)
+        self._generaciones_escaner = self._generaciones_afds()
+        self.adaptador_bd.suscribir(self.recompilar_escaner)
+        
         self.tokens_procesados = []
     
+    def _generaciones_afds(self):
+        """Generación de cada AFD; los que nunca se reconstruyen cuentan como 0"""
+        return tuple(getattr(afd, 'generacion', 0) for afd in self.afds_prioritarios)
+    
+    def recompilar_escaner(self):
+        """
+        Vuelve a compilar el autómata combinado si algún AFD se reconstruyó
+        desde la última compilación; un refresco que no cambia las frases
+        del catálogo no cuesta nada
+        """
+        generaciones = self._generaciones_afds()
+        if generaciones == self._generaciones_escaner:
+            return False
+        self.escaner = AFDCombinado(self.afds_prioritarios)
+        self._generaciones_escaner = generaciones
+        return True
+    
+    def estadisticas(self):
+        """Aciertos, fallos y desalojos del cache del corrector ortográfico"""
+        return {'corrector_ortografico': self.corrector_ortografico.estadisticas_cache()}
+    
     def analizar(self, texto):
         """Analiza el texto y retorna los tokens encontrados"""
-        self.tokens_procesados = []
         texto = texto.lower()
-        posicion = 0
         
-        while posicion < len(texto):
-            # Saltar espacios en blanco
-            if posicion < len(texto) and texto[posicion].isspace():
-                posicion += 1
-                continue
-            
-            # Intentar con cada AFD en orden de prioridad
-            token_encontrado = False
-            
-            for afd in self.afds_prioritarios:
-                resultado = afd.procesar_cadena(texto, posicion)
-                
-                if resultado:
-                    self.tokens_procesados.append(resultado)
-                    posicion = resultado['posicion_final']
-                    token_encontrado = True
-                    break
-            
-            # Si no se encontró token, avanzar un carácter
-            if not token_encontrado:
-                posicion += 1
+        # Una sola pasada sobre el autómata combinado; respeta el mismo
+        # orden de prioridad que recorrer afds_prioritarios uno por uno
+        self.tokens_procesados = self.escaner.tokenizar(texto)
         
         # Aplicar análisis contextual
         self.aplicar_contexto()
@@ -100,32 +110,32 @@ class AnalizadorLexicoLYNX:
             token_actual = self.tokens_procesados[i]
             
             # Regla 1: CATEGORIA_KEYWORD + PALABRA_GENERICA = CATEGORIA
-            if (token_actual['tipo'] == 'CATEGORIA_KEYWORD' and 
+            if (token_actual.tipo == 'CATEGORIA_KEYWORD' and 
                 i + 1 < len(self.tokens_procesados) and
-                self.tokens_procesados[i + 1]['tipo'] == 'PALABRA_GENERICA'):
-                self.tokens_procesados[i + 1]['tipo'] = 'CATEGORIA'
+                self.tokens_procesados[i + 1].tipo == 'PALABRA_GENERICA'):
+                self.tokens_procesados[i + 1].tipo = 'CATEGORIA'
             
             # Regla 2: MODIFICADOR + PALABRA_GENERICA = ATRIBUTO
-            if (token_actual['tipo'] == 'MODIFICADOR' and 
+            if (token_actual.tipo == 'MODIFICADOR' and 
                 i + 1 < len(self.tokens_procesados) and
-                self.tokens_procesados[i + 1]['tipo'] in ['PALABRA_GENERICA', 'MODIFICADOR']):
-                self.tokens_procesados[i + 1]['tipo'] = 'ATRIBUTO'
+                self.tokens_procesados[i + 1].tipo in ['PALABRA_GENERICA', 'MODIFICADOR']):
+                self.tokens_procesados[i + 1].tipo = 'ATRIBUTO'
             
             # Regla 3: NUMERO + PALABRA_GENERICA (si es unidad) = UNIDAD
-            if (token_actual['tipo'] in ['NUMERO_ENTERO', 'NUMERO_DECIMAL'] and 
+            if (token_actual.tipo in ['NUMERO_ENTERO', 'NUMERO_DECIMAL'] and 
                 i + 1 < len(self.tokens_procesados)):
                 siguiente = self.tokens_procesados[i + 1]
-                if siguiente['valor'] in self.base_datos['unidades']:
-                    if siguiente['valor'] in ['pesos', 'peso']:
-                        siguiente['tipo'] = 'UNIDAD_MONEDA'
+                if siguiente.valor in self.base_datos['unidades']:
+                    if siguiente.valor in ['pesos', 'peso']:
+                        siguiente.tipo = 'UNIDAD_MONEDA'
                     else:
-                        siguiente['tipo'] = 'UNIDAD_MEDIDA'
+                        siguiente.tipo = 'UNIDAD_MEDIDA'
     
     def generar_json_resultado(self, texto_original):
         """Genera el resultado en formato JSON"""
         resultado = {
             'consulta_original': texto_original,
-            'tokens': self.tokens_procesados,
+            'tokens': tokens_a_dicts(self.tokens_procesados),
             'interpretacion': self._interpretar_tokens(),
             'sql_sugerido': self._generar_sql()
         }
@@ -151,47 +161,47 @@ class AnalizadorLexicoLYNX:
             token = self.tokens_procesados[i]
             
             # Productos
-            if token['tipo'] in ['PRODUCTO_COMPLETO', 'PRODUCTO_MULTI', 'PRODUCTO_SIMPLE']:
+            if token.tipo in ['PRODUCTO_COMPLETO', 'PRODUCTO_MULTI', 'PRODUCTO_SIMPLE']:
                 interpretacion['productos'].append({
-                    'nombre': token['valor'],
-                    'tipo': token['tipo']
+                    'nombre': token.valor,
+                    'tipo': token.tipo
                 })
             
             # Categorías
-            elif token['tipo'] == 'CATEGORIA':
-                interpretacion['categorias'].append(token['valor'])
+            elif token.tipo == 'CATEGORIA':
+                interpretacion['categorias'].append(token.valor)
             
             # Operadores de precio
-            elif token['tipo'] in ['OP_MENOR', 'OP_MAYOR', 'OP_ENTRE', 'OP_IGUAL']:
+            elif token.tipo in ['OP_MENOR', 'OP_MAYOR', 'OP_ENTRE', 'OP_IGUAL']:
                 if i + 1 < len(self.tokens_procesados):
                     siguiente = self.tokens_procesados[i + 1]
-                    if siguiente['tipo'] in ['NUMERO_ENTERO', 'NUMERO_DECIMAL']:
-                        valor = float(siguiente['valor'])
+                    if siguiente.tipo in ['NUMERO_ENTERO', 'NUMERO_DECIMAL']:
+                        valor = float(siguiente.valor)
                         
-                        if token['tipo'] == 'OP_MENOR':
+                        if token.tipo == 'OP_MENOR':
                             interpretacion['filtros']['precio']['max'] = valor
-                        elif token['tipo'] == 'OP_MAYOR':
+                        elif token.tipo == 'OP_MAYOR':
                             interpretacion['filtros']['precio']['min'] = valor
-                        elif token['tipo'] == 'OP_IGUAL':
+                        elif token.tipo == 'OP_IGUAL':
                             interpretacion['filtros']['precio']['exacto'] = valor
                         
                         i += 1  # Saltar el número
             
             # Atributos con modificadores
-            elif token['tipo'] == 'MODIFICADOR':
+            elif token.tipo == 'MODIFICADOR':
                 if i + 1 < len(self.tokens_procesados):
                     siguiente = self.tokens_procesados[i + 1]
-                    if siguiente['tipo'] == 'ATRIBUTO':
+                    if siguiente.tipo == 'ATRIBUTO':
                         # Agregar a los filtros de atributos
                         filtro_atributo = {
-                            'modificador': token['valor'],
-                            'atributo': siguiente['valor']
+                            'modificador': token.valor,
+                            'atributo': siguiente.valor
                         }
                         interpretacion['filtros']['atributos'].append(filtro_atributo)
                         i += 1  # Saltar el atributo
             
             # Filtros semánticos de precio
-            elif token['tipo'] == 'FILTRO_PRECIO':
+            elif token.tipo == 'FILTRO_PRECIO':
                 interp = token['interpretacion']
                 if interp['op'] == 'menor_a':
                     interpretacion['filtros']['precio']['max'] = interp['valor']
@@ -202,7 +212,7 @@ class AnalizadorLexicoLYNX:
                     interpretacion['filtros']['precio']['max'] = interp['max']
             
             # Filtros de tamaño
-            elif token['tipo'] == 'FILTRO_TAMANO':
+            elif token.tipo == 'FILTRO_TAMANO':
                 interp = token['interpretacion']
                 interpretacion['filtros']['tamano'] = {
                     'campo': interp['campo'],
@@ -274,6 +284,9 @@ class AnalizadorLexicoLYNX:
             estilo_moderno: Si es True, utiliza un estilo más moderno para el diagrama
             formato: Formato de salida ('png', 'svg', 'pdf')
         """
+        # graphviz solo hace falta para generar diagramas
+        from graphviz import Digraph
+
         dot = Digraph(comment='Sistema AFD LYNX - Vista General')
         
         # Configuraciones según estilo
@@ -437,6 +450,8 @@ class AnalizadorLexicoLYNX:
         """
         Genera respuesta JSON completa con corrección, análisis e interpretación
         """
+        inicio = time.perf_counter()
+
         # Análisis con corrección
         resultado_analisis = self.analizar_con_correccion(consulta_original)
         tokens = resultado_analisis['tokens']
@@ -551,9 +566,9 @@ class AnalizadorLexicoLYNX:
         
         # Detectar atributos individuales
         for token in tokens:
-            if token['tipo'] in ['ATRIBUTO', 'PALABRA_GENERICA']:
+            if token.tipo in ['ATRIBUTO', 'PALABRA_GENERICA']:
                 # Verificar si es un atributo conocido
-                valor_token = token['valor'].lower()
+                valor_token = token.valor.lower()
                 if valor_token in ['dulce', 'picante', 'salado', 'barato', 'caro', 'grande', 'pequeño', 'fuego', 'flaming', 'hot']:
                     # Mapear sinónimos de picante
                     if valor_token in ['fuego', 'flaming', 'hot']:
@@ -647,7 +662,7 @@ class AnalizadorLexicoLYNX:
         # Estructura de respuesta según documento técnico
         respuesta = {
             "success": True,
-            "processing_time_ms": 0,
+            "processing_time_ms": round((time.perf_counter() - inicio) * 1000, 3),
             "original_query": consulta_original,
             "corrections": correcciones,
             "interpretation": interpretacion_para_motor,
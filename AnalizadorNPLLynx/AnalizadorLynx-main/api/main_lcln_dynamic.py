@@ -11,10 +11,17 @@ sys.path.insert(0, str(parent_dir))
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+import asyncio
+import json
+import os
 import time
 from datetime import datetime
+from ejecutor_busqueda import CargaExcedida, EjecutorBusqueda
 from sistema_lcln_mejorado import sistema_lcln_mejorado
+from sistema_lcln_mejorado_limpio import SistemaLCLNMejorado
+from token_lcln import tokens_a_dicts
 
 # Inicializar FastAPI
 app = FastAPI(
@@ -43,6 +50,19 @@ class BatchQueryRequest(BaseModel):
 # Usar la instancia global del sistema LCLN mejorado con extensiones formales
 sistema_lcln = sistema_lcln_mejorado
 
+# Análisis de 5 fases sobre el catálogo compartido (el mismo que usa /search
+# en servidor_lcln_api); lo usan el análisis individual y los lotes
+sistema_lcln_completo = SistemaLCLNMejorado()
+
+# Consultas de un lote en flujo que se analizan a la vez; las demás esperan
+# a que termine alguna, así la memoria no crece con el tamaño del lote
+MAX_EN_VUELO_LOTE = int(os.getenv('LCLN_LOTE_EN_VUELO', 4))
+ejecutor_lotes = EjecutorBusqueda(
+    'lote',
+    max_concurrencia=MAX_EN_VUELO_LOTE,
+    max_cola=int(os.getenv('LCLN_LOTE_COLA', 16))
+)
+
 @app.get("/")
 def root():
     return {
@@ -102,77 +122,60 @@ def analyze_lcln_dynamic(request: QueryRequest):
     Endpoint principal - Análisis NLP con Sistema LCLN Dinámico
     Se adapta automáticamente cuando el admin agrega productos/categorías
     """
+    inicio = time.perf_counter()
     try:
-        # Usar el análisis completo formal LCLN con todas las extensiones
-        resultado = sistema_lcln.obtener_analisis_completo_formal(request.query)
+        resultado = sistema_lcln_completo.analizar_consulta_lcln(request.query)
         
-        # Extraer datos del nuevo formato
-        resumen = resultado['resumen_ejecutivo']
-        productos_encontrados = resultado['fase_5_motor_recomendaciones']['productos_encontrados']
+        recomendaciones = resultado['fase_5_motor_recomendaciones']
+        productos_encontrados = recomendaciones['productos_encontrados']
+        estrategia = recomendaciones['estrategia_usada']
         correcciones = resultado['fase_1_correccion']['correcciones'] if resultado['fase_1_correccion']['correcciones_aplicadas'] else []
         
-        # Preparar respuesta compatible con frontend existente + nuevas extensiones formales
-        respuesta = {
+        # Respuesta compatible con el frontend existente
+        return {
             "success": True,
-            "processing_time_ms": 50,  # Valor por defecto
+            "processing_time_ms": round((time.perf_counter() - inicio) * 1000, 2),
             "original_query": request.query,
             "corrections": [corr['palabra_corregida'] for corr in correcciones],
             "interpretation": {
-                "type": resumen['estrategia_usada'],
+                "type": resultado['fase_4_interpretacion']['tipo_busqueda'],
                 "termino_busqueda": request.query,
-                "categoria": "detectada_automaticamente",
-                "estrategia_usada": resumen['estrategia_usada']
+                "categoria": resultado['fase_4_interpretacion']['categoria_principal'] or "detectada_automaticamente",
+                "estrategia_usada": estrategia
             },
             "recommendations": productos_encontrados,
-            "user_message": f"Se encontraron {resumen['productos_encontrados']} productos usando {resumen['estrategia_usada']}",
+            "user_message": f"Se encontraron {recomendaciones['total_encontrados']} productos usando {estrategia}",
             "metadata": {
-                "products_found": resumen['productos_encontrados'],
+                "products_found": recomendaciones['total_encontrados'],
                 "has_corrections": len(correcciones) > 0,
-                "source": "lcln_formal_completo",
+                "source": "lcln_completo",
                 "productos_comprables": True,
                 "database_real": True,
                 "imagenes_incluidas": True,
                 "adaptativo": True,
-                # NUEVOS METADATOS FORMALES
-                "modo_analisis": resumen['modo_analisis'],
-                "conformidad_lcln": resumen['conformidad_lcln'],
-                "tokens_formales_count": resumen['tokens_formales_count'],
-                "validacion_gramatical": resumen.get('validacion_gramatical', None)
+                "total_tokens": resultado['fase_3_tokenizacion']['total_tokens']
             },
-            "sql_query": f"LCLN Formal Query - Strategy: {resumen['estrategia_usada']}"
+            "sql_query": f"LCLN Query - Strategy: {estrategia}"
         }
         
-        # AGREGAR DATOS FORMALES ADICIONALES (opcionales para analisis avanzado)
-        if resultado.get('fase_afd_lexico'):
-            respuesta['analisis_formal'] = {
-                "afd_lexico": {
-                    "total_tokens": resultado['fase_afd_lexico']['estadisticas']['total_tokens'],
-                    "tokens_reconocidos": resultado['fase_afd_lexico']['estadisticas']['tokens_reconocidos'],
-                    "precision": resultado['fase_afd_lexico']['estadisticas']['precision_reconocimiento'],
-                    "tabla_tokens": resultado['fase_afd_lexico']['tabla_tokens']
-                }
-            }
-            
-        if resultado.get('fase_analisis_sintactico'):
-            if 'analisis_formal' not in respuesta:
-                respuesta['analisis_formal'] = {}
-            respuesta['analisis_formal']['analisis_sintactico'] = {
-                "estructura_valida": resultado['fase_analisis_sintactico']['valida'],
-                "tipo_gramatica": resultado['fase_analisis_sintactico'].get('tipo_gramatica'),
-                "entidad_prioritaria": resultado['fase_analisis_sintactico'].get('entidad_prioritaria'),
-                "reglas_aplicadas": resultado['fase_analisis_sintactico'].get('reglas_aplicadas', [])
-            }
-            
-        if resultado.get('validacion_gramatical'):
-            if 'analisis_formal' not in respuesta:
-                respuesta['analisis_formal'] = {}
-            respuesta['analisis_formal']['validacion_gramatical'] = resultado['validacion_gramatical']
-        
-        return respuesta
-        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en análisis LCLN: {str(e)}")
 
+def _resultado_lote(query: str) -> dict:
+    """Resultado de una consulta dentro de un lote (con menos productos)"""
+    resultado = sistema_lcln_completo.analizar_consulta_lcln(query)
+    recomendaciones = resultado['fase_5_motor_recomendaciones']
+
+    return {
+        "query": query,
+        "success": True,
+        "products_found": recomendaciones['total_encontrados'],
+        "products": recomendaciones['productos_encontrados'][:5],
+        "strategy": recomendaciones['estrategia_usada'],
+        "corrections_applied": resultado['fase_1_correccion']['correcciones_aplicadas'],
+        "total_tokens": resultado['fase_3_tokenizacion']['total_tokens']
+    }
+
 @app.post("/api/nlp/batch")
 def analyze_batch_lcln(request: BatchQueryRequest):
     """
@@ -182,21 +185,7 @@ def analyze_batch_lcln(request: BatchQueryRequest):
         resultados = []
         
         for query in request.queries:
-            # Usar análisis completo formal pero con menos productos
-            resultado_individual = sistema_lcln.obtener_analisis_completo_formal(query)
-            resumen = resultado_individual['resumen_ejecutivo']
-            productos = resultado_individual['fase_5_motor_recomendaciones']['productos_encontrados'][:5]
-            
-            resultados.append({
-                "query": query,
-                "success": True,
-                "products_found": resumen['productos_encontrados'],
-                "products": productos,
-                "strategy": resumen['estrategia_usada'],
-                # Datos formales adicionales para batch
-                "conformidad_lcln": resumen['conformidad_lcln'],
-                "tokens_formales": resumen['tokens_formales_count']
-            })
+            resultados.append(_resultado_lote(query))
         
         return {
             "success": True,
@@ -208,6 +197,69 @@ def analyze_batch_lcln(request: BatchQueryRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en análisis batch: {str(e)}")
 
+def _linea_ndjson(datos: dict) -> str:
+    return json.dumps(datos, ensure_ascii=False, default=str) + "\n"
+
+async def _lote_en_flujo(queries: list):
+    """
+    Líneas NDJSON con el resultado de cada consulta en el orden en que
+    terminan, con a lo sumo ``MAX_EN_VUELO_LOTE`` consultas en análisis. La
+    última línea es el resumen del lote.
+    """
+    inicio = time.perf_counter()
+
+    async def analizar(indice: int, query: str) -> dict:
+        try:
+            resultado = await ejecutor_lotes.ejecutar(_resultado_lote, query)
+        except CargaExcedida as e:
+            resultado = {"query": query, "success": False, "error": f"Servicio saturado: {e}"}
+        except Exception as e:
+            resultado = {"query": query, "success": False, "error": f"Error en análisis LCLN: {str(e)}"}
+        return {"index": indice, **resultado}
+
+    pendientes = set()
+    exitosas = 0
+    try:
+        for indice, query in enumerate(queries):
+            pendientes.add(asyncio.ensure_future(analizar(indice, query)))
+            if len(pendientes) < MAX_EN_VUELO_LOTE:
+                continue
+            terminadas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+            for tarea in terminadas:
+                resultado = tarea.result()
+                exitosas += resultado['success']
+                yield _linea_ndjson(resultado)
+
+        while pendientes:
+            terminadas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+            for tarea in terminadas:
+                resultado = tarea.result()
+                exitosas += resultado['success']
+                yield _linea_ndjson(resultado)
+
+        yield _linea_ndjson({
+            "summary": True,
+            "success": True,
+            "total_queries": len(queries),
+            "successful_queries": exitosas,
+            "processing_time_ms": round((time.perf_counter() - inicio) * 1000, 2),
+            "processing_timestamp": datetime.now().isoformat()
+        })
+    finally:
+        # El cliente se desconectó: las consultas que no empezaron se cancelan
+        for tarea in pendientes:
+            tarea.cancel()
+
+@app.post("/api/nlp/batch/stream")
+async def analyze_batch_lcln_stream(request: BatchQueryRequest):
+    """
+    Análisis en lote en flujo: una línea NDJSON por consulta en cuanto
+    termina (con ``index``, su posición en el lote) y una línea final con
+    el resumen. El cliente recibe los primeros resultados sin esperar al
+    lote completo y el servidor no los acumula en memoria.
+    """
+    return StreamingResponse(_lote_en_flujo(request.queries), media_type="application/x-ndjson")
+
 @app.get("/api/stats")
 def get_stats():
     """
@@ -272,37 +324,43 @@ def analyze_formal_complete(request: QueryRequest):
     NUEVO - Endpoint de Analisis LCLN FORMAL COMPLETO
     Devuelve todos los datos del AFD, analisis sintactico y validacion gramatical
     """
+    inicio = time.perf_counter()
     try:
-        # Análisis completo formal sin filtrar ningún dato
-        resultado_completo = sistema_lcln.obtener_analisis_completo_formal(request.query)
+        # Análisis de 5 fases sin filtrar ningún dato
+        resultado_completo = sistema_lcln_completo.analizar_consulta_lcln(request.query)
+        recomendaciones = resultado_completo['fase_5_motor_recomendaciones']
+        instantanea = sistema_lcln_completo.almacen.instantanea
         
         return {
             "success": True,
+            "processing_time_ms": round((time.perf_counter() - inicio) * 1000, 2),
             "query": request.query,
             "timestamp": datetime.now().isoformat(),
             
             # Resumen ejecutivo
-            "resumen_ejecutivo": resultado_completo['resumen_ejecutivo'],
+            "resumen_ejecutivo": {
+                "productos_encontrados": recomendaciones['total_encontrados'],
+                "estrategia_usada": recomendaciones['estrategia_usada'],
+                "correcciones_aplicadas": resultado_completo['fase_1_correccion']['correcciones_aplicadas']
+            },
             
             # Todas las fases del análisis
             "fase_1_correccion": resultado_completo['fase_1_correccion'],
             "fase_2_expansion_sinonimos": resultado_completo['fase_2_expansion_sinonimos'],
-            "fase_3_tokenizacion": resultado_completo['fase_3_tokenizacion'],
+            "fase_3_tokenizacion": {
+                **resultado_completo['fase_3_tokenizacion'],
+                'tokens': tokens_a_dicts(resultado_completo['fase_3_tokenizacion']['tokens'])
+            },
             "fase_4_interpretacion": resultado_completo['fase_4_interpretacion'],
-            "fase_5_motor_recomendaciones": resultado_completo['fase_5_motor_recomendaciones'],
-            
-            # Fases formales nuevas
-            "fase_afd_lexico": resultado_completo.get('fase_afd_lexico'),
-            "fase_analisis_sintactico": resultado_completo.get('fase_analisis_sintactico'),
-            "validacion_gramatical": resultado_completo.get('validacion_gramatical'),
+            "fase_5_motor_recomendaciones": recomendaciones,
             
             # Metadatos técnicos
             "metadatos_tecnicos": {
-                "modo_analisis_formal_activo": sistema_lcln.modo_analisis_formal,
-                "version_sistema": "LCLN_FORMAL_COMPLETO",
-                "cache_timestamp": sistema_lcln._cache_timestamp.isoformat() if sistema_lcln._cache_timestamp else None,
-                "productos_en_cache": len(sistema_lcln._cache_productos),
-                "categorias_en_cache": len(sistema_lcln._cache_categorias)
+                "version_sistema": "LCLN_COMPLETO_5_FASES",
+                "catalogo_version": instantanea.version,
+                "cache_timestamp": instantanea.creada.isoformat() if instantanea.creada else None,
+                "productos_en_cache": len(instantanea.por_id),
+                "categorias_en_cache": len(instantanea.categorias)
             }
         }
         
@@ -370,6 +428,7 @@ if __name__ == "__main__":
     print("[ENDPOINTS] Endpoints disponibles:")
     print("   - /api/nlp/analyze (compatible con frontend)")
     print("   - /api/nlp/analyze-formal (analisis formal completo)")
+    print("   - /api/nlp/batch/stream (lote en flujo NDJSON)")
     print("   - /api/toggle-formal-mode/{true|false} (activar/desactivar)")
     print("")
     print(f"[CONFIG] Modo analisis formal: {'ACTIVO' if sistema_lcln.modo_analisis_formal else 'DESACTIVADO'}")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark del arranque de servidor_lcln_api.
+
+Cada medición corre en un proceso nuevo (como un contenedor recién creado)
+y reporta:
+
+- importación: tiempo de ``import servidor_lcln_api``;
+- motores: construcción de los sistemas LCLN (lo que hace el lifespan);
+- primera consulta: la primera búsqueda por ``/search`` con el catálogo
+  tomado de la copia en disco, sin servidor MySQL;
+- módulos de herramientas (graphviz, analizador léxico completo) que
+  quedaron cargados y no deberían hacer falta para servir.
+
+La copia en disco se arma con un catálogo sintético en un directorio
+temporal; ``LCLN_INSTANTANEA`` apunta a ella y MySQL a un puerto cerrado.
+
+Uso:
+    python benchmarks/benchmark_arranque.py [productos] [repeticiones]
+"""
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DIRECTORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRECTORIO)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS_HERRAMIENTAS = ['graphviz', 'analizador_lexico', 'sistema_lcln_mejorado', 'afd_base']
+
+
+def medir_proceso():
+    """Mediciones dentro del proceso nuevo; imprime un JSON"""
+    inicio = time.perf_counter()
+    import servidor_lcln_api as api
+    importacion = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    api.cargar_sistemas()
+    motores = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    respuesta = asyncio.run(api.search_products(api.SearchRequest(query='coca cola light', limit=20)))
+    primera = time.perf_counter() - inicio
+
+    print(json.dumps({
+        'importacion_ms': importacion * 1000,
+        'motores_ms': motores * 1000,
+        'primera_consulta_ms': primera * 1000,
+        'productos': respuesta['products_found'],
+        'herramientas': sorted(modulo for modulo in MODULOS_HERRAMIENTAS if modulo in sys.modules)
+    }))
+
+
+def preparar_instantanea(ruta: str, tamano: int):
+    from almacen_catalogo import AlmacenCatalogo
+    from benchmark_busqueda import catalogo
+
+    almacen = AlmacenCatalogo(archivo_instantanea=ruta)
+    instantanea = almacen.publicar_registros(catalogo(tamano, random.Random(7)))
+    almacen._guardar_disco(instantanea)
+
+
+def main():
+    tamano = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'catalogo.bin')
+        preparar_instantanea(ruta, tamano)
+
+        entorno = dict(os.environ, LCLN_INSTANTANEA=ruta, MYSQLHOST='127.0.0.1', MYSQLPORT='1')
+        mediciones = []
+        for _ in range(repeticiones):
+            salida = subprocess.run([sys.executable, os.path.abspath(__file__), '--medir'], env=entorno,
+                                    cwd=directorio, capture_output=True, text=True, check=True).stdout
+            mediciones.append(json.loads(salida.strip().splitlines()[-1]))
+
+    def mediana(clave):
+        return statistics.median(medicion[clave] for medicion in mediciones)
+
+    print(f"[BENCH] productos {tamano} | importación {mediana('importacion_ms'):7.1f} ms | "
+          f"motores {mediana('motores_ms'):7.1f} ms | primera consulta {mediana('primera_consulta_ms'):7.1f} ms "
+          f"({mediciones[0]['productos']} resultados)")
+    print(f"[BENCH] módulos de herramientas cargados: {mediciones[0]['herramientas'] or 'ninguno'}")
+
+
+if __name__ == '__main__':
+    if '--medir' in sys.argv:
+        medir_proceso()
+    else:
+        main()
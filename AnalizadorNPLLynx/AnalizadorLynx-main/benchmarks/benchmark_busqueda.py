@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las estrategias de búsqueda de SistemaLCLNMejorado sobre el
+índice invertido (indice_busqueda.IndiceBusqueda).
+
+Construye catálogos sintéticos de tamaño creciente y mide el tiempo medio de
+cada estrategia con el límite que usa el motor de recomendaciones. No
+necesita un servidor MySQL: el catálogo sintético se publica directamente en
+un AlmacenCatalogo propio del benchmark.
+
+Uso:
+    python benchmarks/benchmark_busqueda.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from almacen_catalogo import AlmacenCatalogo
+from sistema_lcln_mejorado_limpio import LIMITE_RESULTADOS, SistemaLCLNMejorado
+
+MARCAS = ['coca', 'pepsi', 'sabritas', 'doritos', 'cheetos', 'bimbo', 'lala', 'jumex',
+          'takis', 'ciel', 'marinela', 'gamesa', 'barcel', 'ruffles', 'sprite']
+DESCRIPTORES = ['cola', 'light', 'zero', 'fuego', 'natural', 'queso', 'chile', 'limon',
+                'original', 'integral', 'mini', 'familiar', 'agua', 'hot', 'nacho']
+CATEGORIAS = ['Bebidas', 'Snacks', 'Golosinas', 'Lacteos', 'Panaderia', 'Abarrotes']
+TAMANOS = [1_000, 10_000, 100_000, 300_000]
+CONSULTAS = 500
+
+
+def catalogo(tamano, azar):
+    productos = []
+    for i in range(tamano):
+        nombre = f"{azar.choice(MARCAS)} {azar.choice(DESCRIPTORES)} {azar.choice(DESCRIPTORES)} {i}"
+        productos.append({
+            'id': i,
+            'nombre': nombre,
+            'precio': float(azar.randint(5, 80)),
+            'cantidad': 10,
+            'imagen': 'default.jpg',
+            'id_categoria': 1,
+            'categoria_nombre': azar.choice(CATEGORIAS)
+        })
+    return sorted(productos, key=lambda producto: producto['nombre'])
+
+
+def medir(funcion, argumentos):
+    inicio = time.perf_counter()
+    for args in argumentos:
+        funcion(*args)
+    return (time.perf_counter() - inicio) / len(argumentos) * 1000
+
+
+def main():
+    azar = random.Random(7)
+    almacen = AlmacenCatalogo()
+    sistema = SistemaLCLNMejorado(almacen)
+
+    for tamano in TAMANOS:
+        registros = catalogo(tamano, azar)
+        inicio = time.perf_counter()
+        almacen.publicar_registros(registros)
+        construccion = time.perf_counter() - inicio
+
+        filtros = [{'max': azar.choice([15, 20, 30])} for _ in range(CONSULTAS)]
+        especificos = medir(sistema._buscar_productos_especificos,
+                            [([f"{azar.choice(MARCAS)} {azar.choice(DESCRIPTORES)}"], f, [], LIMITE_RESULTADOS)
+                             for f in filtros])
+        categoria = medir(sistema._buscar_por_categoria,
+                          [(azar.choice(CATEGORIAS).lower(), f, [], LIMITE_RESULTADOS) for f in filtros])
+        atributos = medir(sistema._buscar_por_atributos,
+                          [(['barato'], f, LIMITE_RESULTADOS) for f in filtros])
+        fallback = medir(sistema._buscar_fallback, [(f,) for f in filtros])
+
+        print(f"[BENCH] productos {tamano:>7} | indexado {construccion:6.2f}s | "
+              f"especificos {especificos:7.3f} ms | categoria {categoria:6.3f} ms | "
+              f"atributos {atributos:6.3f} ms | fallback {fallback:6.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
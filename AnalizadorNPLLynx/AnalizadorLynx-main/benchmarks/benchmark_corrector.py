@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark de CorrectorOrtografico.corregir_palabra con vocabularios grandes.
+
+Hace crecer el vocabulario con palabras sintéticas (sílabas del español) y
+mide el tiempo medio de corrección de palabras desconocidas, sin cache. El
+costo de una corrección depende de cuántas palabras hay en las cubetas
+fonéticas vecinas y, si ahí no hay corrección, en la vecindad de borrados de
+la consulta (columna "verificadas"), no del tamaño del vocabulario. Con --comparar se mide también
+el recorrido completo del vocabulario que hacía la versión anterior (solo en
+tamaños pequeños).
+
+Uso:
+    python benchmarks/benchmark_corrector.py [--comparar]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corrector_ortografico
+import indice_edicion
+from corrector_ortografico import CorrectorOrtografico
+from distancia_edicion import distancias_lote
+
+SILABAS = [consonante + vocal
+           for consonante in ('b', 'c', 'd', 'f', 'g', 'j', 'l', 'm', 'n', 'p', 'r', 's', 't',
+                              'v', 'z', 'ch', 'll', 'br', 'pl', 'tr', 'cr', 'gr')
+           for vocal in 'aeiou']
+TAMANOS = [300, 3_000, 30_000, 300_000]
+CONSULTAS = 300
+
+
+def palabra_sintetica(azar):
+    return ''.join(azar.choice(SILABAS) for _ in range(azar.randint(2, 5)))
+
+
+def con_error(palabra, azar):
+    """Introduce un error de una o dos ediciones"""
+    letras = list(palabra)
+    for _ in range(azar.randint(1, 2)):
+        posicion = azar.randrange(len(letras))
+        operacion = azar.random()
+        if operacion < 0.33:
+            letras.insert(posicion, azar.choice('aeiolnrs'))
+        elif operacion < 0.66 and len(letras) > 3:
+            del letras[posicion]
+        else:
+            letras[posicion] = azar.choice('bcdlmnprstvz')
+    return ''.join(letras)
+
+
+def recorrido_completo(corrector, palabra):
+    """Búsqueda anterior: distancia contra todo el vocabulario"""
+    mejor, mejor_confianza, menor_distancia = palabra, 0.0, float('inf')
+    for candidato in corrector.vocabulario:
+        distancia = corrector.distancia_levenshtein(palabra, candidato)
+        if distancia <= corrector.max_distancia:
+            confianza = corrector.calcular_confianza(palabra, candidato, distancia)
+            if confianza > mejor_confianza and distancia <= menor_distancia:
+                mejor, mejor_confianza, menor_distancia = candidato, confianza, distancia
+    return mejor, mejor_confianza
+
+
+def main():
+    comparar = '--comparar' in sys.argv
+    azar = random.Random(42)
+    corrector = CorrectorOrtografico()
+    vocabulario = []
+
+    for tamano in TAMANOS:
+        nuevas = []
+        while len(vocabulario) + len(nuevas) < tamano:
+            nuevas.append(palabra_sintetica(azar))
+        inicio = time.perf_counter()
+        corrector.agregar_al_vocabulario(nuevas)
+        construccion = time.perf_counter() - inicio
+        vocabulario.extend(nuevas)
+
+        consultas = [con_error(azar.choice(vocabulario), azar) for _ in range(CONSULTAS)]
+
+        # Contar las distancias que el índice realmente calcula
+        verificadas = 0
+
+        def distancias_contadas(consulta, candidatos, max_distancia=None):
+            nonlocal verificadas
+            verificadas += len(candidatos)
+            return distancias_lote(consulta, candidatos, max_distancia)
+
+        indice_edicion.distancias_lote = distancias_contadas
+        corrector_ortografico.distancias_lote = distancias_contadas
+        inicio = time.perf_counter()
+        for consulta in consultas:
+            corrector.cache_correcciones.limpiar()
+            corrector.corregir_palabra(consulta)
+        por_consulta = (time.perf_counter() - inicio) / CONSULTAS * 1000
+        indice_edicion.distancias_lote = distancias_lote
+        corrector_ortografico.distancias_lote = distancias_lote
+
+        linea = (f"[BENCH] vocabulario {len(corrector.vocabulario):>7} | "
+                 f"indexado {construccion:6.2f}s | índice {por_consulta:7.3f} ms/palabra | "
+                 f"verificadas {verificadas / CONSULTAS:6.1f}/palabra")
+
+        if comparar and tamano <= 3_000:
+            inicio = time.perf_counter()
+            for consulta in consultas:
+                recorrido_completo(corrector, consulta)
+            linea += f" | recorrido completo {(time.perf_counter() - inicio) / CONSULTAS * 1000:8.3f} ms/palabra"
+
+        print(linea)
+
+
+if __name__ == '__main__':
+    main()
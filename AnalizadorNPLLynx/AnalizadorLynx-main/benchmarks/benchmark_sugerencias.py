@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark del autocompletado (indice_sugerencias.IndiceSugerencias).
+
+Simula a un usuario escribiendo nombres de productos tecla por tecla sobre
+catálogos sintéticos de tamaño creciente y reporta la construcción del
+índice y la latencia por tecla (media, p99 y máxima). Lo compara con el
+recorrido completo que hacía ``obtener_sugerencias`` antes del índice.
+
+Uso:
+    python benchmarks/benchmark_sugerencias.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from almacen_catalogo import AlmacenCatalogo
+from benchmark_busqueda import CATEGORIAS, DESCRIPTORES, MARCAS, TAMANOS, catalogo
+from indice_sugerencias import IndiceSugerencias
+
+ESCRITURAS = 200
+LIMITE = 10
+
+
+def teclas(azar):
+    """Prefijos sucesivos de una consulta, como llegan mientras se escribe"""
+    consulta = azar.choice([
+        f"{azar.choice(MARCAS)} {azar.choice(DESCRIPTORES)}",
+        azar.choice(DESCRIPTORES),
+        azar.choice(CATEGORIAS)
+    ])
+    return [consulta[:fin] for fin in range(1, len(consulta) + 1)]
+
+
+def recorrido_completo(instantanea, consulta):
+    """Sugerencias como se calculaban antes: subcadena sobre todo el catálogo"""
+    consulta = consulta.lower()
+    sugerencias = {producto['nombre'] for producto in instantanea.por_id.values()
+                   if consulta in producto['nombre'].lower()}
+    return sorted(sugerencias)[:LIMITE]
+
+
+def main():
+    azar = random.Random(7)
+    almacen = AlmacenCatalogo()
+
+    for tamano in TAMANOS:
+        registros = catalogo(tamano, azar)
+        instantanea = almacen.publicar_registros(registros)
+        ventas = {registro['id']: azar.randint(0, 500) for registro in registros if azar.random() < 0.3}
+
+        inicio = time.perf_counter()
+        indice = IndiceSugerencias.desde_instantanea(instantanea, ventas)
+        construccion = time.perf_counter() - inicio
+
+        prefijos = [prefijo for _ in range(ESCRITURAS) for prefijo in teclas(azar)]
+        tiempos = []
+        for prefijo in prefijos:
+            inicio = time.perf_counter()
+            indice.sugerir(prefijo, LIMITE)
+            tiempos.append(time.perf_counter() - inicio)
+        tiempos.sort()
+
+        muestra = prefijos[:50]
+        inicio = time.perf_counter()
+        for prefijo in muestra:
+            recorrido_completo(instantanea, prefijo)
+        recorrido = (time.perf_counter() - inicio) / len(muestra) * 1000
+
+        print(f"[BENCH] productos {tamano:>7} | indexado {construccion:6.2f}s | "
+              f"tecla media {sum(tiempos) / len(tiempos) * 1000:6.3f} ms | "
+              f"p99 {tiempos[int(len(tiempos) * 0.99)] * 1000:6.3f} ms | "
+              f"max {tiempos[-1] * 1000:6.3f} ms | recorrido completo {recorrido:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
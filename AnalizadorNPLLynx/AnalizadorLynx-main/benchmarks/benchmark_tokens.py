@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memoria de los tokens del pipeline LCLN.
+
+Compara, para el mismo conjunto de consultas, los tokens compactos
+(``token_lcln.Token``) contra su equivalente en diccionario (el formato que
+usaba el pipeline antes), midiendo bytes asignados por consulta con
+tracemalloc y colecciones del GC con varios hilos analizando a la vez.
+
+Uso:
+    python benchmarks/benchmark_tokens.py [consultas_por_hilo] [hilos]
+"""
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from afd_combinado import AFDCombinado
+from afd_multipalabra import AFDMultipalabra
+from afd_numeros import AFDNumeros
+from afd_operadores import AFDOperadores
+from afd_palabras import AFDPalabras
+from afd_unidades import AFDUnidades
+from interpretador_semantico import InterpretadorSemantico
+from token_lcln import tokens_a_dicts
+
+BASE_DATOS = {
+    'productos_simples': ['coca', 'sabritas', 'agua', 'leche', 'doritos', 'takis'],
+    'productos_multi': ['coca cola', 'agua mineral', 'leche deslactosada', 'coca cola zero'],
+    'productos_completos': ['coca cola', 'agua mineral', 'coca cola zero'],
+    'categorias': ['bebidas', 'snacks', 'lacteos', 'botanas'],
+    'atributos': ['picante', 'dulce', 'salado'],
+    'unidades': ['ml', 'litros', 'pesos', 'gr'],
+    'operadores': [],
+    'modificadores': ['sin', 'con', 'muy']
+}
+
+CONSULTAS = [
+    'coca cola zero menor a 20 pesos',
+    'botanas picantes baratas',
+    'agua mineral de 500 ml',
+    'leche deslactosada mayor a 30',
+    'categoria bebidas sin azucar',
+    'doritos takis sabritas muy baratos',
+]
+
+
+def construir_escaner():
+    afds = [
+        AFDMultipalabra(BASE_DATOS),
+        AFDOperadores(BASE_DATOS),
+        AFDNumeros(),
+        AFDUnidades(BASE_DATOS),
+        AFDPalabras(BASE_DATOS),
+    ]
+    return AFDCombinado(afds)
+
+
+def analizar(escaner, interpretador, consulta, como_dict):
+    tokens = interpretador.interpretar_tokens(escaner.tokenizar(consulta))
+    if como_dict:
+        tokens = tokens_a_dicts(tokens)
+    return tokens
+
+
+def medir_asignacion(escaner, interpretador, como_dict, repeticiones=200):
+    """Bytes asignados por consulta, conservando los resultados vivos"""
+    gc.collect()
+    tracemalloc.start()
+    inicio, _ = tracemalloc.get_traced_memory()
+    resultados = [analizar(escaner, interpretador, consulta, como_dict)
+                  for _ in range(repeticiones) for consulta in CONSULTAS]
+    fin, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    total = repeticiones * len(CONSULTAS)
+    del resultados
+    return (fin - inicio) / total, (pico - inicio) / total
+
+
+def medir_concurrencia(escaner, como_dict, consultas_por_hilo, hilos):
+    """Tiempo total y colecciones del GC con varios hilos analizando"""
+
+    def trabajador():
+        interpretador = InterpretadorSemantico()
+        conservados = []
+        for i in range(consultas_por_hilo):
+            conservados.append(analizar(escaner, interpretador, CONSULTAS[i % len(CONSULTAS)], como_dict))
+            if len(conservados) > 64:
+                conservados.clear()
+
+    gc.collect()
+    colecciones_antes = [s['collections'] for s in gc.get_stats()]
+    inicio = time.perf_counter()
+    trabajadores = [threading.Thread(target=trabajador) for _ in range(hilos)]
+    for hilo in trabajadores:
+        hilo.start()
+    for hilo in trabajadores:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+    colecciones = [s['collections'] - a for s, a in zip(gc.get_stats(), colecciones_antes)]
+    return duracion, colecciones
+
+
+def main():
+    consultas_por_hilo = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    escaner = construir_escaner()
+    interpretador = InterpretadorSemantico()
+
+    for etiqueta, como_dict in (('Token', False), ('dict', True)):
+        retenido, pico = medir_asignacion(escaner, interpretador, como_dict)
+        duracion, colecciones = medir_concurrencia(escaner, como_dict, consultas_por_hilo, hilos)
+        total = consultas_por_hilo * hilos
+        print(f"[{etiqueta:>5}] retenido {retenido:8.1f} B/consulta | pico {pico:8.1f} B/consulta | "
+              f"{total / duracion:9.0f} consultas/s con {hilos} hilos | GC gen0/1/2 {colecciones}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la memoria de los workers seguidores del catálogo.
+
+Se escribe una copia en disco con un catálogo sintético y se arrancan
+varios procesos nuevos que la publican, como los workers de uvicorn que no
+son líderes, de dos formas:
+
+- mapeada: vistas sobre el mapa en memoria del archivo (lo que hace
+  ``_seguir_disco``);
+- objetos: registros e índice decodificados a objetos de Python (lo que
+  hace el líder al arrancar).
+
+Cada proceso reporta el tiempo de carga, el costo de unas consultas y su
+memoria privada (``Private_Dirty`` de ``/proc/self/smaps_rollup``, solo
+Linux): la que se multiplica por cada worker. Las páginas del archivo
+cuentan como compartidas.
+
+Uso:
+    python benchmarks/benchmark_workers.py [productos] [workers]
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import islice
+
+DIRECTORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRECTORIO)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CONSULTAS = ['coca', 'cola light', 'papas', 'agua', 'chocolate']
+
+
+def memoria_privada() -> int:
+    """KiB privados y modificados del proceso"""
+    with open('/proc/self/smaps_rollup') as resumen:
+        for linea in resumen:
+            if linea.startswith('Private_Dirty:'):
+                return int(linea.split()[1])
+    return 0
+
+
+def medir_proceso(ruta: str, mapeado: bool):
+    """Mediciones dentro del proceso nuevo; imprime un JSON"""
+    from almacen_catalogo import AlmacenCatalogo
+
+    almacen = AlmacenCatalogo(archivo_instantanea=None)
+    almacen.archivo_instantanea = ruta
+    antes = memoria_privada()
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        almacen._cargar_disco(mapeado=mapeado)
+    carga = time.perf_counter() - inicio
+
+    indice = almacen.instantanea.indice
+    inicio = time.perf_counter()
+    for _ in range(20):
+        for consulta in CONSULTAS:
+            [indice.productos[slot] for _, slot in islice(indice.por_texto(consulta, 10, 60), 20)]
+            list(indice.recorrer(indice.bitmap_categoria('bebidas') & indice.bitmap_rango(10, 40)))
+    consulta = (time.perf_counter() - inicio) / (20 * len(CONSULTAS))
+
+    print(json.dumps({
+        'carga_ms': carga * 1000,
+        'consulta_ms': consulta * 1000,
+        'privada_mb': (memoria_privada() - antes) / 1024
+    }))
+
+
+def main():
+    tamano = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    from almacen_catalogo import AlmacenCatalogo
+    from benchmark_busqueda import catalogo
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'catalogo.bin')
+        almacen = AlmacenCatalogo(archivo_instantanea=ruta)
+        with contextlib.redirect_stdout(io.StringIO()):
+            almacen._guardar_disco(almacen.publicar_registros(catalogo(tamano, random.Random(7))))
+        print(f"[BENCH] productos {tamano} | copia en disco {os.path.getsize(ruta) / 1e6:.1f} MB")
+
+        for modo in ('mapeada', 'objetos'):
+            procesos = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--medir', ruta, modo],
+                                         stdout=subprocess.PIPE, text=True) for _ in range(workers)]
+            mediciones = [json.loads(proceso.communicate()[0].strip().splitlines()[-1]) for proceso in procesos]
+
+            def mediana(clave):
+                return statistics.median(medicion[clave] for medicion in mediciones)
+
+            print(f"[BENCH] {modo:8s} | {workers} workers | carga {mediana('carga_ms'):7.1f} ms | "
+                  f"consulta {mediana('consulta_ms'):6.3f} ms | privada por worker {mediana('privada_mb'):7.1f} MB | "
+                  f"total {sum(medicion['privada_mb'] for medicion in mediciones):7.1f} MB")
+
+
+if __name__ == '__main__':
+    if '--medir' in sys.argv:
+        posicion = sys.argv.index('--medir')
+        medir_proceso(sys.argv[posicion + 1], sys.argv[posicion + 2] == 'mapeada')
+    else:
+        main()
@@ -0,0 +1,124 @@
+# cache_lru.py
+"""
+Cache LRU acotado por número de entradas y por tiempo de vida.
+
+Pensado para los caches que viven dentro de un worker de uvicorn durante
+horas: al llenarse descarta la entrada usada hace más tiempo, las entradas
+caducan tras ``ttl_segundos`` y lleva contadores de aciertos, fallos,
+desalojos y caducadas para poder dimensionarlo con tráfico real.
+
+Con ``max_bytes`` y una función ``tamano`` (bytes estimados de un valor) el
+cache se acota también por memoria: se desaloja hasta que la suma de los
+tamaños cabe, y un valor más grande que el límite no se guarda.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Marca interna para distinguir "no está" de un valor None guardado
+_AUSENTE = object()
+
+
+class CacheLRU:
+    """Cache LRU seguro entre hilos, con TTL y contadores"""
+
+    def __init__(self, max_entradas: int = 10000, ttl_segundos: Optional[float] = None,
+                 reloj: Callable[[], float] = time.monotonic, max_bytes: Optional[int] = None,
+                 tamano: Optional[Callable[[Any], int]] = None):
+        if max_entradas <= 0:
+            raise ValueError("max_entradas debe ser mayor que cero")
+        if max_bytes is not None and tamano is None:
+            raise ValueError("max_bytes necesita la función tamano")
+
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.max_bytes = max_bytes
+        self._tamano = tamano
+        self._reloj = reloj
+        # clave -> (valor, expira, bytes)
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.caducadas = 0
+        self.rechazadas = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obtener(self, clave: Hashable, defecto: Any = None) -> Any:
+        """Valor guardado para la clave, o ``defecto`` si no está o caducó"""
+        with self._lock:
+            entrada = self._entradas.get(clave, _AUSENTE)
+            if entrada is _AUSENTE:
+                self.fallos += 1
+                return defecto
+
+            valor, expira, tamano = entrada
+            if expira is not None and expira <= self._reloj():
+                del self._entradas[clave]
+                self._bytes -= tamano
+                self.caducadas += 1
+                self.fallos += 1
+                return defecto
+
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave: Hashable, valor: Any):
+        """Guarda el valor y desaloja las entradas menos usadas si hace falta"""
+        expira = self._reloj() + self.ttl_segundos if self.ttl_segundos is not None else None
+        tamano = self._tamano(valor) if self._tamano is not None else 0
+
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[2]
+            if self.max_bytes is not None and tamano > self.max_bytes:
+                self.rechazadas += 1
+                return
+
+            self._entradas[clave] = (valor, expira, tamano)
+            self._bytes += tamano
+
+            while len(self._entradas) > self.max_entradas or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes):
+                _, desalojada = self._entradas.popitem(last=False)
+                self._bytes -= desalojada[2]
+                self.desalojos += 1
+
+    def invalidar(self, clave: Hashable):
+        """Elimina una entrada si existe"""
+        with self._lock:
+            entrada = self._entradas.pop(clave, None)
+            if entrada is not None:
+                self._bytes -= entrada[2]
+
+    def limpiar(self):
+        """Vacía el cache (los contadores se conservan)"""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Contadores y ocupación actual"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'ttl_segundos': self.ttl_segundos,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'desalojos': self.desalojos,
+                'caducadas': self.caducadas,
+                'rechazadas': self.rechazadas,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0
+            }
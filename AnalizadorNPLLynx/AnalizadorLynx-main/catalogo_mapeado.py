@@ -0,0 +1,588 @@
+# catalogo_mapeado.py
+"""
+Catálogo e índice de búsqueda como búferes planos de la copia en disco.
+
+Con varios workers de uvicorn todos publican la misma generación del
+catálogo (ver almacen_catalogo). Si cada uno la decodificara a
+diccionarios, listas y tuplas de Python, la memoria crecería con cada worker
+aunque los datos sean idénticos. Por eso las estructuras grandes se guardan
+como columnas de tipo fijo (``array``) y los seguidores las leen directamente
+del mapa en memoria del archivo, con vistas ``memoryview``: son páginas del
+caché del sistema de archivos, una sola vez para todos los procesos.
+
+- registros: una fila por producto en orden de id. Los números van en
+  columnas ``'q'`` y ``'d'`` (``NULO`` representa None) y los textos en
+  tablas de cadenas (desplazamientos más bytes UTF-8). El diccionario de un
+  registro se arma solo cuando se pide;
+- ``por_nombre``: las filas en el orden del catálogo más una permutación en
+  orden de clave, para buscar con bisect. La clave es el nombre del registro
+  en minúsculas, como al construir la instantánea;
+- índice: ``por_precio`` en dos columnas (precios y slots), los postings de
+  todos los términos uno tras otro con la tabla de términos ordenada y el
+  inicio de cada lista, los trigramas de esos términos, las máscaras por
+  slot y los bitmaps de categorías y atributos como bytes.
+
+Las vistas son de solo lectura y se comportan como las estructuras
+originales (``Sequence`` y ``Mapping``), así que las consultas de
+IndiceBusqueda no cambian (los trigramas apuntan a posiciones de la tabla de
+términos en lugar de a las cadenas). Las categorías y los sinónimos son
+chicos y siguen viajando con marshal. El líder aplica deltas sobre copias y
+compara registros por identidad: ``materializar`` le devuelve los objetos de
+Python de siempre.
+"""
+from array import array
+from bisect import bisect_left
+from collections.abc import ItemsView, Mapping, Sequence, ValuesView
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Entero que representa None en las columnas 'q'
+NULO = -(1 << 63)
+
+
+def _entero(valor: Optional[int]) -> int:
+    return NULO if valor is None else valor
+
+
+def _opcional(valor: int) -> Optional[int]:
+    return None if valor == NULO else valor
+
+
+def _agregar_cadenas(columnas: Dict[str, array], prefijo: str, cadenas: Iterable[str]):
+    """Tabla de cadenas: desplazamientos (n + 1) y bytes UTF-8 seguidos"""
+    desplazamientos = array('q', [0])
+    datos = bytearray()
+    for cadena in cadenas:
+        datos += cadena.encode('utf-8')
+        desplazamientos.append(len(datos))
+    columnas[prefijo + '_desp'] = desplazamientos
+    columnas[prefijo + '_datos'] = array('B', datos)
+
+
+def _agregar_bitmaps(columnas: Dict[str, array], prefijo: str, bitmaps: Mapping):
+    _agregar_cadenas(columnas, prefijo + '_nombre', bitmaps)
+    desplazamientos = array('q', [0])
+    datos = bytearray()
+    for bitmap in bitmaps.values():
+        datos += bitmap.to_bytes((bitmap.bit_length() + 7) >> 3, 'little')
+        desplazamientos.append(len(datos))
+    columnas[prefijo + '_desp'] = desplazamientos
+    columnas[prefijo + '_datos'] = array('B', datos)
+
+
+def columnas_catalogo(por_id: Mapping, por_nombre: Mapping, indice: Any) -> Dict[str, array]:
+    """
+    Columnas de registros, ``por_nombre`` e índice para ``escribir_instantanea``.
+    Los registros deben tener la forma de ``registro_producto``; si no, se
+    lanza TypeError o ValueError y quien guarda decide qué hacer.
+    """
+    ids = sorted(por_id)
+    fila_de = {id_producto: fila for fila, id_producto in enumerate(ids)}
+    registros = [por_id[id_producto] for id_producto in ids]
+
+    categorias: Dict[str, int] = {}
+    for registro in registros:
+        if registro['categoria_nombre'] is not None:
+            categorias.setdefault(registro['categoria_nombre'], len(categorias))
+
+    slots = array('q', [NULO]) * len(ids)
+    for id_producto, slot in indice.slots.items():
+        slots[fila_de[id_producto]] = slot
+
+    columnas: Dict[str, array] = {
+        'reg_id': array('q', ids),
+        'reg_precio': array('d', [registro['precio'] for registro in registros]),
+        'reg_cantidad': array('q', [_entero(registro['cantidad']) for registro in registros]),
+        'reg_id_categoria': array('q', [_entero(registro['id_categoria']) for registro in registros]),
+        'reg_categoria': array('q', [categorias.get(registro['categoria_nombre'], NULO)
+                                     for registro in registros]),
+        'reg_slot': slots
+    }
+    _agregar_cadenas(columnas, 'reg_nombre', [registro['nombre'] for registro in registros])
+    _agregar_cadenas(columnas, 'reg_imagen', [registro['imagen'] for registro in registros])
+    _agregar_cadenas(columnas, 'cat_nombre', categorias)
+
+    claves = list(por_nombre)
+    columnas['nom_fila'] = array('q', [fila_de[registro['id']] for registro in por_nombre.values()])
+    columnas['nom_orden'] = array('q', sorted(range(len(claves)), key=claves.__getitem__))
+
+    columnas['idx_fila'] = array('q', [fila_de[producto['id']] if producto is not None else NULO
+                                       for producto in indice.productos])
+    columnas['idx_mascara'] = array('Q', indice.mascaras)
+    columnas['pp_precio'] = array('d', [precio for precio, _ in indice.por_precio])
+    columnas['pp_slot'] = array('q', [slot for _, slot in indice.por_precio])
+
+    terminos = sorted(indice.terminos)
+    inicios = array('q', [0])
+    precios = array('d')
+    slots_postings = array('q')
+    for termino in terminos:
+        for precio, slot in indice.terminos[termino]:
+            precios.append(precio)
+            slots_postings.append(slot)
+        inicios.append(len(precios))
+    _agregar_cadenas(columnas, 'ter_nombre', terminos)
+    columnas['ter_inicio'] = inicios
+    columnas['pos_precio'] = precios
+    columnas['pos_slot'] = slots_postings
+
+    # Trigramas con la posición de cada término en la tabla anterior
+    posicion_de = {termino: posicion for posicion, termino in enumerate(terminos)}
+    trigramas = sorted(indice.trigramas)
+    inicios = array('q', [0])
+    posiciones = array('q')
+    for trigrama in trigramas:
+        posiciones.extend(sorted(posicion_de[termino] for termino in indice.trigramas[trigrama]))
+        inicios.append(len(posiciones))
+    _agregar_cadenas(columnas, 'tri_nombre', trigramas)
+    columnas['tri_inicio'] = inicios
+    columnas['tri_termino'] = posiciones
+
+    _agregar_bitmaps(columnas, 'bmc', indice.categorias)
+    _agregar_bitmaps(columnas, 'bma', indice.atributos)
+    return columnas
+
+
+# --- Vistas de solo lectura -----------------------------------------------
+
+
+class TablaCadenas(Sequence):
+    """Cadenas de una tabla de desplazamientos y bytes UTF-8"""
+
+    __slots__ = ('_desplazamientos', '_datos')
+
+    def __init__(self, desplazamientos: memoryview, datos: memoryview):
+        self._desplazamientos = desplazamientos
+        self._datos = datos
+
+    def __len__(self):
+        return len(self._desplazamientos) - 1
+
+    def __getitem__(self, posicion):
+        if isinstance(posicion, slice):
+            return [self[i] for i in range(*posicion.indices(len(self)))]
+        if posicion < 0:
+            posicion += len(self)
+            if posicion < 0:
+                raise IndexError('posición fuera de la tabla de cadenas')
+        # Más allá del final falla la lectura de desplazamientos[posicion + 1]
+        return self.cadena(posicion)
+
+    def cadena(self, posicion: int) -> str:
+        """Cadena de una posición válida, sin las revisiones de ``__getitem__``"""
+        desplazamientos = self._desplazamientos
+        return str(self._datos[desplazamientos[posicion]:desplazamientos[posicion + 1]], 'utf-8')
+
+    def buscar(self, cadena: str) -> int:
+        """
+        Posición de la cadena en una tabla ordenada, o -1. Compara los bytes
+        UTF-8 sin decodificar: su orden es el mismo que el de las cadenas
+        """
+        clave = cadena.encode('utf-8')
+        desplazamientos = self._desplazamientos
+        datos = self._datos
+        bajo, alto = 0, len(desplazamientos) - 1
+        while bajo < alto:
+            medio = (bajo + alto) >> 1
+            if datos[desplazamientos[medio]:desplazamientos[medio + 1]].tobytes() < clave:
+                bajo = medio + 1
+            else:
+                alto = medio
+        if bajo < len(desplazamientos) - 1 and datos[desplazamientos[bajo]:desplazamientos[bajo + 1]] == clave:
+            return bajo
+        return -1
+
+    def __iter__(self) -> Iterator[str]:
+        desplazamientos = self._desplazamientos.tolist()
+        datos = self._datos
+        return (str(datos[inicio:fin], 'utf-8') for inicio, fin in zip(desplazamientos, desplazamientos[1:]))
+
+    @property
+    def nbytes(self) -> int:
+        return self._desplazamientos.nbytes + self._datos.nbytes
+
+
+class ParesPrecio(Sequence):
+    """Pares (precio, slot) de dos columnas paralelas, en orden de precio"""
+
+    __slots__ = ('_precios', '_slots')
+
+    def __init__(self, precios: memoryview, slots: memoryview):
+        self._precios = precios
+        self._slots = slots
+
+    def __len__(self):
+        return len(self._precios)
+
+    def __getitem__(self, posicion):
+        if isinstance(posicion, slice):
+            return list(zip(self._precios[posicion], self._slots[posicion]))
+        return self._precios[posicion], self._slots[posicion]
+
+    def __iter__(self) -> Iterator[Tuple[float, int]]:
+        return zip(self._precios, self._slots)
+
+    def en_posiciones(self, posiciones: Iterable[int]) -> Iterator[Tuple[float, int]]:
+        """Pares de las posiciones dadas, leyendo las columnas directamente"""
+        precios, slots = self._precios, self._slots
+        return ((precios[posicion], slots[posicion]) for posicion in posiciones)
+
+    def rango(self, inicio: int, fin: int) -> Iterator[Tuple[float, int]]:
+        """Pares de [inicio, fin) sin pasar por ``__getitem__`` en cada uno"""
+        return zip(self._precios[inicio:fin], self._slots[inicio:fin])
+
+    @property
+    def nbytes(self) -> int:
+        return self._precios.nbytes + self._slots.nbytes
+
+
+class TerminosMapeados(Mapping):
+    """Término -> ParesPrecio, con la tabla de términos ordenada"""
+
+    __slots__ = ('_nombres', '_inicios', '_precios', '_slots')
+
+    def __init__(self, nombres: TablaCadenas, inicios: memoryview, precios: memoryview, slots: memoryview):
+        self._nombres = nombres
+        self._inicios = inicios
+        self._precios = precios
+        self._slots = slots
+
+    def __getitem__(self, termino: str) -> ParesPrecio:
+        posicion = self._nombres.buscar(termino)
+        if posicion < 0:
+            raise KeyError(termino)
+        inicio, fin = self._inicios[posicion], self._inicios[posicion + 1]
+        return ParesPrecio(self._precios[inicio:fin], self._slots[inicio:fin])
+
+    def __contains__(self, termino) -> bool:
+        return isinstance(termino, str) and self._nombres.buscar(termino) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._nombres)
+
+    def nombre(self, posicion: int) -> str:
+        """Término en esa posición de la tabla (ver TrigramasMapeados)"""
+        return self._nombres.cadena(posicion)
+
+    def __len__(self):
+        return len(self._nombres)
+
+    def listas(self) -> Iterator[Tuple[str, List[Tuple[float, int]]]]:
+        """Cada término con sus postings como lista, recorriendo las columnas una vez"""
+        inicios = self._inicios
+        for posicion, termino in enumerate(self._nombres):
+            inicio, fin = inicios[posicion], inicios[posicion + 1]
+            yield termino, list(zip(self._precios[inicio:fin], self._slots[inicio:fin]))
+
+    @property
+    def postings(self) -> int:
+        return len(self._precios)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nombres.nbytes + self._inicios.nbytes + self._precios.nbytes + self._slots.nbytes
+
+
+class TrigramasMapeados(Mapping):
+    """
+    Trigrama -> posiciones de los términos que lo contienen, en la tabla de
+    TerminosMapeados. A diferencia del índice en objetos de Python los
+    valores son enteros: solo se decodifican los términos candidatos
+    """
+
+    __slots__ = ('_nombres', '_inicios', '_terminos')
+
+    def __init__(self, nombres: TablaCadenas, inicios: memoryview, terminos: memoryview):
+        self._nombres = nombres
+        self._inicios = inicios
+        self._terminos = terminos
+
+    def __getitem__(self, trigrama: str) -> memoryview:
+        posicion = self._nombres.buscar(trigrama)
+        if posicion < 0:
+            raise KeyError(trigrama)
+        return self._terminos[self._inicios[posicion]:self._inicios[posicion + 1]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._nombres)
+
+    def __len__(self):
+        return len(self._nombres)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nombres.nbytes + self._inicios.nbytes + self._terminos.nbytes
+
+
+class BitmapsMapeados(Mapping):
+    """Nombre -> bitmap entero, convertido desde sus bytes al pedirlo"""
+
+    __slots__ = ('_posiciones', '_desplazamientos', '_datos')
+
+    def __init__(self, nombres: TablaCadenas, desplazamientos: memoryview, datos: memoryview):
+        # Son pocas categorías y atributos: los nombres sí se decodifican
+        self._posiciones = {nombre: posicion for posicion, nombre in enumerate(nombres)}
+        self._desplazamientos = desplazamientos
+        self._datos = datos
+
+    def __getitem__(self, nombre: str) -> int:
+        posicion = self._posiciones[nombre]
+        inicio, fin = self._desplazamientos[posicion], self._desplazamientos[posicion + 1]
+        return int.from_bytes(self._datos[inicio:fin], 'little')
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._posiciones)
+
+    def __len__(self):
+        return len(self._posiciones)
+
+    @property
+    def nbytes(self) -> int:
+        return self._desplazamientos.nbytes + self._datos.nbytes
+
+
+class _ValoresFilas(ValuesView):
+    def __iter__(self):
+        return self._mapping.filas()
+
+
+class _ItemsFilas(ItemsView):
+    def __iter__(self):
+        return zip(self._mapping, self._mapping.filas())
+
+
+class RegistrosMapeados(Mapping):
+    """Id -> registro del producto, armado desde las columnas al pedirlo"""
+
+    def __init__(self, secciones: Dict[str, memoryview]):
+        self._ids = secciones['reg_id']
+        self._precios = secciones['reg_precio']
+        self._cantidades = secciones['reg_cantidad']
+        self._ids_categoria = secciones['reg_id_categoria']
+        self._categorias = secciones['reg_categoria']
+        self._slots = secciones['reg_slot']
+        self._nombres = TablaCadenas(secciones['reg_nombre_desp'], secciones['reg_nombre_datos'])
+        self._imagenes = TablaCadenas(secciones['reg_imagen_desp'], secciones['reg_imagen_datos'])
+        self._nombres_categoria = list(TablaCadenas(secciones['cat_nombre_desp'], secciones['cat_nombre_datos']))
+
+    def fila(self, fila: int) -> Dict:
+        """Registro de una fila, con la forma de ``registro_producto``"""
+        categoria = self._categorias[fila]
+        return {
+            'id': self._ids[fila],
+            'nombre': self._nombres.cadena(fila),
+            'precio': self._precios[fila],
+            'cantidad': _opcional(self._cantidades[fila]),
+            'imagen': self._imagenes.cadena(fila),
+            'id_categoria': _opcional(self._ids_categoria[fila]),
+            'categoria_nombre': self._nombres_categoria[categoria] if categoria != NULO else None
+        }
+
+    def filas(self) -> Iterator[Dict]:
+        return map(self.fila, range(len(self._ids)))
+
+    def nombre(self, fila: int) -> str:
+        return self._nombres.cadena(fila)
+
+    def posicion(self, id_producto: Any) -> int:
+        """Fila del id, o -1 si no está"""
+        if type(id_producto) is not int:
+            return -1
+        fila = bisect_left(self._ids, id_producto)
+        return fila if fila < len(self._ids) and self._ids[fila] == id_producto else -1
+
+    def slot(self, fila: int) -> int:
+        return self._slots[fila]
+
+    def __getitem__(self, id_producto: Any) -> Dict:
+        fila = self.posicion(id_producto)
+        if fila < 0:
+            raise KeyError(id_producto)
+        return self.fila(fila)
+
+    def __contains__(self, id_producto) -> bool:
+        return self.posicion(id_producto) >= 0
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def values(self):
+        return _ValoresFilas(self)
+
+    def items(self):
+        return _ItemsFilas(self)
+
+    @property
+    def nbytes(self) -> int:
+        return (self._ids.nbytes + self._precios.nbytes + self._cantidades.nbytes + self._ids_categoria.nbytes +
+                self._categorias.nbytes + self._slots.nbytes + self._nombres.nbytes + self._imagenes.nbytes)
+
+
+class _ClavesOrdenadas(Sequence):
+    """Claves de ``por_nombre`` en orden, para bisect"""
+
+    __slots__ = ('_nombres',)
+
+    def __init__(self, nombres: 'NombresMapeados'):
+        self._nombres = nombres
+
+    def __len__(self):
+        return len(self._nombres)
+
+    def __getitem__(self, posicion: int) -> str:
+        return self._nombres.clave(self._nombres._orden[posicion])
+
+
+class NombresMapeados(Mapping):
+    """Nombre en minúsculas -> registro, en el orden del catálogo"""
+
+    def __init__(self, registros: RegistrosMapeados, filas: memoryview, orden: memoryview):
+        self._registros = registros
+        self._filas = filas
+        self._orden = orden
+        self._claves = _ClavesOrdenadas(self)
+
+    def clave(self, posicion: int) -> str:
+        return self._registros.nombre(self._filas[posicion]).lower()
+
+    def filas(self) -> Iterator[Dict]:
+        return map(self._registros.fila, self._filas)
+
+    def _posicion(self, clave: Any) -> int:
+        if not isinstance(clave, str):
+            return -1
+        orden = bisect_left(self._claves, clave)
+        if orden < len(self._claves) and self._claves[orden] == clave:
+            return self._orden[orden]
+        return -1
+
+    def __getitem__(self, clave: str) -> Dict:
+        posicion = self._posicion(clave)
+        if posicion < 0:
+            raise KeyError(clave)
+        return self._registros.fila(self._filas[posicion])
+
+    def __contains__(self, clave) -> bool:
+        return self._posicion(clave) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return map(self.clave, range(len(self._filas)))
+
+    def __len__(self):
+        return len(self._filas)
+
+    def values(self):
+        return _ValoresFilas(self)
+
+    def items(self):
+        return _ItemsFilas(self)
+
+    @property
+    def nbytes(self) -> int:
+        return self._filas.nbytes + self._orden.nbytes
+
+
+class SlotsMapeados(Mapping):
+    """Id -> slot en el índice, para los productos indexados"""
+
+    __slots__ = ('_registros', '_total')
+
+    def __init__(self, registros: RegistrosMapeados, total: int):
+        self._registros = registros
+        self._total = total
+
+    def __getitem__(self, id_producto: Any) -> int:
+        fila = self._registros.posicion(id_producto)
+        slot = self._registros.slot(fila) if fila >= 0 else NULO
+        if slot == NULO:
+            raise KeyError(id_producto)
+        return slot
+
+    def __iter__(self) -> Iterator[int]:
+        registros = self._registros
+        return (id_producto for fila, id_producto in enumerate(registros) if registros.slot(fila) != NULO)
+
+    def __len__(self):
+        return self._total
+
+
+class ProductosMapeados(Sequence):
+    """Slot -> registro (None en los slots vacíos)"""
+
+    __slots__ = ('_registros', '_filas')
+
+    def __init__(self, registros: RegistrosMapeados, filas: memoryview):
+        self._registros = registros
+        self._filas = filas
+
+    def __len__(self):
+        return len(self._filas)
+
+    def __getitem__(self, slot):
+        if isinstance(slot, slice):
+            return [self[i] for i in range(*slot.indices(len(self)))]
+        fila = self._filas[slot]
+        return self._registros.fila(fila) if fila != NULO else None
+
+    @property
+    def nbytes(self) -> int:
+        return self._filas.nbytes
+
+
+class CatalogoMapeado:
+    """Vistas sobre las secciones de una copia en disco (ver ``leer_instantanea``)"""
+
+    def __init__(self, secciones: Dict[str, memoryview]):
+        self.secciones = secciones
+        self.por_id = RegistrosMapeados(secciones)
+        self.por_nombre = NombresMapeados(self.por_id, secciones['nom_fila'], secciones['nom_orden'])
+
+    def partes_indice(self) -> Dict[str, Any]:
+        """Estructuras del índice como vistas sobre el mapa"""
+        secciones = self.secciones
+        por_precio = ParesPrecio(secciones['pp_precio'], secciones['pp_slot'])
+        return {
+            'productos': ProductosMapeados(self.por_id, secciones['idx_fila']),
+            'mascaras': secciones['idx_mascara'],
+            'slots': SlotsMapeados(self.por_id, len(por_precio)),
+            'terminos': TerminosMapeados(TablaCadenas(secciones['ter_nombre_desp'], secciones['ter_nombre_datos']),
+                                         secciones['ter_inicio'], secciones['pos_precio'], secciones['pos_slot']),
+            'trigramas': TrigramasMapeados(TablaCadenas(secciones['tri_nombre_desp'], secciones['tri_nombre_datos']),
+                                           secciones['tri_inicio'], secciones['tri_termino']),
+            'por_precio': por_precio,
+            'categorias': BitmapsMapeados(TablaCadenas(secciones['bmc_nombre_desp'], secciones['bmc_nombre_datos']),
+                                          secciones['bmc_desp'], secciones['bmc_datos']),
+            'atributos': BitmapsMapeados(TablaCadenas(secciones['bma_nombre_desp'], secciones['bma_nombre_datos']),
+                                         secciones['bma_desp'], secciones['bma_datos'])
+        }
+
+    def materializar(self) -> Tuple[Dict[Any, Dict], Dict[str, Dict], Dict[str, Any]]:
+        """
+        ``por_id``, ``por_nombre`` y partes del índice como objetos de Python,
+        con un solo diccionario por registro compartido por todas las vistas
+        """
+        registros: List[Dict] = list(self.por_id.filas())
+        por_id = {registro['id']: registro for registro in registros}
+        por_nombre = {registros[fila]['nombre'].lower(): registros[fila] for fila in self.secciones['nom_fila']}
+
+        vistas = self.partes_indice()
+        terminos = list(vistas['terminos'])
+        trigramas = vistas['trigramas']
+        productos = [registros[fila] if fila != NULO else None for fila in self.secciones['idx_fila']]
+        return por_id, por_nombre, {
+            'productos': productos,
+            'mascaras': self.secciones['idx_mascara'].tolist(),
+            'slots': {producto['id']: slot for slot, producto in enumerate(productos) if producto is not None},
+            'terminos': dict(vistas['terminos'].listas()),
+            'trigramas': {trigrama: {terminos[posicion] for posicion in trigramas[trigrama]}
+                          for trigrama in trigramas},
+            'por_precio': list(vistas['por_precio']),
+            'categorias': dict(vistas['categorias']),
+            'atributos': dict(vistas['atributos'])
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return sum(vista.nbytes for vista in self.secciones.values())
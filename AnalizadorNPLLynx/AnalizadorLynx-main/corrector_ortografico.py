@@ -1,16 +1,35 @@
 # corrector_ortografico.py
 import re
+import threading
+import weakref
 from typing import Dict, List, Tuple, Optional
 
+from cache_lru import CacheLRU
+from distancia_edicion import distancia, distancias_lote
+from indice_edicion import IndiceEdicion
+
+# Valor guardado en cache para las palabras sin corrección
+SIN_CORRECCION = object()
+
+# Normalización de la clave fonética: acentos, ñ, b/v y c/s/z
+_TABLA_FONETICA = str.maketrans({
+    'á': 'a', 'é': 'e', 'ê': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u', 'ü': 'u', 'ñ': 'n',
+    'v': 'b', 'c': 's', 'z': 's'
+})
+
+# Correctores vivos del proceso, para reportar sus caches en /cache-stats
+_correctores: "weakref.WeakSet[CorrectorOrtografico]" = weakref.WeakSet()
+_lock_correctores = threading.Lock()
+
 class CorrectorOrtografico:
     """
     Módulo de corrección ortográfica basado en distancia de Levenshtein
     optimizada para el vocabulario de productos LYNX
     """
     
-    def __init__(self):
+    def __init__(self, max_entradas_cache: int = 20000, ttl_cache: Optional[float] = 3600):
         self.vocabulario = self._cargar_vocabulario()
-        self.indices_foneticos = self._crear_indices_foneticos()
+        self._crear_indices_foneticos()
         self.errores_comunes = {
             # Productos comunes mal escritos - SEGÚN DOCUMENTACIÓN TÉCNICA LCLN
             "coca": "coca-cola",
@@ -53,10 +72,18 @@ class CorrectorOrtografico:
             "20": "20",
             "200g": "20"
         }
-        self.cache_correcciones = {}
+        # Cache acotado: en un worker de larga vida no puede crecer con cada
+        # palabra distinta que escriban los usuarios
+        self.cache_correcciones = CacheLRU(max_entradas_cache, ttl_segundos=ttl_cache)
         self.max_distancia = 2
         self.umbral_confianza = 0.7
         
+        # Índice de borrado simétrico: evita comparar contra todo el vocabulario
+        self.indice_edicion = IndiceEdicion(self.max_distancia, palabras=self.vocabulario)
+        
+        with _lock_correctores:
+            _correctores.add(self)
+        
     def _cargar_vocabulario(self) -> set:
         """Carga el vocabulario desde la configuración LYNX"""
         vocabulario = set()
@@ -90,7 +117,8 @@ class CorrectorOrtografico:
     
     def _crear_indices_foneticos(self) -> Dict[str, List[str]]:
         """Crea índices fonéticos para español"""
-        indices = {}
+        indices = self.indices_foneticos = {}
+        self.vecinos_foneticos = {}
         
         # Mapeo de sonidos similares en español (expandido)
         equivalencias_foneticas = {
@@ -115,52 +143,59 @@ class CorrectorOrtografico:
         }
         
         for palabra in self.vocabulario:
-            clave_fonetica = self._generar_clave_fonetica(palabra)
-            if clave_fonetica not in indices:
-                indices[clave_fonetica] = []
-            indices[clave_fonetica].append(palabra)
+            self._indexar_fonetica(palabra)
             
         return indices
     
-    def _generar_clave_fonetica(self, palabra: str) -> str:
-        """Genera una clave fonética simplificada para español"""
-        # Normalizar caracteres especiales
-        palabra = re.sub(r'[áa]', 'a', palabra.lower())
-        palabra = re.sub(r'[éeê]', 'e', palabra)
-        palabra = re.sub(r'[íi]', 'i', palabra)
-        palabra = re.sub(r'[óo]', 'o', palabra)
-        palabra = re.sub(r'[úu]', 'u', palabra)
-        palabra = re.sub(r'ñ', 'n', palabra)
+    def _indexar_fonetica(self, palabra: str):
+        """
+        Agrega la palabra a su cubeta fonética. Cada clave nueva se registra
+        también bajo sus variantes con un carácter borrado, para encontrar
+        las cubetas vecinas (claves a una edición) sin recorrerlas todas.
+        """
+        clave_fonetica = self._generar_clave_fonetica(palabra)
+        cubeta = self.indices_foneticos.get(clave_fonetica)
+        if cubeta is None:
+            self.indices_foneticos[clave_fonetica] = [palabra]
+            for i in range(len(clave_fonetica)):
+                variante = clave_fonetica[:i] + clave_fonetica[i + 1:]
+                self.vecinos_foneticos.setdefault(variante, set()).add(clave_fonetica)
+        elif palabra not in cubeta:
+            cubeta.append(palabra)
+    
+    def _claves_vecinas(self, clave_fonetica: str) -> set:
+        """Claves del índice a una inserción, borrado o sustitución de la clave"""
+        claves = set(self.vecinos_foneticos.get(clave_fonetica, ()))
+        if clave_fonetica in self.indices_foneticos:
+            claves.add(clave_fonetica)
+        
+        for i in range(len(clave_fonetica)):
+            variante = clave_fonetica[:i] + clave_fonetica[i + 1:]
+            if variante in self.indices_foneticos:
+                claves.add(variante)
+            claves.update(self.vecinos_foneticos.get(variante, ()))
         
-        # Aplicar reglas fonéticas
-        palabra = re.sub(r'[bv]', 'b', palabra)
-        palabra = re.sub(r'[cs]', 's', palabra)
-        palabra = re.sub(r'll', 'y', palabra)
+        return claves
+    
+    def _candidatos_foneticos(self, palabra: str) -> List[Tuple[str, int]]:
+        """Palabras de la cubeta fonética de la palabra y de sus vecinas, con su distancia"""
+        candidatos = []
+        for clave in self._claves_vecinas(self._generar_clave_fonetica(palabra)):
+            candidatos.extend(self.indices_foneticos[clave])
         
-        return palabra
+        distancias = distancias_lote(palabra, candidatos, self.max_distancia)
+        return [(candidato, dist)
+                for candidato, dist in zip(candidatos, distancias)
+                if dist <= self.max_distancia]
+    
+    def _generar_clave_fonetica(self, palabra: str) -> str:
+        """Genera una clave fonética simplificada para español"""
+        # ll -> y, luego acentos, ñ y sonidos equivalentes (b/v, c/s/z)
+        return palabra.lower().replace('ll', 'y').translate(_TABLA_FONETICA)
     
     def distancia_levenshtein(self, s1: str, s2: str) -> int:
         """Calcula la distancia de Levenshtein entre dos cadenas"""
-        if len(s1) < len(s2):
-            return self.distancia_levenshtein(s2, s1)
-        
-        if len(s2) == 0:
-            return len(s1)
-        
-        fila_anterior = list(range(len(s2) + 1))
-        
-        for i, c1 in enumerate(s1):
-            fila_actual = [i + 1]
-            
-            for j, c2 in enumerate(s2):
-                inserciones = fila_anterior[j + 1] + 1
-                eliminaciones = fila_actual[j] + 1
-                sustituciones = fila_anterior[j] + (c1 != c2)
-                fila_actual.append(min(inserciones, eliminaciones, sustituciones))
-            
-            fila_anterior = fila_actual
-        
-        return fila_anterior[-1]
+        return distancia(s1, s2)
     
     def calcular_confianza(self, palabra_original: str, palabra_corregida: str, distancia: int) -> float:
         """Calcula la confianza de la corrección"""
@@ -187,48 +222,53 @@ class CorrectorOrtografico:
         
         palabra = palabra.lower().strip()
         
-        # Verificar cache
-        if palabra in self.cache_correcciones:
-            return self.cache_correcciones[palabra]
-        
-        # Verificar si ya está en vocabulario
+        # Verificar si ya está en vocabulario (consulta directa, no se cachea)
         if palabra in self.vocabulario:
-            resultado = (palabra, 1.0)
-            self.cache_correcciones[palabra] = resultado
-            return resultado
+            return palabra, 1.0
         
         # Verificar errores comunes
         if palabra in self.errores_comunes:
-            correccion = self.errores_comunes[palabra]
-            confianza = 0.95
-            resultado = (correccion, confianza)
-            self.cache_correcciones[palabra] = resultado
+            return self.errores_comunes[palabra], 0.95
+        
+        # Verificar cache
+        resultado = self.cache_correcciones.obtener(palabra)
+        if resultado is SIN_CORRECCION:
+            return palabra, 0.0
+        if resultado is not None:
             return resultado
         
-        # Buscar la mejor corrección
+        # Primero las cubetas fonéticas (la propia y las vecinas); solo si
+        # ahí no hay una corrección confiable se busca en todo el vocabulario
+        resultado = self._mejor_correccion(palabra, self._candidatos_foneticos(palabra))
+        if resultado is None:
+            resultado = self._mejor_correccion(palabra, self.indice_edicion.candidatos(palabra))
+        
+        # Los resultados negativos se guardan como una marca compartida
+        if resultado is None:
+            self.cache_correcciones.guardar(palabra, SIN_CORRECCION)
+            return palabra, 0.0
+        
+        self.cache_correcciones.guardar(palabra, resultado)
+        return resultado
+    
+    def _mejor_correccion(self, palabra: str, candidatos: List[Tuple[str, int]]) -> Optional[Tuple[str, float]]:
+        """Mejor candidato (palabra, distancia) si supera el umbral de confianza"""
         mejor_correccion = palabra
         mejor_confianza = 0.0
         menor_distancia = float('inf')
         
-        for candidato in self.vocabulario:
-            distancia = self.distancia_levenshtein(palabra, candidato)
+        for candidato, dist in candidatos:
+            confianza = self.calcular_confianza(palabra, candidato, dist)
             
-            if distancia <= self.max_distancia:
-                confianza = self.calcular_confianza(palabra, candidato, distancia)
-                
-                if confianza > mejor_confianza and distancia <= menor_distancia:
-                    mejor_correccion = candidato
-                    mejor_confianza = confianza
-                    menor_distancia = distancia
+            if confianza > mejor_confianza and dist <= menor_distancia:
+                mejor_correccion = candidato
+                mejor_confianza = confianza
+                menor_distancia = dist
         
         # Solo retornar corrección si supera el umbral
         if mejor_confianza >= self.umbral_confianza:
-            resultado = (mejor_correccion, mejor_confianza)
-        else:
-            resultado = (palabra, 0.0)
-        
-        self.cache_correcciones[palabra] = resultado
-        return resultado
+            return mejor_correccion, mejor_confianza
+        return None
     
     def corregir_consulta(self, consulta: str) -> Dict:
         """
@@ -268,10 +308,21 @@ class CorrectorOrtografico:
     def agregar_al_vocabulario(self, palabras: List[str]):
         """Agrega nuevas palabras al vocabulario"""
         for palabra in palabras:
-            self.vocabulario.add(palabra.lower().strip())
-        
-        # Regenerar índices fonéticos
-        self.indices_foneticos = self._crear_indices_foneticos()
+            palabra = palabra.lower().strip()
+            self.vocabulario.add(palabra)
+            self.indice_edicion.agregar(palabra)
+            self._indexar_fonetica(palabra)
         
         # Limpiar cache para que se regenere
-        self.cache_correcciones.clear()
+        self.cache_correcciones.limpiar()
+    
+    def estadisticas_cache(self) -> Dict:
+        """Aciertos, fallos, desalojos y ocupación del cache de correcciones"""
+        return self.cache_correcciones.estadisticas()
+
+
+def estadisticas_correctores() -> List[Dict]:
+    """Estadísticas del cache de correcciones de cada corrector vivo del proceso"""
+    with _lock_correctores:
+        correctores = list(_correctores)
+    return [corrector.estadisticas_cache() for corrector in correctores]
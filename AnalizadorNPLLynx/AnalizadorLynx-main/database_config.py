@@ -5,11 +5,13 @@ Compatible con las variables de entorno de Railway
 """
 
 import os
-import mysql.connector
+
+from pool_conexiones import pool_mysql
 
 def get_database_connection():
     """
-    Obtiene una conexión a la base de datos MySQL usando las variables de entorno
+    Obtiene una conexión del pool MySQL usando las variables de entorno;
+    ``close()`` la devuelve al pool y ``descartar()`` la cierra tras un error
     """
     config = {
         'host': os.getenv('MYSQL_HOST', 'mysql.railway.internal'),
@@ -24,8 +26,7 @@ def get_database_connection():
     }
     
     try:
-        connection = mysql.connector.connect(**config)
-        return connection
+        return pool_mysql(config).obtener()
     except Exception as e:
         print(f"[LCLN DB] Error connecting to database: {e}")
         return None
@@ -69,7 +70,8 @@ def get_productos_from_db():
     except Exception as e:
         print(f"[LCLN DB] Error fetching products: {e}")
         if connection:
-            connection.close()
+            # La conexión puede haber quedado inservible: no vuelve al pool
+            connection.descartar()
         return []
 
 def test_database_connection():
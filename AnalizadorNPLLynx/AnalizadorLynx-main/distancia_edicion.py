@@ -0,0 +1,106 @@
+# distancia_edicion.py
+"""
+Distancia de Levenshtein compartida por el corrector ortográfico y el
+interpretador semántico.
+
+- ``distancia``: algoritmo bit-paralelo de Myers (formulación de Hyyrö). Cada
+  columna de la matriz de programación dinámica se representa con vectores
+  de bits, así que el costo es una docena de operaciones enteras por
+  carácter del texto, sin importar la longitud del patrón (los enteros de
+  Python no tienen límite de bits).
+- ``distancias_lote``: compara una consulta contra muchos candidatos
+  reutilizando los vectores de bits de la consulta; con ``max_distancia``
+  abandona cada candidato en cuanto la distancia ya no puede quedar dentro
+  del límite.
+"""
+from typing import Dict, Iterable, List, Optional
+
+
+def _vectores_patron(patron: str) -> Dict[str, int]:
+    """Máscara de posiciones de cada carácter del patrón"""
+    vectores: Dict[str, int] = {}
+    for i, caracter in enumerate(patron):
+        vectores[caracter] = vectores.get(caracter, 0) | (1 << i)
+    return vectores
+
+
+def _myers(vectores: Dict[str, int], m: int, texto: str, cota: Optional[int] = None) -> int:
+    """
+    Distancia entre el patrón (ya convertido a vectores) y el texto.
+
+    Con ``cota`` se detiene en cuanto la distancia no puede bajar de
+    ``cota + 1`` y retorna ese valor: el puntaje de la última fila baja a lo
+    sumo uno por columna, así que al final será al menos ``puntaje`` menos
+    las columnas que faltan.
+    """
+    if m == 0:
+        return len(texto)
+
+    todos = (1 << m) - 1
+    ultimo = 1 << (m - 1)
+    positivos = todos  # VP: diferencias verticales +1
+    negativos = 0      # VN: diferencias verticales -1
+    puntaje = m
+    restantes = len(texto)
+    limite = restantes + cota if cota is not None else None
+
+    for caracter in texto:
+        iguales = vectores.get(caracter, 0)
+        xv = iguales | negativos
+        xh = (((iguales & positivos) + positivos) ^ positivos) | iguales
+        horizontales_pos = negativos | (~(xh | positivos) & todos)
+        horizontales_neg = positivos & xh
+
+        if horizontales_pos & ultimo:
+            puntaje += 1
+        elif horizontales_neg & ultimo:
+            puntaje -= 1
+
+        # La fila 0 crece en uno por columna (distancia global)
+        horizontales_pos = ((horizontales_pos << 1) | 1) & todos
+        horizontales_neg = (horizontales_neg << 1) & todos
+        positivos = horizontales_neg | (~(xv | horizontales_pos) & todos)
+        negativos = horizontales_pos & xv
+
+        # Cota inferior: puntaje - restantes > cota
+        if limite is not None:
+            limite -= 1
+            if puntaje > limite:
+                return cota + 1
+
+    return puntaje
+
+
+def distancia(a: str, b: str) -> int:
+    """Distancia de Levenshtein entre a y b (bit-paralela)"""
+    if len(a) < len(b):
+        a, b = b, a
+    # El patrón es la cadena corta: menos bits por vector
+    return _myers(_vectores_patron(b), len(b), a)
+
+
+def distancias_lote(consulta: str, candidatos: Iterable[str],
+                    max_distancia: Optional[int] = None) -> List[int]:
+    """
+    Distancia de la consulta contra cada candidato, en el mismo orden.
+
+    Los vectores de bits de la consulta se calculan una sola vez. Con
+    ``max_distancia`` los candidatos cuya diferencia de longitud ya supera
+    el límite se descartan sin calcular nada y el resto abandona en cuanto
+    supera el límite; todos ellos reportan ``max_distancia + 1``.
+    """
+    vectores = _vectores_patron(consulta)
+    m = len(consulta)
+    resultado = []
+
+    for candidato in candidatos:
+        if max_distancia is not None and abs(len(candidato) - m) > max_distancia:
+            resultado.append(max_distancia + 1)
+            continue
+
+        valor = _myers(vectores, m, candidato, max_distancia)
+        if max_distancia is not None and valor > max_distancia:
+            valor = max_distancia + 1
+        resultado.append(valor)
+
+    return resultado
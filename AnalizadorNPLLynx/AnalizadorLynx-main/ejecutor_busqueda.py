@@ -0,0 +1,132 @@
+# ejecutor_busqueda.py
+"""
+Ejecución de las búsquedas fuera del event loop de asyncio.
+
+Los endpoints de servidor_lcln_api son ``async def`` pero el pipeline LCLN
+(corrección, análisis, búsqueda en el índice) y las lecturas de MySQL son
+síncronos: una consulta lenta detenía todas las demás peticiones del
+worker. El ejecutor corre ese trabajo en un pool de hilos acotado:
+
+- a lo sumo ``max_concurrencia`` búsquedas se ejecutan a la vez y hasta
+  ``max_cola`` esperan turno; con la cola llena ``ejecutar`` lanza
+  ``CargaExcedida`` de inmediato (el servidor responde 503) en lugar de
+  acumular peticiones que ya no llegarían a tiempo;
+- separa el tiempo en cola del tiempo de ejecución, para distinguir un
+  worker saturado de una búsqueda lenta; ambos tiempos se registran en el
+  histograma ``lcln_ejecutor_segundos`` (``etapa`` ``espera`` o
+  ``ejecucion``), así los percentiles se ven en /metrics.
+
+Son hilos y no procesos: los motores comparten el catálogo publicado del
+proceso, que no se puede pasar a otro proceso sin copiarlo. El trabajo de
+CPU sigue compartiendo el GIL, pero el event loop queda libre para aceptar
+conexiones, responder desde el cache y rechazar a tiempo.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from metricas_latencia import histograma
+
+_latencia_ejecutor = histograma('lcln_ejecutor_segundos', 'Tiempo en cola y en ejecución de las tareas del ejecutor',
+                                ('ejecutor', 'etapa'))
+
+class CargaExcedida(Exception):
+    """Todas las plazas de ejecución y de la cola están ocupadas"""
+
+
+class EjecutorBusqueda:
+    """Pool de hilos con concurrencia y cola acotadas"""
+
+    def __init__(self, nombre: str = 'busqueda', max_concurrencia: int = 4, max_cola: int = 32):
+        if max_concurrencia <= 0 or max_cola < 0:
+            raise ValueError("max_concurrencia debe ser mayor que cero y max_cola no negativa")
+
+        self.nombre = nombre
+        self.max_concurrencia = max_concurrencia
+        self.max_cola = max_cola
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrencia, thread_name_prefix=f"lcln-{nombre}")
+        self._lock = threading.Lock()
+        self._admitidas = 0
+        self._en_ejecucion = 0
+
+        self.completadas = 0
+        self.errores = 0
+        self.rechazadas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.ejecucion_total = 0.0
+        self.ejecucion_maxima = 0.0
+
+    async def ejecutar(self, funcion: Callable[..., Any], *args) -> Any:
+        """
+        Resultado de ``funcion(*args)`` ejecutada en el pool. Lanza
+        ``CargaExcedida`` si no queda lugar en la cola.
+        """
+        with self._lock:
+            if self._admitidas >= self.max_concurrencia + self.max_cola:
+                self.rechazadas += 1
+                raise CargaExcedida(f"ejecutor '{self.nombre}' saturado ({self._en_ejecucion} en ejecución, "
+                                    f"{self._admitidas - self._en_ejecucion} en cola)")
+            self._admitidas += 1
+
+        try:
+            futuro = self._pool.submit(self._medir, time.perf_counter(), funcion, args)
+        except RuntimeError:
+            # Pool cerrado durante el apagado
+            self._liberar()
+            raise
+        # La plaza se libera cuando el trabajo termina o se cancela antes de
+        # empezar, aunque quien esperaba ya se haya ido
+        futuro.add_done_callback(self._liberar)
+        return await asyncio.wrap_future(futuro)
+
+    def _liberar(self, futuro=None):
+        with self._lock:
+            self._admitidas -= 1
+
+    def _medir(self, encolada: float, funcion: Callable[..., Any], args) -> Any:
+        inicio = time.perf_counter()
+        with self._lock:
+            self._en_ejecucion += 1
+        fallo = True
+        try:
+            resultado = funcion(*args)
+            fallo = False
+            return resultado
+        finally:
+            espera = inicio - encolada
+            ejecucion = time.perf_counter() - inicio
+            _latencia_ejecutor.observar(espera, self.nombre, 'espera')
+            _latencia_ejecutor.observar(ejecucion, self.nombre, 'ejecucion')
+            with self._lock:
+                self._en_ejecucion -= 1
+                self.completadas += 1
+                self.errores += fallo
+                self.espera_total += espera
+                self.ejecucion_total += ejecucion
+                self.espera_maxima = max(self.espera_maxima, espera)
+                self.ejecucion_maxima = max(self.ejecucion_maxima, ejecucion)
+
+    def cerrar(self):
+        """Espera a las búsquedas en curso y detiene los hilos"""
+        self._pool.shutdown(wait=True)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado del ejecutor para los endpoints de monitoreo"""
+        with self._lock:
+            completadas = self.completadas
+            return {
+                'max_concurrencia': self.max_concurrencia,
+                'max_cola': self.max_cola,
+                'en_ejecucion': self._en_ejecucion,
+                'en_cola': self._admitidas - self._en_ejecucion,
+                'completadas': completadas,
+                'errores': self.errores,
+                'rechazadas': self.rechazadas,
+                'espera_media_ms': round(self.espera_total / completadas * 1000, 3) if completadas else 0.0,
+                'espera_maxima_ms': round(self.espera_maxima * 1000, 3),
+                'ejecucion_media_ms': round(self.ejecucion_total / completadas * 1000, 3) if completadas else 0.0,
+                'ejecucion_maxima_ms': round(self.ejecucion_maxima * 1000, 3)
+            }
@@ -0,0 +1,478 @@
+# indice_busqueda.py
+"""
+Índice invertido sobre el cache de productos del sistema LCLN.
+
+Se construye una vez por refresco del cache y responde las estrategias de
+búsqueda de SistemaLCLNMejorado sin recorrer todo el catálogo:
+
+- término -> productos, con un índice de trigramas sobre los términos para
+  resolver coincidencias por subcadena ("cola" encuentra "cocacola");
+- todos los productos ordenados por precio, para acotar rangos con bisect;
+- categoría -> bitmap y atributo -> bitmap sobre esa misma posición en el
+  orden por precio, más la máscara de atributos de cada producto (ver
+  reglas_atributos).
+
+Cada producto ocupa un *slot* fijo (su posición de carga). Las listas de
+postings guardan tuplas ``(precio, slot)`` ordenadas: con precios iguales
+conservan el orden de carga, igual que el ``sorted(..., key=precio)`` estable
+que usaban las búsquedas por recorrido completo. Como todas vienen en orden
+de precio, una búsqueda con límite solo mezcla las cabezas de las listas que
+le tocan en lugar de ordenar todas las coincidencias.
+
+Los bitmaps son enteros de Python donde el bit ``i`` corresponde a
+``por_precio[i]``: un rango de precio es un bloque contiguo de bits, combinar
+categoría, atributos y precio son ``&`` y ``|`` entre enteros, y recorrer los
+bits encendidos de menor a mayor ya da los productos en orden de precio.
+
+Los refrescos incrementales usan ``agregar`` y ``eliminar``: un producto
+cambiado ocupa un slot nuevo al final y su slot anterior queda vacío hasta
+la siguiente reconstrucción completa. Un índice ya publicado no se modifica:
+el refresco trabaja sobre ``copiar()``, que comparte las listas de postings y
+los conjuntos de trigramas y solo duplica los que llega a tocar.
+
+La copia en disco guarda el índice como columnas planas (ver
+catalogo_mapeado) y ``desde_partes()`` lo vuelve a armar sin reconstruirlo,
+ya sea con objetos de Python o, en los workers seguidores, con vistas de
+solo lectura sobre el mapa en memoria (``mapeado``). Las consultas
+funcionan igual sobre ambos; ``copiar``, ``agregar`` y ``eliminar`` solo
+sobre el primero.
+"""
+import json
+import re
+import sys
+import zlib
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from reglas_atributos import ReglasAtributos
+from tamano_memoria import tamano_muestreado, tamano_profundo
+
+_INFINITO = float('inf')
+_BYTE_NO_NULO = re.compile(b'[^\x00]')
+
+
+def normalizar_nombre(texto: str) -> str:
+    """Normalización de nombres que usan las búsquedas por producto"""
+    return texto.lower().replace('-', ' ').replace('  ', ' ').strip()
+
+
+def _trigramas(termino: str) -> Set[str]:
+    return {termino[i:i + 3] for i in range(len(termino) - 2)}
+
+
+def _bitmap(posiciones: Iterable[int], total: int) -> int:
+    """Entero con los bits de las posiciones dadas encendidos"""
+    bits = bytearray((total + 7) >> 3)
+    for posicion in posiciones:
+        bits[posicion >> 3] |= 1 << (posicion & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _insertar_bit(bitmap: int, posicion: int, encendido: bool) -> int:
+    """Desplaza los bits desde la posición y coloca uno nuevo en ella"""
+    bajos = bitmap & ((1 << posicion) - 1)
+    return bajos | ((bitmap >> posicion) << (posicion + 1)) | (int(encendido) << posicion)
+
+
+def _quitar_bit(bitmap: int, posicion: int) -> int:
+    """Elimina el bit de la posición juntando los de arriba"""
+    bajos = bitmap & ((1 << posicion) - 1)
+    return bajos | ((bitmap >> (posicion + 1)) << posicion)
+
+
+def posiciones_bitmap(bitmap: int) -> Iterator[int]:
+    """Posiciones de los bits encendidos, de menor a mayor"""
+    if not bitmap:
+        return
+    # Se salta de una vez el bloque de ceros inicial y el resto se recorre
+    # por bytes: solo los bytes no nulos llegan a Python
+    desplazamiento = ((bitmap & -bitmap).bit_length() - 1) & ~7
+    bitmap >>= desplazamiento
+    datos = bitmap.to_bytes((bitmap.bit_length() + 7) >> 3, 'little')
+    for encontrado in _BYTE_NO_NULO.finditer(datos):
+        valor = encontrado.group()[0]
+        base = desplazamiento + (encontrado.start() << 3)
+        while valor:
+            bajo = valor & -valor
+            yield base + bajo.bit_length() - 1
+            valor ^= bajo
+
+
+class IndiceBusqueda:
+    """Postings por término, orden global por precio y bitmaps de filtros"""
+
+    def __init__(self, productos: Iterable[Dict], reglas: Optional[ReglasAtributos] = None):
+        self.reglas = reglas or ReglasAtributos()
+        self.productos: List[Optional[Dict]] = []
+        self.mascaras: List[int] = []
+        self.slots: Dict[Any, int] = {}
+        self.terminos: Dict[str, List[Tuple[float, int]]] = {}
+        self.trigramas: Dict[str, Set[str]] = {}
+        self._terminos_cortos: Dict[str, List[str]] = {}
+        # Postings y trigramas compartidos con el índice del que se copió
+        self._compartidos: Set[str] = set()
+        self._trigramas_compartidos: Set[str] = set()
+        self.mapeado = False
+
+        por_precio = []
+        for slot, producto in enumerate(productos):
+            self.productos.append(producto)
+            self.slots[producto.get('id')] = slot
+            # Atributos etiquetados una sola vez por carga del catálogo
+            self.mascaras.append(self.reglas.mascara_producto(producto))
+            por_precio.append((producto['precio'], slot))
+
+            for termino in set(normalizar_nombre(producto['nombre']).split()):
+                postings = self.terminos.get(termino)
+                if postings is None:
+                    self.terminos[termino] = [(producto['precio'], slot)]
+                    for trigrama in _trigramas(termino):
+                        self.trigramas.setdefault(trigrama, set()).add(termino)
+                else:
+                    postings.append((producto['precio'], slot))
+
+        por_precio.sort()
+        for lista in self.terminos.values():
+            lista.sort()
+        self.por_precio: List[Tuple[float, int]] = por_precio
+
+        # Bitmaps sobre la posición en el orden por precio
+        total = len(por_precio)
+        posiciones_categoria: Dict[str, List[int]] = {}
+        posiciones_atributo: Dict[str, List[int]] = {atributo: [] for atributo in self.reglas.bits}
+        for posicion, (_, slot) in enumerate(por_precio):
+            categoria = self.productos[slot]['categoria_nombre'].lower()
+            posiciones_categoria.setdefault(categoria, []).append(posicion)
+            mascara = self.mascaras[slot]
+            if mascara:
+                for atributo, bit in self.reglas.bits.items():
+                    if mascara & bit:
+                        posiciones_atributo[atributo].append(posicion)
+
+        self.categorias: Dict[str, int] = {categoria: _bitmap(posiciones, total)
+                                           for categoria, posiciones in posiciones_categoria.items()}
+        self.atributos: Dict[str, int] = {atributo: _bitmap(posiciones, total)
+                                          for atributo, posiciones in posiciones_atributo.items()}
+
+    def __len__(self):
+        return len(self.por_precio)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """
+        Entradas y bytes aproximados de cada estructura. Los registros de
+        productos son los del catálogo: aquí cuentan solo como referencias.
+        Un índice mapeado reporta aparte los bytes del mapa, compartidos con
+        los demás procesos
+        """
+        if self.mapeado:
+            bytes_mapeados = {
+                'terminos': self.terminos.nbytes,
+                'trigramas': self.trigramas.nbytes,
+                'por_precio': self.por_precio.nbytes,
+                'bitmaps': self.categorias.nbytes + self.atributos.nbytes,
+                'mascaras': self.mascaras.nbytes,
+                'productos': self.productos.nbytes
+            }
+            bytes_aproximados = {}
+            postings = self.terminos.postings
+        else:
+            bytes_mapeados = {}
+            bytes_aproximados = {
+                'terminos': tamano_muestreado(self.terminos),
+                'trigramas': tamano_muestreado(self.trigramas),
+                'por_precio': tamano_muestreado(self.por_precio),
+                'bitmaps': tamano_profundo(self.categorias) + tamano_profundo(self.atributos),
+                'mascaras': tamano_muestreado(self.mascaras),
+                'slots': tamano_muestreado(self.slots),
+                'productos': sys.getsizeof(self.productos)
+            }
+            postings = sum(len(postings) for postings in self.terminos.values())
+        return {
+            'productos': len(self),
+            'slots_vacios': len(self.productos) - len(self),
+            'terminos': len(self.terminos),
+            'postings': postings,
+            'trigramas': len(self.trigramas),
+            'categorias': len(self.categorias),
+            'atributos': len(self.atributos),
+            'mapeado': self.mapeado,
+            'bytes_aproximados': sum(bytes_aproximados.values()),
+            'bytes_por_estructura': bytes_aproximados,
+            'bytes_mapeados': sum(bytes_mapeados.values()),
+            'bytes_mapeados_por_estructura': bytes_mapeados
+        }
+
+    # --- Cambios incrementales ------------------------------------------
+
+    def copiar(self) -> 'IndiceBusqueda':
+        """
+        Copia para aplicar un refresco incremental sin tocar este índice: las
+        listas de postings y los conjuntos de trigramas se comparten hasta
+        que la copia los modifica. No aplica a un índice mapeado
+        """
+        if self.mapeado:
+            raise TypeError("un índice mapeado es de solo lectura")
+        copia = IndiceBusqueda.__new__(IndiceBusqueda)
+        copia.reglas = self.reglas
+        copia.productos = list(self.productos)
+        copia.mascaras = list(self.mascaras)
+        copia.slots = dict(self.slots)
+        copia.terminos = dict(self.terminos)
+        copia.trigramas = dict(self.trigramas)
+        copia._terminos_cortos = dict(self._terminos_cortos)
+        copia._compartidos = set(self.terminos)
+        copia._trigramas_compartidos = set(self.trigramas)
+        copia.por_precio = list(self.por_precio)
+        copia.categorias = dict(self.categorias)
+        copia.atributos = dict(self.atributos)
+        copia.mapeado = False
+        return copia
+
+    # --- Persistencia -----------------------------------------------------
+
+    @staticmethod
+    def huella_reglas(reglas: ReglasAtributos) -> int:
+        """Identifica las reglas con que se calcularon máscaras y bitmaps"""
+        return zlib.crc32(json.dumps(reglas.reglas, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+
+    @classmethod
+    def desde_partes(cls, partes: Dict[str, Any], huella_reglas: int, reglas: Optional[ReglasAtributos] = None,
+                     mapeado: bool = False) -> Optional['IndiceBusqueda']:
+        """
+        Índice guardado en disco, a partir de sus estructuras ya leídas
+        (``productos``, ``mascaras``, ``slots``, ``terminos``, ``trigramas``,
+        ``por_precio``, ``categorias`` y ``atributos``; ver catalogo_mapeado).
+        Retorna None si las reglas de atributos cambiaron desde entonces.
+        """
+        reglas = reglas or ReglasAtributos()
+        if huella_reglas != cls.huella_reglas(reglas):
+            return None
+
+        indice = cls.__new__(cls)
+        indice.reglas = reglas
+        indice.productos = partes['productos']
+        indice.mascaras = partes['mascaras']
+        indice.slots = partes['slots']
+        indice.terminos = partes['terminos']
+        indice.trigramas = partes['trigramas']
+        indice._terminos_cortos = {}
+        indice._compartidos = set()
+        indice._trigramas_compartidos = set()
+        indice.por_precio = partes['por_precio']
+        indice.categorias = partes['categorias']
+        indice.atributos = partes['atributos']
+        indice.mapeado = mapeado
+        return indice
+
+    def _postings_propios(self, termino: str) -> List[Tuple[float, int]]:
+        postings = self.terminos[termino]
+        if termino in self._compartidos:
+            postings = self.terminos[termino] = list(postings)
+            self._compartidos.discard(termino)
+        return postings
+
+    def _agregar_trigramas(self, termino: str):
+        for trigrama in _trigramas(termino):
+            terminos = self.trigramas.get(trigrama)
+            if terminos is None:
+                self.trigramas[trigrama] = {termino}
+                self._trigramas_compartidos.discard(trigrama)
+                continue
+            if trigrama in self._trigramas_compartidos:
+                terminos = self.trigramas[trigrama] = set(terminos)
+                self._trigramas_compartidos.discard(trigrama)
+            terminos.add(termino)
+
+    def _quitar_trigramas(self, termino: str):
+        for trigrama in _trigramas(termino):
+            terminos = self.trigramas[trigrama]
+            if len(terminos) == 1:
+                del self.trigramas[trigrama]
+                continue
+            if trigrama in self._trigramas_compartidos:
+                terminos = self.trigramas[trigrama] = set(terminos)
+                self._trigramas_compartidos.discard(trigrama)
+            terminos.discard(termino)
+
+    def producto(self, id_producto: Any) -> Optional[Dict]:
+        """Registro indexado con ese id, si existe"""
+        slot = self.slots.get(id_producto)
+        return self.productos[slot] if slot is not None else None
+
+    def agregar(self, producto: Dict):
+        """
+        Indexa un producto nuevo (o la versión nueva de uno existente) en un
+        slot al final, sin reconstruir el resto del índice
+        """
+        self.eliminar(producto.get('id'))
+
+        slot = len(self.productos)
+        precio = producto['precio']
+        self.productos.append(producto)
+        self.mascaras.append(self.reglas.mascara_producto(producto))
+        self.slots[producto.get('id')] = slot
+
+        for termino in set(normalizar_nombre(producto['nombre']).split()):
+            if termino not in self.terminos:
+                self.terminos[termino] = [(precio, slot)]
+                self._compartidos.discard(termino)
+                self._agregar_trigramas(termino)
+                self._terminos_cortos.clear()
+            else:
+                insort(self._postings_propios(termino), (precio, slot))
+
+        posicion = bisect_left(self.por_precio, (precio, slot))
+        self.por_precio.insert(posicion, (precio, slot))
+
+        # Abrir el bit de la posición en todos los bitmaps y encenderlo en
+        # los que corresponden al producto
+        categoria = producto['categoria_nombre'].lower()
+        mascara = self.mascaras[slot]
+        self.categorias.setdefault(categoria, 0)
+        for nombre, bitmap in self.categorias.items():
+            self.categorias[nombre] = _insertar_bit(bitmap, posicion, nombre == categoria)
+        for atributo, bitmap in self.atributos.items():
+            self.atributos[atributo] = _insertar_bit(bitmap, posicion,
+                                                     bool(mascara & self.reglas.bits[atributo]))
+
+    def eliminar(self, id_producto: Any) -> bool:
+        """Quita un producto del índice; retorna False si no estaba"""
+        slot = self.slots.pop(id_producto, None)
+        if slot is None:
+            return False
+
+        producto = self.productos[slot]
+        par = (producto['precio'], slot)
+        self.productos[slot] = None
+        self.mascaras[slot] = 0
+
+        for termino in set(normalizar_nombre(producto['nombre']).split()):
+            postings = self.terminos[termino]
+            if len(postings) == 1:
+                del self.terminos[termino]
+                self._quitar_trigramas(termino)
+                self._terminos_cortos.clear()
+            else:
+                postings = self._postings_propios(termino)
+                del postings[bisect_left(postings, par)]
+
+        posicion = bisect_left(self.por_precio, par)
+        del self.por_precio[posicion]
+
+        for nombre, bitmap in self.categorias.items():
+            self.categorias[nombre] = _quitar_bit(bitmap, posicion)
+        for atributo, bitmap in self.atributos.items():
+            self.atributos[atributo] = _quitar_bit(bitmap, posicion)
+        return True
+
+    # --- Consultas --------------------------------------------------------
+
+    @staticmethod
+    def rango_precio(lista: List[Tuple[float, int]], minimo: Optional[float],
+                     maximo: Optional[float]) -> Tuple[int, int]:
+        """
+        Intervalo [inicio, fin) de una lista ordenada por precio con
+        minimo <= precio <= maximo. Un límite vacío o cero no filtra, como en
+        las búsquedas originales.
+        """
+        inicio = bisect_left(lista, (minimo, -1)) if minimo else 0
+        fin = bisect_right(lista, (maximo, _INFINITO)) if maximo else len(lista)
+        return inicio, fin
+
+    def _terminos_que_contienen(self, palabra: str) -> List[str]:
+        """Términos del índice que contienen la palabra como subcadena"""
+        if len(palabra) < 3:
+            # Sin trigramas posibles: se recorren los términos (no los
+            # productos) y se recuerda el resultado
+            encontrados = self._terminos_cortos.get(palabra)
+            if encontrados is None:
+                encontrados = [termino for termino in self.terminos if palabra in termino]
+                self._terminos_cortos[palabra] = encontrados
+            return encontrados
+
+        candidatos = None
+        for trigrama in sorted(_trigramas(palabra), key=lambda t: len(self.trigramas.get(t, ()))):
+            terminos = self.trigramas.get(trigrama)
+            if not terminos:
+                return []
+            candidatos = set(terminos) if candidatos is None else candidatos.intersection(terminos)
+            if not candidatos:
+                return []
+
+        if self.mapeado:
+            # Los trigramas mapeados guardan posiciones en la tabla de términos
+            candidatos = map(self.terminos.nombre, candidatos)
+        return [termino for termino in candidatos if palabra in termino]
+
+    def por_texto(self, texto: str, minimo: Optional[float] = None,
+                  maximo: Optional[float] = None) -> Iterator[Tuple[float, int]]:
+        """
+        Productos (precio, slot) en orden de precio, sin repetir, cuyo nombre
+        normalizado contiene alguna palabra del texto normalizado (o el texto
+        completo), dentro del rango de precio
+        """
+        normalizado = normalizar_nombre(texto)
+        if not normalizado:
+            return self.en_rango(self.por_precio, minimo, maximo)
+
+        terminos = set()
+        for palabra in normalizado.split():
+            terminos.update(self._terminos_que_contienen(palabra))
+
+        listas = [self.en_rango(self.terminos[termino], minimo, maximo) for termino in terminos]
+        if len(listas) == 1:
+            return listas[0]
+        return self._sin_repetir(merge(*listas))
+
+    @staticmethod
+    def _sin_repetir(pares: Iterator[Tuple[float, int]]) -> Iterator[Tuple[float, int]]:
+        # Un producto con varios términos coincidentes llega una vez por
+        # lista, siempre en posiciones contiguas de la mezcla
+        anterior = None
+        for par in pares:
+            if par != anterior:
+                yield par
+                anterior = par
+
+    def bitmap_rango(self, minimo: Optional[float], maximo: Optional[float]) -> int:
+        """Bits de los productos con minimo <= precio <= maximo"""
+        inicio, fin = self.rango_precio(self.por_precio, minimo, maximo)
+        if inicio >= fin:
+            return 0
+        return ((1 << (fin - inicio)) - 1) << inicio
+
+    def bitmap_categoria(self, categoria: str) -> int:
+        """Bits de las categorías que contienen a la buscada o están contenidas en ella"""
+        buscada = categoria.lower()
+        bitmap = 0
+        # Solo se leen los bitmaps que coinciden (en un índice mapeado cada
+        # lectura convierte bytes a entero)
+        for nombre in self.categorias:
+            if buscada in nombre or nombre in buscada:
+                bitmap |= self.categorias[nombre]
+        return bitmap
+
+    def bitmap_atributos(self, atributos: Iterable[str]) -> int:
+        """Bits de los productos que cumplen alguno de los atributos"""
+        bitmap = 0
+        for atributo in atributos:
+            bitmap |= self.atributos.get(atributo, 0)
+        return bitmap
+
+    def recorrer(self, bitmap: int) -> Iterator[Tuple[float, int]]:
+        """Productos (precio, slot) de un bitmap, en orden de precio"""
+        if self.mapeado:
+            return self.por_precio.en_posiciones(posiciones_bitmap(bitmap))
+        return map(self.por_precio.__getitem__, posiciones_bitmap(bitmap))
+
+    def en_rango(self, lista: List[Tuple[float, int]], minimo: Optional[float],
+                 maximo: Optional[float]) -> Iterator[Tuple[float, int]]:
+        """
+        Elementos de una lista ordenada por precio dentro del rango, sin
+        copiarla: quien solo necesita los primeros no paga por el resto
+        """
+        inicio, fin = self.rango_precio(lista, minimo, maximo)
+        if self.mapeado:
+            return lista.rango(inicio, fin)
+        return map(lista.__getitem__, range(inicio, fin))
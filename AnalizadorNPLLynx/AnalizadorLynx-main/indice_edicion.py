@@ -0,0 +1,94 @@
+# indice_edicion.py
+"""
+Índice de borrado simétrico (SymSpell) para buscar palabras a distancia de
+edición acotada.
+
+Cada palabra del vocabulario se registra bajo todas las variantes que se
+obtienen borrándole hasta ``max_distancia`` caracteres de su prefijo. Al
+consultar se generan los mismos borrados sobre la palabra buscada y solo se
+verifica la distancia real contra las palabras que comparten alguna
+variante, de modo que el costo de una búsqueda depende de la longitud de la
+palabra y no del tamaño del vocabulario.
+"""
+from typing import Dict, Iterable, List, Set, Tuple
+
+from distancia_edicion import distancias_lote
+
+
+class IndiceEdicion:
+    """Diccionario de borrados simétricos con verificación de distancia"""
+
+    def __init__(self, max_distancia: int = 2, longitud_prefijo: int = 7,
+                 palabras: Iterable[str] = ()):
+        self.max_distancia = max_distancia
+        # Solo se indexan los borrados del prefijo: acota la memoria sin perder
+        # candidatos, ya que dos palabras a distancia <= max_distancia siguen
+        # compartiendo algún borrado de sus prefijos
+        self.longitud_prefijo = max(longitud_prefijo, max_distancia + 1)
+        self.borrados: Dict[str, List[str]] = {}
+        self.palabras: Set[str] = set()
+
+        for palabra in palabras:
+            self.agregar(palabra)
+
+    def __len__(self):
+        return len(self.palabras)
+
+    def __contains__(self, palabra: str) -> bool:
+        return palabra in self.palabras
+
+    def _variantes(self, palabra: str) -> Set[str]:
+        """Prefijo de la palabra y todos sus borrados hasta max_distancia"""
+        prefijo = palabra[:self.longitud_prefijo]
+        variantes = {prefijo}
+        frontera = {prefijo}
+
+        for _ in range(self.max_distancia):
+            siguiente = set()
+            for variante in frontera:
+                for i in range(len(variante)):
+                    borrado = variante[:i] + variante[i + 1:]
+                    if borrado not in variantes:
+                        siguiente.add(borrado)
+            variantes |= siguiente
+            frontera = siguiente
+
+        return variantes
+
+    def agregar(self, palabra: str):
+        """Registra una palabra; las repetidas se ignoran"""
+        if palabra in self.palabras:
+            return
+        self.palabras.add(palabra)
+
+        for variante in self._variantes(palabra):
+            palabras = self.borrados.get(variante)
+            if palabras is None:
+                self.borrados[variante] = [palabra]
+            else:
+                palabras.append(palabra)
+
+    def candidatos(self, palabra: str) -> List[Tuple[str, int]]:
+        """
+        Palabras del índice a distancia menor o igual a max_distancia,
+        como pares (palabra, distancia)
+        """
+        max_distancia = self.max_distancia
+        longitud = len(palabra)
+        vistos = set()
+        por_verificar = []
+
+        for variante in self._variantes(palabra):
+            for candidato in self.borrados.get(variante, ()):
+                if candidato in vistos:
+                    continue
+                vistos.add(candidato)
+
+                # Filtro barato: la diferencia de longitudes acota la distancia
+                if abs(len(candidato) - longitud) <= max_distancia:
+                    por_verificar.append(candidato)
+
+        distancias = distancias_lote(palabra, por_verificar, max_distancia)
+        return [(candidato, distancia)
+                for candidato, distancia in zip(por_verificar, distancias)
+                if distancia <= max_distancia]
@@ -0,0 +1,41 @@
+# indice_frases.py
+"""
+Trie sobre frases de productos.
+
+Cada nodo guarda sus hijos por carácter y, si termina una frase, su índice
+en ``frases``. AFDMultipalabra deriva de él las tablas de su autómata.
+"""
+from typing import Iterable, List
+
+SIN_FRASE = -1
+
+
+class IndiceFrases:
+    """Trie sobre frases en minúsculas"""
+
+    def __init__(self, frases: Iterable[str]):
+        self.frases: List[str] = []
+        self.hijos: List[dict] = [{}]
+        self.salida: List[int] = [SIN_FRASE]
+
+        for frase in frases:
+            self._insertar(frase)
+
+    def __len__(self):
+        return len(self.frases)
+
+    def _insertar(self, frase: str):
+        """Agrega una frase al trie (las repetidas se ignoran)"""
+        nodo = 0
+        for caracter in frase.lower():
+            siguiente = self.hijos[nodo].get(caracter)
+            if siguiente is None:
+                siguiente = len(self.hijos)
+                self.hijos.append({})
+                self.salida.append(SIN_FRASE)
+                self.hijos[nodo][caracter] = siguiente
+            nodo = siguiente
+
+        if nodo and self.salida[nodo] == SIN_FRASE:
+            self.salida[nodo] = len(self.frases)
+            self.frases.append(frase)
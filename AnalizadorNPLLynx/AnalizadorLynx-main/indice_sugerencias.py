@@ -0,0 +1,332 @@
+# indice_sugerencias.py
+"""
+Autocompletado por prefijo sobre el catálogo, ordenado por popularidad.
+
+``SistemaLCLNSimplificado.obtener_sugerencias`` recorría todos los productos
+y todos los sinónimos buscando la subcadena y ordenaba alfabéticamente cada
+coincidencia, en cada tecla. El índice de sugerencias se arma una vez por
+instantánea del catálogo:
+
+- las entradas son los nombres de los productos disponibles, las categorías
+  y los sinónimos de ``producto_sinonimos``, normalizados (minúsculas, sin
+  acentos ni guiones) y sin repetir texto;
+- cada entrada pesa las unidades vendidas (``detallepedido``) de su
+  producto; una categoría, las de todos sus productos. Las entradas se
+  numeran de la más a la menos popular, así que su número es su rango;
+- cada entrada aparece en un arreglo ordenado una vez por cada palabra, con
+  el texto desde esa palabra (``"cola"`` encuentra ``"coca cola 600ml"``):
+  un prefijo es un rango contiguo que se ubica con ``bisect``;
+- un árbol de segmentos sobre ese arreglo da la posición de menor rango de
+  cualquier subrango, y los ``limite`` más populares salen de partir el
+  rango alrededor de cada mínimo (O(limite · log n)), sin recorrer las
+  coincidencias aunque el prefijo sea una sola letra.
+
+Las claves se recortan a ``LONGITUD_CLAVE`` caracteres para acotar la
+memoria; un prefijo más largo se verifica contra el texto completo.
+
+``SugerenciasCatalogo`` reconstruye el índice en segundo plano cuando se
+publica otra versión del catálogo o vence la popularidad, y sigue
+respondiendo con el anterior mientras tanto.
+"""
+import gc
+import os
+import threading
+import time
+import unicodedata
+import weakref
+from array import array
+from bisect import bisect_left
+from heapq import heappop, heappush
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import mysql.connector
+
+from almacen_catalogo import AlmacenCatalogo, InstantaneaCatalogo
+from pool_conexiones import pool_mysql
+from refresco_catalogo import RefrescadorCatalogo
+
+# Caracteres de cada clave del arreglo ordenado
+LONGITUD_CLAVE = 32
+# Palabras de una entrada desde las que se puede completar
+MAX_PALABRAS = 8
+_FIN_PREFIJO = '\U0010ffff'
+# Valor de las hojas de relleno del árbol de segmentos
+_CENTINELA = (1 << 63) - 1
+
+_CONSULTA_VENTAS = """
+    SELECT id_producto, SUM(cantidad) AS unidades
+    FROM detallepedido
+    GROUP BY id_producto
+"""
+
+# Prioridad del tipo cuando dos entradas quedan con el mismo texto
+_TIPOS = ('producto', 'categoria', 'sinonimo')
+
+
+def normalizar_sugerencia(texto: str) -> str:
+    """Minúsculas, sin acentos, guiones ni espacios repetidos"""
+    texto = texto.lower().replace('-', ' ')
+    if not texto.isascii():
+        texto = ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+    return ' '.join(texto.split())
+
+
+class IndiceSugerencias:
+    """Entradas por prefijo de cualquiera de sus palabras, por popularidad"""
+
+    def __init__(self, entradas: Iterable[Tuple[str, str, Any, int]]):
+        """
+        ``entradas``: tuplas (texto, tipo, id, peso). Con textos repetidos
+        tras normalizar queda el de mayor prioridad de tipo y el mayor peso.
+        """
+        unicas: Dict[str, List] = {}
+        for texto, tipo, identificador, peso in entradas:
+            if not texto:
+                continue
+            normalizado = normalizar_sugerencia(texto)
+            if not normalizado:
+                continue
+            actual = unicas.get(normalizado)
+            if actual is None:
+                unicas[normalizado] = [texto, tipo, identificador, peso]
+            else:
+                if _TIPOS.index(tipo) < _TIPOS.index(actual[1]):
+                    actual[:3] = texto, tipo, identificador
+                actual[3] = max(actual[3], peso)
+
+        # El número de cada entrada es su rango: más peso, texto más corto,
+        # orden alfabético
+        ordenadas = sorted(unicas.items(), key=lambda item: (-item[1][3], len(item[0]), item[0]))
+        self.normalizados: List[str] = [normalizado for normalizado, _ in ordenadas]
+        self.entradas: List[Tuple] = [tuple(entrada) for _, entrada in ordenadas]
+
+        claves: List[str] = []
+        numeros: List[int] = []
+        inicios: List[int] = []
+        for numero, normalizado in enumerate(self.normalizados):
+            # Una clave desde el inicio de cada una de las primeras palabras
+            inicio = 0
+            for palabra in normalizado.split(' ', MAX_PALABRAS - 1):
+                claves.append(normalizado[inicio:inicio + LONGITUD_CLAVE])
+                numeros.append(numero)
+                inicios.append(inicio)
+                inicio += len(palabra) + 1
+        # Orden estable: con claves iguales queda primero la entrada más popular
+        orden = sorted(range(len(claves)), key=claves.__getitem__)
+        self.claves: List[str] = [claves[posicion] for posicion in orden]
+        self._inicios = array('l', [inicios[posicion] for posicion in orden])
+
+        # Árbol de segmentos con tantas hojas como la potencia de dos
+        # siguiente: la hoja de la posición i está en hojas + i y guarda
+        # número * hojas + i, de modo que el mínimo de un nodo da a la vez el
+        # número más popular debajo y su posición. Cada nivel se arma con
+        # ``map(min, ...)`` sobre el nivel de abajo
+        total = len(orden)
+        hojas = 1 << max(total - 1, 0).bit_length()
+        arbol = array('q', [_CENTINELA]) * (2 * hojas)
+        arbol[hojas:hojas + total] = array('q', [numeros[posicion] * hojas + hoja
+                                                  for hoja, posicion in enumerate(orden)])
+        nivel = hojas
+        while nivel > 1:
+            arbol[nivel >> 1:nivel] = array('q', map(min, arbol[nivel:2 * nivel:2], arbol[nivel + 1:2 * nivel:2]))
+            nivel >>= 1
+        self._hojas = hojas
+        self._arbol = arbol
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def _minimo(self, inicio: int, fin: int) -> Tuple[int, int, int, int]:
+        """(número, posición, inicio, fin) del menor número en [inicio, fin)"""
+        arbol = self._arbol
+        hojas = self._hojas
+        mejor = _CENTINELA
+        izquierda = inicio + hojas
+        derecha = fin + hojas
+        while izquierda < derecha:
+            if izquierda & 1:
+                if arbol[izquierda] < mejor:
+                    mejor = arbol[izquierda]
+                izquierda += 1
+            if derecha & 1:
+                derecha -= 1
+                if arbol[derecha] < mejor:
+                    mejor = arbol[derecha]
+            izquierda >>= 1
+            derecha >>= 1
+        numero, posicion = divmod(mejor, hojas)
+        return numero, posicion, inicio, fin
+
+    def sugerir(self, consulta: str, limite: int = 10) -> List[Dict[str, Any]]:
+        """Las ``limite`` entradas más populares con una palabra que empieza con ``consulta``"""
+        prefijo = normalizar_sugerencia(consulta)
+        if not prefijo or limite <= 0 or not self.claves:
+            return []
+
+        clave = prefijo[:LONGITUD_CLAVE]
+        inicio = bisect_left(self.claves, clave)
+        fin = bisect_left(self.claves, clave + _FIN_PREFIJO, inicio)
+        if inicio == fin:
+            return []
+
+        largo = len(prefijo) > LONGITUD_CLAVE
+        elegidos: List[int] = []
+        vistos = set()
+        pendientes = [self._minimo(inicio, fin)]
+        while pendientes and len(elegidos) < limite:
+            numero, posicion, desde, hasta = heappop(pendientes)
+            if numero not in vistos and (
+                    not largo or self.normalizados[numero].startswith(prefijo, self._inicios[posicion])):
+                vistos.add(numero)
+                elegidos.append(numero)
+            if desde < posicion:
+                heappush(pendientes, self._minimo(desde, posicion))
+            if posicion + 1 < hasta:
+                heappush(pendientes, self._minimo(posicion + 1, hasta))
+
+        resultado = []
+        for numero in elegidos:
+            texto, tipo, identificador, peso = self.entradas[numero]
+            resultado.append({'texto': texto, 'tipo': tipo, 'id': identificador, 'popularidad': peso})
+        return resultado
+
+    @classmethod
+    def desde_instantanea(cls, instantanea: InstantaneaCatalogo,
+                          ventas: Optional[Dict[Any, int]] = None) -> 'IndiceSugerencias':
+        """Índice de los productos disponibles, sus categorías y sinónimos"""
+        ventas = ventas or {}
+        por_categoria: Dict[str, int] = {}
+        entradas = []
+        for producto in instantanea.por_nombre.values():
+            peso = ventas.get(producto['id'], 0)
+            entradas.append((producto['nombre'], 'producto', producto['id'], peso))
+            categoria = producto['categoria_nombre'].lower()
+            por_categoria[categoria] = por_categoria.get(categoria, 0) + peso
+            for sinonimo in instantanea.sinonimos.get(producto['id'], ()):
+                entradas.append((sinonimo, 'sinonimo', producto['id'], peso))
+        for clave, categoria in instantanea.categorias.items():
+            entradas.append((categoria['nombre'], 'categoria', categoria['id'], por_categoria.get(clave, 0)))
+
+        # Millones de cadenas y tuplas sin ciclos: el recolector no tiene
+        # nada que liberar y recorrerlas repetidas veces alarga la construcción
+        recolector_activo = gc.isenabled()
+        gc.disable()
+        try:
+            return cls(entradas)
+        finally:
+            if recolector_activo:
+                gc.enable()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {'entradas': len(self.entradas), 'claves': len(self.claves)}
+
+
+def cargar_ventas(mysql_config: Dict) -> Dict[Any, int]:
+    """Unidades vendidas por producto; vacío si la tabla no existe"""
+    with pool_mysql(mysql_config).obtener() as conexion:
+        cursor = conexion.cursor(dictionary=True)
+        try:
+            cursor.execute(_CONSULTA_VENTAS)
+            return {fila['id_producto']: int(fila['unidades'] or 0) for fila in cursor.fetchall()}
+        except mysql.connector.Error as e:
+            print(f"[SUGERENCIAS] Sin ventas para la popularidad: {e}")
+            return {}
+        finally:
+            cursor.close()
+
+
+class SugerenciasCatalogo:
+    """Índice de sugerencias vigente para un almacén, reconstruido en segundo plano"""
+
+    def __init__(self, almacen: AlmacenCatalogo, popularidad_segundos: float = 600.0,
+                 reintento_segundos: float = 30.0, reloj=time.monotonic):
+        self.almacen = almacen
+        self.popularidad_segundos = popularidad_segundos
+        self._reloj = reloj
+        self._indice: Optional[IndiceSugerencias] = None
+        self._instantanea: Optional[InstantaneaCatalogo] = None
+        self._ventas: Dict[Any, int] = {}
+        self._ventas_cargadas: Optional[float] = None
+        self.construccion_ms: Optional[float] = None
+        self.refrescador = RefrescadorCatalogo('sugerencias', self._reconstruir, popularidad_segundos,
+                                               reintento_segundos, reloj)
+
+    @property
+    def listo(self) -> bool:
+        """True si ya hay un índice para responder sin esperar"""
+        return self._indice is not None
+
+    @property
+    def version(self) -> Optional[int]:
+        """Versión del catálogo con la que se armó el índice vigente"""
+        return self._instantanea.version if self._instantanea is not None else None
+
+    def _ventas_vencidas(self) -> bool:
+        return (self._ventas_cargadas is None or
+                self._reloj() - self._ventas_cargadas >= self.popularidad_segundos)
+
+    def asegurar(self):
+        """
+        La primera construcción hace esperar; después, con otra versión del
+        catálogo o la popularidad vencida, se pide la reconstrucción y se
+        sigue respondiendo con el índice actual
+        """
+        if self._indice is None:
+            self.refrescador.refrescar(esperar=True)
+        elif self._instantanea is not self.almacen.instantanea or self._ventas_vencidas():
+            self.refrescador.solicitar()
+
+    def _reconstruir(self) -> str:
+        instantanea = self.almacen.actual()
+        modalidad = 'catalogo'
+        if self._ventas_vencidas():
+            try:
+                self._ventas = cargar_ventas(self.almacen.mysql_config)
+            except Exception as e:
+                # Sin popularidad nueva se ordena con la anterior
+                print(f"[SUGERENCIAS] Error cargando ventas: {e}")
+            self._ventas_cargadas = self._reloj()
+            modalidad = 'popularidad'
+        elif instantanea is self._instantanea:
+            return 'sin_cambios'
+
+        inicio = time.perf_counter()
+        indice = IndiceSugerencias.desde_instantanea(instantanea, self._ventas)
+        self.construccion_ms = round((time.perf_counter() - inicio) * 1000, 2)
+        self._indice, self._instantanea = indice, instantanea
+        print(f"[SUGERENCIAS] Índice v{instantanea.version} ({modalidad}): {len(indice)} entradas, "
+              f"{len(indice.claves)} claves en {self.construccion_ms} ms")
+        return modalidad
+
+    def sugerir(self, consulta: str, limite: int = 10) -> List[Dict[str, Any]]:
+        """Sugerencias de autocompletado para lo que se lleva escrito"""
+        self.asegurar()
+        indice = self._indice
+        return indice.sugerir(consulta, limite) if indice is not None else []
+
+    def estadisticas(self) -> Dict[str, Any]:
+        indice = self._indice
+        return {
+            'catalogo_version': self.version,
+            'productos_con_ventas': len(self._ventas),
+            'construccion_ms': self.construccion_ms,
+            **(indice.estadisticas() if indice is not None else {'entradas': 0, 'claves': 0}),
+            'refresco': self.refrescador.estadisticas()
+        }
+
+
+_sugerencias: 'weakref.WeakKeyDictionary[AlmacenCatalogo, SugerenciasCatalogo]' = weakref.WeakKeyDictionary()
+_lock_sugerencias = threading.Lock()
+
+
+def sugerencias_catalogo(almacen: AlmacenCatalogo) -> SugerenciasCatalogo:
+    """
+    Índice de sugerencias único por almacén en el proceso; las ventas se
+    vuelven a leer cada ``LCLN_POPULARIDAD_SEGUNDOS`` (600 por defecto)
+    """
+    with _lock_sugerencias:
+        sugerencias = _sugerencias.get(almacen)
+        if sugerencias is None:
+            sugerencias = _sugerencias[almacen] = SugerenciasCatalogo(
+                almacen, popularidad_segundos=float(os.getenv('LCLN_POPULARIDAD_SEGUNDOS', 600)))
+        return sugerencias
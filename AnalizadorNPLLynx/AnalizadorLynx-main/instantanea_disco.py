@@ -0,0 +1,176 @@
+# instantanea_disco.py
+"""
+Copia en disco del catálogo publicado, para arrancar sin esperar a MySQL.
+
+El archivo es una cabecera fija y un contenido con dos partes:
+
+- los datos chicos (marcas del refresco, categorías, sinónimos)
+  serializados con ``marshal``, mucho más rápido que JSON o pickle para
+  tipos simples y sin ejecutar código al leer;
+- las *secciones*: columnas ``array`` de tipo fijo (ver catalogo_mapeado),
+  cada una alineada a 8 bytes, con su tipo y posición anotados en la parte
+  marshal.
+
+El formato de ``marshal`` depende de la versión de Python y el de las
+columnas del orden de bytes de la máquina: la cabecera registra la versión
+junto con la longitud y el CRC32 del contenido, y un archivo de otra
+versión, de otra arquitectura, truncado o corrupto se ignora.
+
+- ``escribir_instantanea`` escribe en un temporal del mismo directorio, lo
+  sincroniza y lo renombra sobre el anterior: quien lee ve el archivo viejo
+  completo o el nuevo completo, nunca uno a medias;
+- ``leer_instantanea`` mapea el archivo en memoria (``mmap``), decodifica la
+  parte marshal directamente desde el mapa y devuelve las secciones como
+  vistas ``memoryview`` sobre él, sin copiarlas. El mapa sigue abierto
+  mientras exista alguna vista: un archivo reemplazado conserva sus páginas
+  hasta que nadie lo usa. Durante la decodificación se pausa el recolector
+  de ciclos, que los contenedores recién creados disparaban sin que hubiera
+  nada que recolectar.
+"""
+import gc
+import marshal
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Any, Dict, Optional, Tuple
+
+_MAGICO = b'LCLNINS2'
+# mágico, versión de Python (mayor, menor), CRC32 y longitud del contenido
+_CABECERA = struct.Struct('<8sBBIQ')
+# Longitud de la parte marshal, al inicio del contenido
+_LONGITUD = struct.Struct('<Q')
+_ALINEACION = 8
+_VERSION_MARSHAL = 4
+
+
+def _relleno(longitud: int) -> bytes:
+    return bytes(-longitud % _ALINEACION)
+
+
+def escribir_instantanea(ruta: str, datos: Dict[str, Any], secciones: Optional[Dict[str, array]] = None) -> int:
+    """
+    Guarda ``datos`` y las columnas de ``secciones`` de forma atómica;
+    retorna los bytes escritos
+    """
+    secciones = secciones or {}
+    ubicaciones = {}
+    desplazamiento = 0
+    for nombre, columna in secciones.items():
+        ubicaciones[nombre] = (columna.typecode, desplazamiento, len(columna))
+        desplazamiento += columna.itemsize * len(columna)
+        desplazamiento += -desplazamiento % _ALINEACION
+    meta = marshal.dumps({'datos': datos, 'secciones': ubicaciones, 'orden_bytes': sys.byteorder},
+                         _VERSION_MARSHAL)
+
+    partes = [_LONGITUD.pack(len(meta)), meta, _relleno(_LONGITUD.size + len(meta))]
+    for columna in secciones.values():
+        contenido = memoryview(columna).cast('B')
+        partes.append(contenido)
+        partes.append(_relleno(len(contenido)))
+    crc = 0
+    longitud = 0
+    for parte in partes:
+        crc = zlib.crc32(parte, crc)
+        longitud += len(parte)
+    cabecera = _CABECERA.pack(_MAGICO, sys.version_info[0], sys.version_info[1], crc, longitud)
+
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(directorio, exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        with open(temporal, 'wb') as archivo:
+            archivo.write(cabecera)
+            for parte in partes:
+                archivo.write(parte)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+    return len(cabecera) + longitud
+
+
+def leer_instantanea(ruta: str) -> Optional[Tuple[Dict[str, Any], Dict[str, memoryview]]]:
+    """
+    Datos guardados en ``ruta`` y sus secciones como vistas sobre el mapa en
+    memoria, o None si no existe o no es utilizable
+    """
+    try:
+        archivo = open(ruta, 'rb')
+    except FileNotFoundError:
+        return None
+
+    with archivo:
+        try:
+            mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            # Archivo vacío o sistema de archivos sin mmap
+            print(f"[INSTANTANEA] No se pudo mapear {ruta}: {e}")
+            return None
+
+    leido = None
+    try:
+        leido = _leer_mapa(ruta, mapa)
+        return leido
+    finally:
+        if leido is None:
+            try:
+                mapa.close()
+            except BufferError:
+                # Queda alguna vista viva: el mapa se libera con ella
+                pass
+
+
+def _leer_mapa(ruta: str, mapa: mmap.mmap) -> Optional[Tuple[Dict[str, Any], Dict[str, memoryview]]]:
+    if len(mapa) < _CABECERA.size:
+        print(f"[INSTANTANEA] {ruta} incompleto, se ignora")
+        return None
+    magico, mayor, menor, crc, longitud = _CABECERA.unpack_from(mapa, 0)
+    if magico != _MAGICO or (mayor, menor) != sys.version_info[:2]:
+        print(f"[INSTANTANEA] {ruta} es de otro formato o versión de Python, se ignora")
+        return None
+    if len(mapa) != _CABECERA.size + longitud or longitud < _LONGITUD.size:
+        print(f"[INSTANTANEA] {ruta} incompleto, se ignora")
+        return None
+
+    contenido = memoryview(mapa)[_CABECERA.size:]
+    try:
+        if zlib.crc32(contenido) != crc:
+            print(f"[INSTANTANEA] {ruta} corrupto, se ignora")
+            return None
+        (longitud_meta,) = _LONGITUD.unpack_from(contenido, 0)
+        recolector_activo = gc.isenabled()
+        gc.disable()
+        try:
+            meta = marshal.loads(contenido[_LONGITUD.size:_LONGITUD.size + longitud_meta])
+        finally:
+            if recolector_activo:
+                gc.enable()
+        if meta['orden_bytes'] != sys.byteorder:
+            print(f"[INSTANTANEA] {ruta} es de otra arquitectura, se ignora")
+            return None
+
+        base = _LONGITUD.size + longitud_meta
+        base += -base % _ALINEACION
+        secciones = {}
+        for nombre, (tipo, desplazamiento, elementos) in meta['secciones'].items():
+            inicio = _CABECERA.size + base + desplazamiento
+            fin = inicio + array(tipo).itemsize * elementos
+            if fin > len(mapa):
+                raise ValueError(f"la sección {nombre} excede el archivo")
+            secciones[nombre] = memoryview(mapa)[inicio:fin].cast(tipo)
+        return meta['datos'], secciones
+    except (EOFError, ValueError, TypeError, KeyError) as e:
+        print(f"[INSTANTANEA] {ruta} ilegible: {e}")
+        return None
+    finally:
+        # Las secciones son vistas propias: esta se libera para que el mapa
+        # se pueda cerrar si la lectura falló
+        contenido.release()
@@ -1,4 +1,6 @@
 # interpretador_semantico.py
+from distancia_edicion import distancia, distancias_lote
+
 class InterpretadorSemantico:
     """
     Módulo para interpretar adjetivos y frases coloquiales
@@ -86,11 +88,11 @@ class InterpretadorSemantico:
             
             # Detectar intensificador previo
             factor_intensidad = 1.0
-            if i > 0 and tokens[i-1]['valor'].lower() in self.intensificadores:
-                factor_intensidad = self.intensificadores[tokens[i-1]['valor'].lower()]
+            if i > 0 and tokens[i-1].valor.lower() in self.intensificadores:
+                factor_intensidad = self.intensificadores[tokens[i-1].valor.lower()]
             
-            if token['tipo'] == 'PALABRA_GENERICA':
-                valor = token['valor'].lower().strip()
+            if token.tipo == 'PALABRA_GENERICA':
+                valor = token.valor.lower().strip()
                 
                 # Verificar si es precio cualitativo
                 if valor in self.mapeo_precios:
@@ -102,14 +104,14 @@ class InterpretadorSemantico:
                     elif precio_info['op'] == 'mayor_a':
                         precio_info['valor'] = precio_info['valor'] * factor_intensidad
                     
-                    token['tipo'] = 'FILTRO_PRECIO'
+                    token.tipo = 'FILTRO_PRECIO'
                     token['interpretacion'] = precio_info
                     interpretado = True
                 
                 # Verificar si es tamaño
                 elif valor in self.mapeo_tamanos:
                     tamano_info = self.mapeo_tamanos[valor].copy()
-                    token['tipo'] = 'FILTRO_TAMANO'
+                    token.tipo = 'FILTRO_TAMANO'
                     token['interpretacion'] = tamano_info
                     interpretado = True
                 
@@ -129,20 +131,20 @@ class InterpretadorSemantico:
                         }
                         
                         if valor in productos_especificos:
-                            token['tipo'] = 'PRODUCTO'
+                            token.tipo = 'PRODUCTO'
                             token['valor_original'] = valor
                             token['categoria_inferida'] = categoria
                         else:
-                            token['tipo'] = 'CATEGORIA'
+                            token.tipo = 'CATEGORIA'
                             token['valor_original'] = valor
-                            token['valor'] = categoria
+                            token.valor = categoria
                     else:
                         # Si no hay coincidencia exacta, intentar con búsqueda aproximada
                         categoria = self.buscar_categoria_similar_fuzzy(valor, umbral=2)
                         if categoria:
-                            token['tipo'] = 'CATEGORIA'
+                            token.tipo = 'CATEGORIA'
                             token['valor_original'] = valor
-                            token['valor'] = categoria
+                            token.valor = categoria
                             token['coincidencia_aproximada'] = True
             
             tokens_mejorados.append(token)
@@ -269,24 +271,7 @@ class InterpretadorSemantico:
     
     def distancia_levenshtein(self, a, b):
         """Calcula la distancia de edición entre cadenas a y b"""
-        if len(a) < len(b):
-            return self.distancia_levenshtein(b, a)
-            
-        if len(b) == 0:
-            return len(a)
-        
-        previous_row = range(len(b) + 1)
-        for i, c1 in enumerate(a):
-            current_row = [i + 1]
-            for j, c2 in enumerate(b):
-                # Calcular inserciones, eliminaciones y sustituciones
-                insertions = previous_row[j + 1] + 1
-                deletions = current_row[j] + 1
-                substitutions = previous_row[j] + (c1 != c2)
-                current_row.append(min(insertions, deletions, substitutions))
-            previous_row = current_row
-            
-        return previous_row[-1]
+        return distancia(a, b)
     
     def buscar_categoria_similar_fuzzy(self, palabra, umbral=2):
         """
@@ -313,11 +298,11 @@ class InterpretadorSemantico:
         mejor_coincidencia = None
         menor_distancia = float('inf')
         
-        # Buscar la palabra más cercana
-        for candidato in todas_palabras:
-            distancia = self.distancia_levenshtein(palabra, candidato)
-            if distancia <= umbral and distancia < menor_distancia:
-                menor_distancia = distancia
+        # Buscar la palabra más cercana (una sola llamada para todos los candidatos)
+        distancias = distancias_lote(palabra, todas_palabras, umbral)
+        for candidato, dist in zip(todas_palabras, distancias):
+            if dist <= umbral and dist < menor_distancia:
+                menor_distancia = dist
                 mejor_coincidencia = candidato
         
         # Si encontramos una coincidencia cercana, devolver su categoría
@@ -347,25 +332,25 @@ class InterpretadorSemantico:
         filtros_tamano = []
         
         for token in tokens_interpretados:
-            if token['tipo'] in ['PRODUCTO', 'PRODUCTO_SIMPLE']:  # AGREGAR PRODUCTO_SIMPLE
-                producto = token['valor']
+            if token.tipo in ['PRODUCTO', 'PRODUCTO_SIMPLE']:  # AGREGAR PRODUCTO_SIMPLE
+                producto = token.valor
                 # INFERIR CATEGORÍA AUTOMÁTICAMENTE basada en el producto
                 if not categoria:
-                    categoria_inferida = self.buscar_categoria_similar(token['valor'])
+                    categoria_inferida = self.buscar_categoria_similar(token.valor)
                     if categoria_inferida:
                         categoria = categoria_inferida
-            elif token['tipo'] == 'CATEGORIA':
-                categoria = token['valor']
+            elif token.tipo == 'CATEGORIA':
+                categoria = token.valor
                 # MANEJO ESPECIAL: Si la "categoría" es en realidad un producto específico como "papitas"
-                categoria_lower = token['valor'].lower().strip()
+                categoria_lower = token.valor.lower().strip()
                 if categoria_lower in ['papitas', 'papas', 'snacks'] and not producto:
                     # Convertir "papitas/papas" en producto específico para consulta de snacks similares
                     if categoria_lower in ['papitas', 'papas']:
                         producto = 'papitas'  # Tratar como producto específico
                         categoria = 'Snacks Salados'  # Asignar categoría correcta
-            elif token['tipo'] == 'FILTRO_PRECIO':
+            elif token.tipo == 'FILTRO_PRECIO':
                 filtros_precio.append(token['interpretacion'])
-            elif token['tipo'] == 'FILTRO_TAMANO':
+            elif token.tipo == 'FILTRO_TAMANO':
                 filtros_tamano.append(token['interpretacion'])
         
         # Generar SQL
@@ -395,11 +380,11 @@ class InterpretadorSemantico:
         confianza = 0.8  # Base
         
         # Bonificar si hay productos/categorías reconocidas
-        productos_encontrados = sum(1 for t in tokens if t['tipo'] in ['PRODUCTO', 'CATEGORIA'])
+        productos_encontrados = sum(1 for t in tokens if t.tipo in ['PRODUCTO', 'CATEGORIA'])
         confianza += productos_encontrados * 0.1
         
         # Bonificar filtros válidos
-        filtros_encontrados = sum(1 for t in tokens if 'FILTRO' in t['tipo'])
+        filtros_encontrados = sum(1 for t in tokens if 'FILTRO' in t.tipo)
         confianza += filtros_encontrados * 0.05
         
         return min(1.0, confianza)
@@ -410,11 +395,11 @@ class InterpretadorSemantico:
         where_conditions = []
         
         for token in tokens:
-            if token['tipo'] in ['PRODUCTO', 'PRODUCTO_SIMPLE']:  # AGREGAR PRODUCTO_SIMPLE
-                where_conditions.append(f"nombre LIKE '%{token['valor']}%'")
-            elif token['tipo'] == 'CATEGORIA':
-                where_conditions.append(f"categoria = '{token['valor']}'")
-            elif token['tipo'] == 'FILTRO_PRECIO' and 'interpretacion' in token:
+            if token.tipo in ['PRODUCTO', 'PRODUCTO_SIMPLE']:  # AGREGAR PRODUCTO_SIMPLE
+                where_conditions.append(f"nombre LIKE '%{token.valor}%'")
+            elif token.tipo == 'CATEGORIA':
+                where_conditions.append(f"categoria = '{token.valor}'")
+            elif token.tipo == 'FILTRO_PRECIO' and 'interpretacion' in token:
                 precio_info = token['interpretacion']
                 if precio_info['op'] == 'menor_a':
                     where_conditions.append(f"precio <= {precio_info['valor']}")
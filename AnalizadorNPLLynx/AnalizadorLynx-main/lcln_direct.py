@@ -6,6 +6,7 @@ Script directo para ejecutar tu sistema LCLN original desde Node.js
 
 import sys
 import json
+import time
 from sistema_lcln_simple import SistemaLCLNSimplificado
 
 def main():
@@ -16,6 +17,7 @@ def main():
     consulta = sys.argv[1]
     limite = int(sys.argv[2]) if len(sys.argv) > 2 else 20
     
+    inicio = time.perf_counter()
     try:
         # Usar tu sistema LCLN original
         sistema = SistemaLCLNSimplificado()
@@ -39,7 +41,7 @@ def main():
                 "bnf_grammar": True,
                 "semantic_categorization": True
             },
-            "processing_time_ms": 0
+            "processing_time_ms": round((time.perf_counter() - inicio) * 1000, 3)
         }
         
         print(json.dumps(resultado))
@@ -0,0 +1,277 @@
+# metricas_busqueda.py
+"""
+Registro asíncrono de métricas de búsqueda en ``busqueda_metricas``.
+
+``registrar_busqueda`` abría una conexión y hacía un INSERT de una fila por
+cada búsqueda, dentro de la misma petición. El escritor:
+
+- encola el evento en memoria y retorna de inmediato (nunca toca la red en
+  el hilo de la búsqueda);
+- un hilo propio vacía la cola en lotes con ``executemany`` cuando se juntan
+  ``tamano_lote`` eventos o pasan ``intervalo_segundos`` desde el último
+  volcado;
+- si la base de datos falla, el lote se escribe como JSONL en
+  ``archivo_respaldo`` (hasta ``max_bytes_respaldo``) y se reenvía cuando la
+  conexión vuelve; sin respaldo, o con el respaldo lleno, el lote se
+  descarta y se cuenta;
+- con la cola llena (``max_cola``) los eventos nuevos se descartan en lugar
+  de bloquear la búsqueda.
+
+``escritor_metricas(config)`` retorna el escritor del proceso para una
+configuración de ``mysql.connector``; arranca su hilo con el primer evento y
+vacía la cola al salir el proceso.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from pool_conexiones import pool_mysql
+
+_INSERTAR_METRICA = """
+    INSERT INTO busqueda_metricas (consulta, productos_encontrados, timestamp)
+    VALUES (%s, %s, %s)
+"""
+
+# (consulta, productos encontrados, momento de la búsqueda)
+Evento = Tuple[str, int, datetime]
+
+
+class EscritorMetricas:
+    """Cola de eventos de búsqueda volcada por lotes desde un hilo propio"""
+
+    def __init__(self, conectar: Callable[[], Any], tamano_lote: int = 200, intervalo_segundos: float = 2.0,
+                 max_cola: int = 10000, archivo_respaldo: Optional[str] = None,
+                 max_bytes_respaldo: int = 50 * 1024 * 1024, reintento_segundos: float = 30.0,
+                 reloj: Callable[[], float] = time.monotonic):
+        self.tamano_lote = tamano_lote
+        self.intervalo_segundos = intervalo_segundos
+        self.max_cola = max_cola
+        self.archivo_respaldo = archivo_respaldo
+        self.max_bytes_respaldo = max_bytes_respaldo
+        self.reintento_segundos = reintento_segundos
+        self._conectar = conectar
+        self._reloj = reloj
+
+        self._cola: Deque[Evento] = deque()
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        # Hasta cuándo no se intenta la base de datos tras un fallo
+        self._pausa_hasta = 0.0
+
+        self.encolados = 0
+        self.escritos = 0
+        self.lotes = 0
+        self.respaldados = 0
+        self.reenviados = 0
+        self.descartados = 0
+        self.fallos = 0
+        self.ultimo_error: Optional[str] = None
+
+    @property
+    def activo(self) -> bool:
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def registrar(self, consulta: str, productos_encontrados: int):
+        """Encola una búsqueda; no bloquea ni lanza excepciones de base de datos"""
+        evento = (consulta, productos_encontrados, datetime.now())
+        with self._lock:
+            if len(self._cola) >= self.max_cola:
+                self.descartados += 1
+                return
+            self._cola.append(evento)
+            self.encolados += 1
+            lleno = len(self._cola) >= self.tamano_lote
+        if not self.activo:
+            self.iniciar()
+        if lleno:
+            self._despertar.set()
+
+    def iniciar(self):
+        """Arranca el hilo de volcado"""
+        with self._lock:
+            if self.activo:
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._ciclo, name="metricas-busqueda", daemon=True)
+            self._hilo.start()
+
+    def detener(self, timeout: Optional[float] = 5.0):
+        """Detiene el hilo después de volcar lo que quede en la cola"""
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+        self._hilo = None
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo_segundos)
+            self._despertar.clear()
+            self.volcar()
+        self.volcar()
+
+    def _tomar_lote(self) -> List[Evento]:
+        with self._lock:
+            return [self._cola.popleft() for _ in range(min(self.tamano_lote, len(self._cola)))]
+
+    def volcar(self):
+        """Escribe la cola completa por lotes (la llama el hilo de volcado)"""
+        self._reenviar_respaldo()
+        lote = self._tomar_lote()
+        while lote:
+            if not self._escribir(lote):
+                self._respaldar(lote)
+            lote = self._tomar_lote()
+
+    # --- Base de datos --------------------------------------------------------
+
+    def _escribir(self, lote: List[Evento]) -> bool:
+        if self._reloj() < self._pausa_hasta:
+            return False
+        try:
+            with self._conectar() as conexion:
+                cursor = conexion.cursor()
+                cursor.executemany(_INSERTAR_METRICA, lote)
+                conexion.commit()
+                cursor.close()
+        except Exception as e:
+            self.fallos += 1
+            self.ultimo_error = str(e)
+            self._pausa_hasta = self._reloj() + self.reintento_segundos
+            print(f"[METRICAS] Error escribiendo {len(lote)} métricas de búsqueda: {e}")
+            return False
+
+        self.escritos += len(lote)
+        self.lotes += 1
+        self.ultimo_error = None
+        return True
+
+    # --- Respaldo en disco ----------------------------------------------------
+
+    def _bytes_respaldo(self) -> int:
+        try:
+            return os.path.getsize(self.archivo_respaldo)
+        except OSError:
+            return 0
+
+    def _respaldar(self, lote: List[Evento]):
+        if not self.archivo_respaldo:
+            self.descartados += len(lote)
+            return
+        lineas = ''.join(json.dumps([consulta, productos, momento.isoformat()], ensure_ascii=False) + '\n'
+                         for consulta, productos, momento in lote)
+        if self._bytes_respaldo() + len(lineas.encode('utf-8')) > self.max_bytes_respaldo:
+            self.descartados += len(lote)
+            return
+        try:
+            with open(self.archivo_respaldo, 'a', encoding='utf-8') as archivo:
+                archivo.write(lineas)
+        except OSError as e:
+            print(f"[METRICAS] No se pudo escribir el respaldo {self.archivo_respaldo}: {e}")
+            self.descartados += len(lote)
+            return
+        self.respaldados += len(lote)
+
+    def _reenviar_respaldo(self):
+        """Reenvía a la base de datos los eventos guardados en disco"""
+        if not self.archivo_respaldo or self._reloj() < self._pausa_hasta:
+            return
+
+        # Se aparta el archivo: los lotes que fallen ahora van a uno nuevo. Un
+        # archivo apartado que quedó de una caída anterior se reenvía primero
+        en_proceso = self.archivo_respaldo + '.reenvio'
+        if not os.path.exists(en_proceso):
+            if not self._bytes_respaldo():
+                return
+            try:
+                os.replace(self.archivo_respaldo, en_proceso)
+            except OSError as e:
+                print(f"[METRICAS] No se pudo apartar el respaldo {self.archivo_respaldo}: {e}")
+                return
+        try:
+            with open(en_proceso, encoding='utf-8') as archivo:
+                eventos = []
+                for linea in archivo:
+                    try:
+                        consulta, productos, momento = json.loads(linea)
+                        eventos.append((consulta, productos, datetime.fromisoformat(momento)))
+                    except ValueError:
+                        # Línea truncada por una caída a mitad de escritura
+                        continue
+        except OSError as e:
+            print(f"[METRICAS] No se pudo leer el respaldo {en_proceso}: {e}")
+            return
+
+        for inicio in range(0, len(eventos), self.tamano_lote):
+            lote = eventos[inicio:inicio + self.tamano_lote]
+            if not self._escribir(lote):
+                self._respaldar(eventos[inicio:])
+                break
+            self.reenviados += len(lote)
+        try:
+            os.remove(en_proceso)
+        except OSError:
+            pass
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado del escritor para los endpoints de monitoreo"""
+        return {
+            'activo': self.activo,
+            'pendientes': len(self._cola),
+            'encolados': self.encolados,
+            'escritos': self.escritos,
+            'lotes': self.lotes,
+            'respaldados': self.respaldados,
+            'reenviados': self.reenviados,
+            'bytes_respaldo': self._bytes_respaldo() if self.archivo_respaldo else 0,
+            'descartados': self.descartados,
+            'fallos': self.fallos,
+            'ultimo_error': self.ultimo_error
+        }
+
+
+_escritores: Dict[Tuple, EscritorMetricas] = {}
+_lock_escritores = threading.Lock()
+
+
+def escritor_metricas(config: Dict) -> EscritorMetricas:
+    """
+    Escritor del proceso para una configuración de mysql.connector. El
+    archivo de respaldo se toma de ``LCLN_METRICAS_RESPALDO`` (sin respaldo
+    si está vacía).
+    """
+    config = dict(config)
+    clave = tuple(sorted(config.items()))
+    with _lock_escritores:
+        escritor = _escritores.get(clave)
+        if escritor is None:
+            escritor = EscritorMetricas(
+                lambda: pool_mysql(config).obtener(),
+                tamano_lote=int(os.getenv('LCLN_METRICAS_LOTE', 200)),
+                intervalo_segundos=float(os.getenv('LCLN_METRICAS_INTERVALO', 2.0)),
+                archivo_respaldo=os.getenv('LCLN_METRICAS_RESPALDO') or None
+            )
+            _escritores[clave] = escritor
+        return escritor
+
+
+def estadisticas_escritores() -> List[Dict[str, Any]]:
+    """Estadísticas de todos los escritores creados en el proceso"""
+    with _lock_escritores:
+        escritores = list(_escritores.values())
+    return [escritor.estadisticas() for escritor in escritores]
+
+
+@atexit.register
+def _detener_escritores():
+    with _lock_escritores:
+        escritores = list(_escritores.values())
+    for escritor in escritores:
+        escritor.detener()
@@ -0,0 +1,210 @@
+# metricas_latencia.py
+"""
+Histogramas de latencia y contadores del proceso, expuestos en el formato de
+texto de Prometheus (``/metrics``).
+
+Las respuestas reportaban un ``processing_time_ms`` fijo y no había forma de
+saber qué fase del análisis se llevaba el tiempo. Este módulo:
+
+- ``Histograma`` cuenta observaciones por cubetas fijas (en segundos) y
+  acumula suma y total por cada combinación de etiquetas; ``tramo()`` mide
+  un bloque ``with`` con ``time.perf_counter``;
+- ``Contador`` cuenta eventos por etiquetas;
+- ``Indicador`` lee un valor actual (tamaño de una cola, versión del
+  catálogo) en el momento de la exposición, sin instrumentar a quien lo
+  mantiene.
+
+Las métricas se crean una vez por nombre en el registro del proceso
+(``histograma``, ``contador`` e ``indicador`` retornan la existente si ya
+estaba) y ``exposicion()`` arma el texto completo. Registrar una observación
+cuesta una búsqueda binaria y un lock: se puede hacer en cada búsqueda.
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Cubetas en segundos: de cincuenta microsegundos (una fase del análisis con
+# el índice en memoria) a diez segundos (una recarga completa del catálogo)
+LIMITES_SEGUNDOS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(nombres: Tuple[str, ...], valores: Tuple[str, ...], extra: str = '') -> str:
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _numero(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Tramo:
+    """Bloque ``with`` cuya duración se registra en un histograma"""
+
+    __slots__ = ('_histograma', '_valores', '_inicio')
+
+    def __init__(self, histograma: 'Histograma', valores: Tuple[str, ...]):
+        self._histograma = histograma
+        self._valores = valores
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self._histograma.observar(time.perf_counter() - self._inicio, *self._valores)
+        return False
+
+
+class Histograma:
+    """Distribución de duraciones en cubetas fijas, por etiquetas"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = (),
+                 limites: Tuple[float, ...] = LIMITES_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(sorted(limites))
+        self._lock = threading.Lock()
+        # valores de etiquetas -> [cuenta por cubeta (la última es +Inf), suma, total]
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observar(self, segundos: float, *valores: str):
+        cubeta = bisect.bisect_left(self.limites, segundos)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][cubeta] += 1
+            serie[1] += segundos
+            serie[2] += 1
+
+    def tramo(self, *valores: str) -> _Tramo:
+        """Context manager que registra la duración del bloque"""
+        return _Tramo(self, valores)
+
+    def lineas(self) -> List[str]:
+        with self._lock:
+            series = [(valores, list(serie[0]), serie[1], serie[2]) for valores, serie in sorted(self._series.items())]
+        lineas = []
+        for valores, cubetas, suma, total in series:
+            acumulado = 0
+            for limite, cuenta in zip(self.limites + (float('inf'),), cubetas):
+                acumulado += cuenta
+                cubeta = 'le="%s"' % _numero(limite)
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, cubeta)} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {total}")
+        return lineas
+
+
+class Contador:
+    """Eventos acumulados desde el arranque del proceso, por etiquetas"""
+
+    tipo = 'counter'
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def incrementar(self, *valores: str, cantidad: float = 1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def lineas(self) -> List[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}"
+                for etiquetas, valor in valores]
+
+
+class Indicador:
+    """
+    Valor actual leído al exponer. ``leer`` retorna un número, o un
+    diccionario de valores de etiquetas a número (None si no hay dato)
+    """
+
+    tipo = 'gauge'
+
+    def __init__(self, nombre: str, ayuda: str, leer: Callable[[], object], etiquetas: Tuple[str, ...] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._leer = leer
+
+    def lineas(self) -> List[str]:
+        try:
+            leido = self._leer()
+        except Exception as e:
+            print(f"[METRICAS] Error leyendo {self.nombre}: {e}")
+            return []
+        valores = leido if isinstance(leido, dict) else {(): leido}
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}"
+                for etiquetas, valor in sorted(valores.items()) if valor is not None]
+
+
+class RegistroMetricas:
+    """Métricas del proceso por nombre, en orden de creación"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metricas: Dict[str, object] = {}
+
+    def _obtener(self, clase, nombre: str, *args, **kwargs):
+        with self._lock:
+            metrica = self._metricas.get(nombre)
+            if metrica is None:
+                metrica = self._metricas[nombre] = clase(nombre, *args, **kwargs)
+            elif not isinstance(metrica, clase):
+                raise ValueError(f"La métrica '{nombre}' ya existe con otro tipo")
+            return metrica
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = (),
+                   limites: Tuple[float, ...] = LIMITES_SEGUNDOS) -> Histograma:
+        return self._obtener(Histograma, nombre, ayuda, etiquetas, limites)
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = ()) -> Contador:
+        return self._obtener(Contador, nombre, ayuda, etiquetas)
+
+    def indicador(self, nombre: str, ayuda: str, leer: Callable[[], object],
+                  etiquetas: Tuple[str, ...] = ()) -> Indicador:
+        return self._obtener(Indicador, nombre, ayuda, leer, etiquetas)
+
+    def obtener(self, nombre: str) -> Optional[object]:
+        return self._metricas.get(nombre)
+
+    def exposicion(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus"""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        lineas = []
+        for metrica in metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.lineas())
+        return '\n'.join(lineas) + '\n'
+
+
+# Registro del proceso
+registro = RegistroMetricas()
+histograma = registro.histograma
+contador = registro.contador
+indicador = registro.indicador
+exposicion = registro.exposicion
+
+# Duración de cada fase de ``analizar_consulta_lcln`` (la compartida por los
+# motores y por el cálculo de la clave del cache de respuestas)
+latencia_fases = histograma('lcln_fase_segundos', 'Duración de cada fase del análisis LCLN', ('fase',))
@@ -3,6 +3,8 @@ import json
 from typing import Dict, List, Any, Optional
 import re
 
+from traza import trazando, trazar
+
 class MotorRecomendaciones:
     """
     Motor de recomendaciones inteligente para productos LYNX
@@ -253,29 +255,30 @@ class MotorRecomendaciones:
         filtros = interpretacion.get('filtros', {})
         
         # Debug: ver qué llega del análisis
-        print(f"🔍 MOTOR RECOMENDACIONES - Procesando consulta:")
-        print(f"   • Producto: {producto_solicitado}")
-        print(f"   • Categoría: {categoria_solicitada}")
-        print(f"   • Atributos: {atributos_solicitados}")
-        print(f"   • Filtros: {filtros}")
+        rastreando = trazando()
+        trazar('MOTOR', "🔍 MOTOR RECOMENDACIONES - Procesando consulta:")
+        trazar('MOTOR', "   • Producto: {}", producto_solicitado)
+        trazar('MOTOR', "   • Categoría: {}", categoria_solicitada)
+        trazar('MOTOR', "   • Atributos: {}", atributos_solicitados)
+        trazar('MOTOR', "   • Filtros: {}", filtros)
         
         # ESTRATEGIA 1: BÚSQUEDA POR ATRIBUTOS (PRIORIDAD ALTA)
         # Ejemplo: "bebidas sin azucar" -> buscar bebidas + filtrar sin_azucar
         if atributos_solicitados:
-            print(f"🎯 ESTRATEGIA 1: Búsqueda por atributos")
+            trazar('MOTOR', "🎯 ESTRATEGIA 1: Búsqueda por atributos")
             
             for atributo in atributos_solicitados:
-                print(f"   📍 Procesando atributo: {atributo}")
+                trazar('MOTOR', "   📍 Procesando atributo: {}", atributo)
                 try:
                     # Usar el sistema escalable para buscar por atributo
                     productos_atributo = self.base_datos.buscar_por_atributo(atributo, limite=max_recomendaciones * 2)
-                    print(f"      → Encontrados {len(productos_atributo)} productos con atributo '{atributo}'")
+                    trazar('MOTOR', "      → Encontrados {} productos con atributo '{}'", len(productos_atributo), atributo)
                     
                     # Si también hay categoría, filtrar por ella
                     if categoria_solicitada:
                         productos_atributo = [p for p in productos_atributo 
                                            if p['categoria'].lower() == categoria_solicitada.lower()]
-                        print(f"      → Filtrados por categoría '{categoria_solicitada}': {len(productos_atributo)} productos")
+                        trazar('MOTOR', "      → Filtrados por categoría '{}': {} productos", categoria_solicitada, len(productos_atributo))
                     
                     # Agregar productos encontrados
                     for producto in productos_atributo:
@@ -305,7 +308,8 @@ class MotorRecomendaciones:
                             'match_reasons': razones
                         }
                         recomendaciones.append(recomendacion)
-                        print(f"      ✅ Agregado: {producto['nombre']} (score: {score:.2f})")
+                        if rastreando:
+                            trazar('MOTOR', "      ✅ Agregado: {} (score: {:.2f})", producto['nombre'], score)
                         
                 except Exception as e:
                     print(f"      ❌ Error buscando atributo '{atributo}': {e}")
@@ -313,15 +317,15 @@ class MotorRecomendaciones:
         # ESTRATEGIA 2: BÚSQUEDA POR PRODUCTO ESPECÍFICO
         # Ejemplo: "coca cola", "papitas sabritas"
         if producto_solicitado and len(recomendaciones) < max_recomendaciones:
-            print(f"🎯 ESTRATEGIA 2: Búsqueda por producto específico")
-            print(f"   📍 Buscando: {producto_solicitado}")
+            trazar('MOTOR', "🎯 ESTRATEGIA 2: Búsqueda por producto específico")
+            trazar('MOTOR', "   📍 Buscando: {}", producto_solicitado)
             
             try:
                 # Usar búsqueda inteligente del sistema escalable
                 productos_similares = self.base_datos.buscar_productos_inteligente(
                     producto_solicitado, limite=max_recomendaciones * 2
                 )
-                print(f"      → Encontrados {len(productos_similares)} productos similares")
+                trazar('MOTOR', "      → Encontrados {} productos similares", len(productos_similares))
                 
                 for producto in productos_similares:
                     if len(recomendaciones) >= max_recomendaciones:
@@ -358,7 +362,8 @@ class MotorRecomendaciones:
                         'match_reasons': razones
                     }
                     recomendaciones.append(recomendacion)
-                    print(f"      ✅ Agregado: {producto['nombre']} (score: {score:.2f})")
+                    if rastreando:
+                        trazar('MOTOR', "      ✅ Agregado: {} (score: {:.2f})", producto['nombre'], score)
                     
             except Exception as e:
                 print(f"      ❌ Error buscando producto '{producto_solicitado}': {e}")
@@ -366,8 +371,8 @@ class MotorRecomendaciones:
         # ESTRATEGIA 3: BÚSQUEDA POR CATEGORÍA
         # Ejemplo: "bebidas", "snacks", "lacteos"
         if categoria_solicitada and len(recomendaciones) < max_recomendaciones:
-            print(f"🎯 ESTRATEGIA 3: Búsqueda por categoría")
-            print(f"   📍 Categoría: {categoria_solicitada}")
+            trazar('MOTOR', "🎯 ESTRATEGIA 3: Búsqueda por categoría")
+            trazar('MOTOR', "   📍 Categoría: {}", categoria_solicitada)
             
             try:
                 # Normalizar categoría y buscar
@@ -375,7 +380,7 @@ class MotorRecomendaciones:
                 productos_categoria = self.base_datos.obtener_productos_por_categoria(
                     categoria_normalizada, max_recomendaciones * 2
                 )
-                print(f"      → Encontrados {len(productos_categoria)} productos en categoría '{categoria_normalizada}'")
+                trazar('MOTOR', "      → Encontrados {} productos en categoría '{}'", len(productos_categoria), categoria_normalizada)
                 
                 for producto in productos_categoria:
                     if len(recomendaciones) >= max_recomendaciones:
@@ -407,7 +412,8 @@ class MotorRecomendaciones:
                         'match_reasons': razones
                     }
                     recomendaciones.append(recomendacion)
-                    print(f"      ✅ Agregado: {producto['nombre']} (score: {score:.2f})")
+                    if rastreando:
+                        trazar('MOTOR', "      ✅ Agregado: {} (score: {:.2f})", producto['nombre'], score)
                     
             except Exception as e:
                 print(f"      ❌ Error buscando categoría '{categoria_solicitada}': {e}")
@@ -415,7 +421,7 @@ class MotorRecomendaciones:
         # ESTRATEGIA 4: BÚSQUEDA INTELIGENTE COMBINADA
         # Si aún no hay suficientes resultados, hacer búsqueda más amplia
         if len(recomendaciones) < max_recomendaciones // 2:
-            print(f"🎯 ESTRATEGIA 4: Búsqueda inteligente combinada")
+            trazar('MOTOR', "🎯 ESTRATEGIA 4: Búsqueda inteligente combinada")
             
             # Construir query combinada
             terminos_busqueda = []
@@ -428,13 +434,13 @@ class MotorRecomendaciones:
             
             if terminos_busqueda:
                 query_combinada = ' '.join(terminos_busqueda)
-                print(f"   📍 Query combinada: {query_combinada}")
+                trazar('MOTOR', "   📍 Query combinada: {}", query_combinada)
                 
                 try:
                     productos_combinados = self.base_datos.buscar_productos_inteligente(
                         query_combinada, limite=max_recomendaciones
                     )
-                    print(f"      → Encontrados {len(productos_combinados)} productos con búsqueda combinada")
+                    trazar('MOTOR', "      → Encontrados {} productos con búsqueda combinada", len(productos_combinados))
                     
                     for producto in productos_combinados:
                         if len(recomendaciones) >= max_recomendaciones:
@@ -458,17 +464,18 @@ class MotorRecomendaciones:
                             'match_reasons': razones
                         }
                         recomendaciones.append(recomendacion)
-                        print(f"      ✅ Agregado: {producto['nombre']} (score: {score:.2f})")
+                        if rastreando:
+                            trazar('MOTOR', "      ✅ Agregado: {} (score: {:.2f})", producto['nombre'], score)
                         
                 except Exception as e:
                     print(f"      ❌ Error en búsqueda combinada: {e}")
         
         # ESTRATEGIA 5: FALLBACK A PRODUCTOS POPULARES (solo si no hay nada)
         if not recomendaciones:
-            print(f"🎯 ESTRATEGIA 5: Fallback a productos populares")
+            trazar('MOTOR', "🎯 ESTRATEGIA 5: Fallback a productos populares")
             try:
                 productos_populares = self.base_datos.obtener_productos_populares(max_recomendaciones)
-                print(f"      → Mostrando {len(productos_populares)} productos populares como fallback")
+                trazar('MOTOR', "      → Mostrando {} productos populares como fallback", len(productos_populares))
                 
                 for producto in productos_populares:
                     razones = ['producto_popular', 'recomendacion_general']
@@ -490,7 +497,7 @@ class MotorRecomendaciones:
         
         # APLICAR FILTROS DE PRECIO
         if filtros.get('precio') and recomendaciones:
-            print(f"💰 Aplicando filtros de precio: {filtros['precio']}")
+            trazar('MOTOR', "💰 Aplicando filtros de precio: {}", filtros['precio'])
             filtro_precio = filtros['precio']
             recomendaciones_filtradas = []
             
@@ -511,15 +518,16 @@ class MotorRecomendaciones:
                     recomendaciones_filtradas.append(rec)
                     
             recomendaciones = recomendaciones_filtradas
-            print(f"      → {len(recomendaciones)} productos cumplen filtros de precio")
+            trazar('MOTOR', "      → {} productos cumplen filtros de precio", len(recomendaciones))
         
         # ORDENAR Y LIMITAR RESULTADOS
         recomendaciones.sort(key=lambda x: x['match_score'], reverse=True)
         recomendaciones_finales = recomendaciones[:max_recomendaciones]
         
-        print(f"✅ MOTOR COMPLETADO: {len(recomendaciones_finales)} recomendaciones generadas")
-        for i, rec in enumerate(recomendaciones_finales[:3], 1):  # Mostrar top 3
-            print(f"   {i}. {rec['name']} (score: {rec['match_score']:.2f})")
+        trazar('MOTOR', "✅ MOTOR COMPLETADO: {} recomendaciones generadas", len(recomendaciones_finales))
+        if rastreando:
+            for i, rec in enumerate(recomendaciones_finales[:3], 1):  # Mostrar top 3
+                trazar('MOTOR', "   {}. {} (score: {:.2f})", i, rec['name'], rec['match_score'])
         
         return recomendaciones_finales
     
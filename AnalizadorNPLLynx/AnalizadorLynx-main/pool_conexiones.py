@@ -0,0 +1,253 @@
+# pool_conexiones.py
+"""
+Pool de conexiones MySQL compartido por los accesos a base de datos del
+servicio LCLN.
+
+Cada búsqueda abría una conexión nueva (TCP + autenticación) y la cerraba
+al terminar. El pool mantiene hasta ``max_conexiones`` abiertas y las
+reutiliza:
+
+- ``obtener()`` entrega una conexión libre (la usada más recientemente), o
+  abre una si no se llegó al máximo, o espera en fila a que se libere una
+  hasta ``timeout_adquisicion`` segundos y después lanza ``PoolAgotado``;
+- una conexión que pasó más de ``verificar_tras_segundos`` sin usarse se
+  comprueba con ``ping`` antes de entregarla y se descarta si no responde;
+- la conexión entregada es un envoltorio cuyo ``close()`` la devuelve al
+  pool, de modo que el código que ya cerraba sus conexiones no cambia. Si se
+  usa con ``with`` y ocurre una excepción, la conexión se descarta;
+- ``estadisticas()`` reporta conexiones abiertas, en uso, libres, esperas y
+  descartes.
+
+``pool_mysql(config)`` retorna el pool del proceso para una configuración de
+``mysql.connector`` (uno por configuración distinta).
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import mysql.connector
+
+
+class PoolAgotado(Exception):
+    """No se liberó ninguna conexión dentro del tiempo de adquisición"""
+
+
+class ConexionPrestada:
+    """Conexión tomada del pool; ``close()`` la devuelve en lugar de cerrarla"""
+
+    def __init__(self, pool: 'PoolConexiones', conexion):
+        self._pool = pool
+        self._conexion = conexion
+
+    def __getattr__(self, nombre):
+        conexion = self.__dict__.get('_conexion')
+        if conexion is None:
+            raise AttributeError(f"conexión ya devuelta al pool ({nombre})")
+        return getattr(conexion, nombre)
+
+    def close(self):
+        """Devuelve la conexión al pool (una sola vez)"""
+        conexion, self._conexion = self._conexion, None
+        if conexion is not None:
+            self._pool._devolver(conexion)
+
+    def descartar(self):
+        """Cierra la conexión de verdad, p. ej. después de un error de red"""
+        conexion, self._conexion = self._conexion, None
+        if conexion is not None:
+            self._pool._devolver(conexion, descartar=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.close()
+        else:
+            self.descartar()
+        return False
+
+
+class PoolConexiones:
+    """Conexiones reutilizables con tamaño máximo y tiempo de espera acotado"""
+
+    def __init__(self, nombre: str, crear: Callable[[], Any], max_conexiones: int = 10,
+                 timeout_adquisicion: float = 5.0, verificar_tras_segundos: float = 30.0,
+                 reloj: Callable[[], float] = time.monotonic):
+        self.nombre = nombre
+        self.max_conexiones = max_conexiones
+        self.timeout_adquisicion = timeout_adquisicion
+        self.verificar_tras_segundos = verificar_tras_segundos
+        self._crear = crear
+        self._reloj = reloj
+
+        self._condicion = threading.Condition()
+        # (conexión, momento de su último uso); la más reciente al final
+        self._libres: Deque[Tuple[Any, float]] = deque()
+        self._abiertas = 0
+        # Pedidos de quienes esperan, en orden de llegada
+        self._esperando: Deque[List] = deque()
+
+        self.creadas = 0
+        self.reutilizadas = 0
+        self.descartadas = 0
+        self.timeouts = 0
+        self.esperas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    @property
+    def en_uso(self) -> int:
+        return self._abiertas - len(self._libres)
+
+    def obtener(self, timeout: Optional[float] = None) -> ConexionPrestada:
+        """
+        Conexión lista para usar. Lanza ``PoolAgotado`` si todas están en uso
+        durante ``timeout`` segundos (por defecto ``timeout_adquisicion``)
+        """
+        timeout = self.timeout_adquisicion if timeout is None else timeout
+        inicio = self._reloj()
+        limite = inicio + timeout
+
+        while True:
+            with self._condicion:
+                if self._libres:
+                    conexion, ultimo_uso = self._libres.pop()
+                elif self._abiertas < self.max_conexiones:
+                    self._abiertas += 1
+                    conexion, ultimo_uso = None, None
+                else:
+                    # En fila: quien devuelve una conexión se la entrega al
+                    # primero que espera, así nadie se queda sin turno
+                    pedido: List[Tuple[Any, Optional[float]]] = []
+                    self._esperando.append(pedido)
+                    while not pedido:
+                        restante = limite - self._reloj()
+                        if restante <= 0:
+                            self._esperando.remove(pedido)
+                            self.timeouts += 1
+                            raise PoolAgotado(f"pool '{self.nombre}' sin conexiones libres tras {timeout:.1f}s "
+                                              f"({self.max_conexiones} en uso)")
+                        self._condicion.wait(restante)
+                    conexion, ultimo_uso = pedido[0]
+                nueva = conexion is None
+
+            # Conectar y verificar fuera del lock: no detienen a los demás
+            if nueva:
+                try:
+                    conexion = self._crear()
+                except Exception:
+                    self._liberar_cupo()
+                    raise
+                self.creadas += 1
+            elif self._reloj() - ultimo_uso > self.verificar_tras_segundos and not self._responde(conexion):
+                self._cerrar(conexion)
+                self._liberar_cupo()
+                self.descartadas += 1
+                continue
+            else:
+                self.reutilizadas += 1
+
+            self._registrar_espera(self._reloj() - inicio)
+            return ConexionPrestada(self, conexion)
+
+    @staticmethod
+    def _responde(conexion) -> bool:
+        try:
+            conexion.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _cerrar(conexion):
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def _liberar_cupo(self):
+        with self._condicion:
+            if self._esperando:
+                # El cupo pasa al primero en la fila, que abrirá una nueva
+                self._esperando.popleft().append((None, None))
+                self._condicion.notify_all()
+            else:
+                self._abiertas -= 1
+
+    def _registrar_espera(self, espera: float):
+        self.esperas += 1
+        self.espera_total += espera
+        if espera > self.espera_maxima:
+            self.espera_maxima = espera
+
+    def _devolver(self, conexion, descartar: bool = False):
+        if descartar:
+            self._cerrar(conexion)
+            self.descartadas += 1
+            self._liberar_cupo()
+            return
+        with self._condicion:
+            if self._esperando:
+                self._esperando.popleft().append((conexion, self._reloj()))
+                self._condicion.notify_all()
+            else:
+                self._libres.append((conexion, self._reloj()))
+
+    def cerrar(self):
+        """Cierra las conexiones libres (las prestadas se cierran al devolverse)"""
+        with self._condicion:
+            libres = list(self._libres)
+            self._libres.clear()
+            self._abiertas -= len(libres)
+        for conexion, _ in libres:
+            self._cerrar(conexion)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado del pool para los endpoints de monitoreo"""
+        return {
+            'max_conexiones': self.max_conexiones,
+            'abiertas': self._abiertas,
+            'en_uso': self.en_uso,
+            'libres': len(self._libres),
+            'creadas': self.creadas,
+            'reutilizadas': self.reutilizadas,
+            'descartadas': self.descartadas,
+            'timeouts': self.timeouts,
+            'espera_media_ms': round(self.espera_total / self.esperas * 1000, 3) if self.esperas else 0.0,
+            'espera_maxima_ms': round(self.espera_maxima * 1000, 3)
+        }
+
+
+_pools: Dict[Tuple, PoolConexiones] = {}
+_lock_pools = threading.Lock()
+
+
+def pool_mysql(config: Dict) -> PoolConexiones:
+    """
+    Pool del proceso para una configuración de mysql.connector. El tamaño y
+    el tiempo de espera se ajustan con ``LCLN_POOL_MAX`` y
+    ``LCLN_POOL_TIMEOUT``.
+    """
+    config = dict(config)
+    clave = tuple(sorted(config.items()))
+    with _lock_pools:
+        pool = _pools.get(clave)
+        if pool is None:
+            pool = PoolConexiones(
+                f"{config.get('user')}@{config.get('host')}/{config.get('database')}",
+                lambda: mysql.connector.connect(**config),
+                max_conexiones=int(os.getenv('LCLN_POOL_MAX', 10)),
+                timeout_adquisicion=float(os.getenv('LCLN_POOL_TIMEOUT', 5.0))
+            )
+            _pools[clave] = pool
+        return pool
+
+
+def estadisticas_pools() -> Dict[str, Dict[str, Any]]:
+    """Estadísticas de todos los pools creados en el proceso"""
+    with _lock_pools:
+        pools = list(_pools.values())
+    return {pool.nombre: pool.estadisticas() for pool in pools}
@@ -0,0 +1,211 @@
+# refresco_catalogo.py
+"""
+Refresco del catálogo de productos en segundo plano.
+
+Los sistemas LCLN recargaban la tabla de productos dentro de la búsqueda que
+encontraba el cache vencido: esa petición pagaba la latencia de MySQL y
+todas las que llegaban a la vez recargaban también. El refrescador:
+
+- recarga periódicamente en un hilo propio, mientras las búsquedas siguen
+  usando la instantánea anterior (stale-while-revalidate);
+- garantiza que solo una recarga corre a la vez: quien llega durante una
+  recarga no lanza otra, y quien espera la primera carga reutiliza su
+  resultado en vez de repetirla;
+- lleva la duración, la edad del catálogo y los contadores de recargas, y
+  registra cada recarga en el histograma ``lcln_refresco_catalogo_segundos``.
+
+La función ``cargar`` debe construir el catálogo nuevo aparte y publicarlo
+al final, y lanzar una excepción si falla (el catálogo anterior se conserva).
+Puede retornar el nombre de la modalidad usada ('completa', 'delta') para
+contarla en las estadísticas.
+
+``consultar_cambios`` es la parte común de los refrescos incrementales: usa
+el ``id_log`` de ``inventorylog`` como marca de agua.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metricas_latencia import contador, histograma
+
+_latencia_refresco = histograma('lcln_refresco_catalogo_segundos', 'Duración de las recargas del catálogo',
+                                ('catalogo', 'modalidad'))
+_fallos_refresco = contador('lcln_refresco_catalogo_fallos_total', 'Recargas del catálogo fallidas', ('catalogo',))
+
+
+def consultar_cambios(cursor, marca: int) -> Tuple[int, List[int]]:
+    """
+    Nueva marca de ``inventorylog`` y productos con movimientos posteriores a
+    ``marca``. La bitácora solo registra cambios de existencias: los cambios
+    de nombre, precio o categoría llegan con la recarga completa periódica.
+    Una marca nueva menor que ``marca`` indica que la bitácora se reinició.
+    """
+    cursor.execute("SELECT COALESCE(MAX(id_log), 0) AS marca FROM inventorylog")
+    nueva_marca = cursor.fetchone()['marca']
+    if nueva_marca <= marca:
+        return nueva_marca, []
+
+    cursor.execute("""
+        SELECT DISTINCT id_producto FROM inventorylog
+        WHERE id_log > %s AND id_log <= %s
+    """, (marca, nueva_marca))
+    return nueva_marca, [fila['id_producto'] for fila in cursor.fetchall()]
+
+
+class RefrescadorCatalogo:
+    """Hilo de recarga periódica con una sola recarga en curso"""
+
+    def __init__(self, nombre: str, cargar: Callable[[], Optional[str]], intervalo_segundos: float = 300.0,
+                 reintento_segundos: float = 30.0, reloj: Callable[[], float] = time.monotonic):
+        self.nombre = nombre
+        self.intervalo_segundos = intervalo_segundos
+        self.reintento_segundos = min(reintento_segundos, intervalo_segundos)
+        self._cargar = cargar
+        self._reloj = reloj
+
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+        self._intentos = 0
+        self.refrescos = 0
+        self.fallos = 0
+        self.coalescidos = 0
+        self.ultimo_exito: Optional[float] = None
+        self.ultima_duracion: Optional[float] = None
+        self.ultimo_error: Optional[str] = None
+        self.ultima_modalidad: Optional[str] = None
+        self.por_modalidad: Dict[str, int] = {}
+
+    @property
+    def activo(self) -> bool:
+        return self._hilo is not None and self._hilo.is_alive()
+
+    @property
+    def edad_segundos(self) -> Optional[float]:
+        """Segundos desde la última recarga exitosa (None si nunca cargó)"""
+        if self.ultimo_exito is None:
+            return None
+        return self._reloj() - self.ultimo_exito
+
+    def refrescar(self, esperar: bool = False) -> bool:
+        """
+        Recarga el catálogo si no hay otra recarga en curso.
+
+        Con ``esperar=False`` retorna False de inmediato si ya hay una
+        recarga corriendo. Con ``esperar=True`` espera a que termine y, si
+        ésa ya completó un intento mientras tanto, no repite la carga.
+        """
+        intentos_previos = self._intentos
+        if not self._lock.acquire(blocking=esperar):
+            self.coalescidos += 1
+            return False
+
+        try:
+            if esperar and self._intentos != intentos_previos:
+                self.coalescidos += 1
+                return self.ultimo_error is None
+            return self._ejecutar()
+        finally:
+            self._lock.release()
+
+    def _ejecutar(self) -> bool:
+        inicio = self._reloj()
+        inicio_medicion = time.perf_counter()
+        modalidad = 'error'
+        try:
+            modalidad = self._cargar()
+        except Exception as e:
+            self.fallos += 1
+            self.ultimo_error = str(e)
+            _fallos_refresco.incrementar(self.nombre)
+            print(f"[REFRESCO] {self.nombre}: error recargando catálogo: {e}")
+            return False
+        finally:
+            self._intentos += 1
+            self.ultima_duracion = self._reloj() - inicio
+            _latencia_refresco.observar(time.perf_counter() - inicio_medicion, self.nombre,
+                                        modalidad if isinstance(modalidad, str) else 'otra')
+
+        self.refrescos += 1
+        self.ultimo_error = None
+        if isinstance(modalidad, str):
+            self.ultima_modalidad = modalidad
+            self.por_modalidad[modalidad] = self.por_modalidad.get(modalidad, 0) + 1
+        self.ultimo_exito = self._reloj()
+        return True
+
+    def solicitar(self):
+        """
+        Pide una recarga sin bloquear a quien la pide: la hace el hilo si está
+        activo; si no, se hace aquí solo cuando no hay otra en curso.
+        """
+        if self.activo:
+            self._despertar.set()
+        else:
+            self.refrescar(esperar=False)
+
+    def programar(self):
+        """
+        Pide otra recarga desde dentro de la recarga en curso (que todavía
+        tiene el candado): la hace el hilo si está activo; si no, un hilo de
+        un solo uso en cuanto se libere el candado, sin bloquear a nadie.
+        """
+        if self.activo:
+            self._despertar.set()
+        else:
+            threading.Thread(target=self._ejecutar_programada, name=f"refresco-{self.nombre}-programado",
+                             daemon=True).start()
+
+    def _ejecutar_programada(self):
+        # Sin coalescer: la recarga que la programó no cuenta como ésta
+        with self._lock:
+            self._ejecutar()
+
+    def iniciar(self):
+        """Arranca el hilo de recarga; la primera carga ocurre de inmediato"""
+        if self.activo:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo, name=f"refresco-{self.nombre}", daemon=True)
+        self._hilo.start()
+        print(f"[REFRESCO] {self.nombre}: refresco en segundo plano cada {self.intervalo_segundos:.0f}s")
+
+    def detener(self, timeout: Optional[float] = 5.0):
+        """Detiene el hilo (espera a lo sumo ``timeout`` a la recarga en curso)"""
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+        self._hilo = None
+
+    def _ciclo(self):
+        espera = 0.0
+        while True:
+            self._despertar.wait(espera)
+            # Limpiar al despertar y antes de recargar: una solicitud que
+            # llegue durante la recarga deja el evento puesto y provoca otra
+            # vuelta en lugar de perderse hasta el siguiente intervalo
+            self._despertar.clear()
+            if self._detener.is_set():
+                break
+            exito = self.refrescar(esperar=True)
+            espera = self.intervalo_segundos if exito else self.reintento_segundos
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado del refresco para los endpoints de monitoreo"""
+        edad = self.edad_segundos
+        return {
+            'activo': self.activo,
+            'en_curso': self._lock.locked(),
+            'intervalo_segundos': self.intervalo_segundos,
+            'edad_segundos': round(edad, 3) if edad is not None else None,
+            'ultima_duracion_ms': round(self.ultima_duracion * 1000, 2) if self.ultima_duracion is not None else None,
+            'refrescos': self.refrescos,
+            'fallos': self.fallos,
+            'coalescidos': self.coalescidos,
+            'ultima_modalidad': self.ultima_modalidad,
+            'por_modalidad': dict(self.por_modalidad),
+            'ultimo_error': self.ultimo_error
+        }
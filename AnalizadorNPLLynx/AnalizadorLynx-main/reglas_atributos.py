@@ -0,0 +1,109 @@
+# reglas_atributos.py
+"""
+Tabla de reglas que asignan atributos (picante, dulce, sin azucar, barato,
+caro...) a los productos del catálogo.
+
+Cada regla es un diccionario con el nombre del atributo y sus condiciones;
+todas las condiciones presentes deben cumplirse:
+
+- ``nombre_contiene``: alguna de las palabras aparece en el nombre
+- ``categoria_en``: la categoría (en minúsculas) es alguna de la lista
+- ``precio_max`` / ``precio_min``: límites inclusivos de precio
+- ``excepto``: atributos que, si el producto los cumple, anulan éste
+
+Las reglas se compilan a un bit por atributo, de modo que cada producto se
+etiqueta una sola vez con una máscara de bits al cargar el catálogo. Para
+agregar o cambiar reglas sin tocar el código basta con un archivo JSON (una
+lista de reglas con el mismo formato) en la ruta indicada por la variable de
+entorno ``LCLN_REGLAS_ATRIBUTOS``: las reglas con el nombre de un atributo
+existente lo reemplazan y las demás se agregan al final.
+"""
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+PALABRAS_PICANTE = ['fuego', 'picante', 'hot', 'flamin', 'dinamita', 'chile', 'adobadas']
+
+REGLAS_POR_DEFECTO: List[Dict] = [
+    {'atributo': 'picante', 'nombre_contiene': PALABRAS_PICANTE},
+    {'atributo': 'dulce', 'categoria_en': ['golosinas', 'snacks'], 'excepto': ['picante']},
+    # El agua es naturalmente sin azúcar
+    {'atributo': 'sin azucar', 'nombre_contiene': ['sin azúcar', 'light', 'zero', 'diet', 'agua']},
+    {'atributo': 'barato', 'precio_max': 15.0},
+    {'atributo': 'caro', 'precio_min': 25.0},
+]
+
+_CONDICIONES = {'atributo', 'nombre_contiene', 'categoria_en', 'precio_max', 'precio_min', 'excepto'}
+
+
+def cargar_reglas(ruta: Optional[str] = None) -> List[Dict]:
+    """
+    Reglas por defecto combinadas con las del archivo JSON indicado (o el de
+    ``LCLN_REGLAS_ATRIBUTOS``). Si el archivo no se puede leer se usan solo
+    las reglas por defecto.
+    """
+    reglas = {regla['atributo']: regla for regla in REGLAS_POR_DEFECTO}
+    ruta = ruta or os.getenv('LCLN_REGLAS_ATRIBUTOS')
+
+    if ruta:
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                adicionales = json.load(archivo)
+            for regla in adicionales:
+                desconocidas = set(regla) - _CONDICIONES
+                if 'atributo' not in regla or desconocidas:
+                    raise ValueError(f"regla inválida {regla!r}")
+                reglas[regla['atributo']] = regla
+        except (OSError, TypeError, ValueError) as e:
+            print(f"[WARNING] No se pudieron cargar reglas de atributos desde {ruta}: {e}")
+            reglas = {regla['atributo']: regla for regla in REGLAS_POR_DEFECTO}
+
+    return list(reglas.values())
+
+
+class ReglasAtributos:
+    """Reglas compiladas: un bit por atributo y la máscara de cada producto"""
+
+    def __init__(self, reglas: Optional[Iterable[Dict]] = None):
+        self.reglas = list(reglas) if reglas is not None else cargar_reglas()
+        self.bits: Dict[str, int] = {regla['atributo']: 1 << i for i, regla in enumerate(self.reglas)}
+        # Por regla: su bit y los bits de los atributos que la anulan
+        self._exclusiones = [(self.bits[regla['atributo']], self.mascara(regla.get('excepto', ())))
+                             for regla in self.reglas]
+
+    def _cumple(self, regla: Dict, nombre: str, categoria: str, precio: float) -> bool:
+        palabras = regla.get('nombre_contiene')
+        if palabras is not None and not any(palabra in nombre for palabra in palabras):
+            return False
+        categorias = regla.get('categoria_en')
+        if categorias is not None and categoria not in categorias:
+            return False
+        if 'precio_max' in regla and precio > regla['precio_max']:
+            return False
+        if 'precio_min' in regla and precio < regla['precio_min']:
+            return False
+        return True
+
+    def mascara_producto(self, producto: Dict) -> int:
+        """Bits de todos los atributos que cumple el producto"""
+        nombre = producto['nombre'].lower()
+        categoria = producto['categoria_nombre'].lower()
+        precio = producto['precio']
+
+        cumplidas = 0
+        for regla, (bit, _) in zip(self.reglas, self._exclusiones):
+            if self._cumple(regla, nombre, categoria, precio):
+                cumplidas |= bit
+
+        mascara = cumplidas
+        for bit, excluyentes in self._exclusiones:
+            if cumplidas & excluyentes:
+                mascara &= ~bit
+        return mascara
+
+    def mascara(self, atributos: Iterable[str]) -> int:
+        """Bits de los atributos pedidos; los que no tienen regla no aportan"""
+        mascara = 0
+        for atributo in atributos:
+            mascara |= self.bits.get(atributo, 0)
+        return mascara
@@ -6,68 +6,193 @@ Servidor FastAPI para Sistema LCLN - Integración con Frontend
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from contextlib import asynccontextmanager
 import uvicorn
 import asyncio
+import copy
+import json
 import os
+import threading
 import time
-import mysql.connector
+from almacen_catalogo import almacen_compartido
+from cache_lru import CacheLRU
+from corrector_ortografico import estadisticas_correctores
+from ejecutor_busqueda import CargaExcedida, EjecutorBusqueda
+from indice_sugerencias import sugerencias_catalogo
+from metricas_busqueda import estadisticas_escritores
+from metricas_latencia import exposicion, histograma, indicador, latencia_fases
+from pool_conexiones import estadisticas_pools
 from sistema_lcln_simple import SistemaLCLNSimplificado
+from tamano_memoria import memoria_proceso
+from token_lcln import tokens_a_dicts
+from traza import capturar_traza, trazar
 
-# Configuración de BD para el sistema completo
-mysql_config = {
-    'host': os.getenv('MYSQLHOST', os.getenv('MYSQL_HOST', 'mysql.railway.internal')),
-    'port': int(os.getenv('MYSQLPORT', os.getenv('MYSQL_PORT', 3306))),
-    'database': os.getenv('MYSQLDATABASE', os.getenv('MYSQL_DATABASE', 'railway')),
-    'user': os.getenv('MYSQLUSER', os.getenv('MYSQL_USER', 'root')),
-    'password': os.getenv('MYSQLPASSWORD', os.getenv('MYSQL_PASSWORD', '')),
-    'charset': 'utf8mb4',
-    'ssl_disabled': True,
-    'autocommit': True
-}
-
-# Inicializar sistema LCLN original (el que ya funcionaba)
-sistema_lcln = SistemaLCLNSimplificado()
-
-# Intentar importar sistema mejorado completo PRIMERO
+# Catálogo único del proceso: todos los sistemas leen sus instantáneas
+almacen = almacen_compartido()
+
+# Motores LCLN: se construyen en el arranque (lifespan) o con la primera
+# petición que los usa, no al importar el módulo
+sistema_lcln: Optional[SistemaLCLNSimplificado] = None
 sistema_lcln_plus = None
-try:
-    from sistema_lcln_mejorado_limpio import SistemaLCLNMejorado
-    sistema_lcln_plus = SistemaLCLNMejorado()
-    print("✅ Sistema LCLN Mejorado Completo cargado correctamente")
-except ImportError as e:
-    print(f"⚠️ Sistema LCLN mejorado completo no disponible: {e}")
-    try:
-        from sistema_lcln_mejorado import sistema_lcln_mejorado
-        sistema_lcln_plus = sistema_lcln_mejorado
-        print("✅ Sistema LCLN mejorado básico cargado")
-    except ImportError as e2:
-        print(f"⚠️ Sistema LCLN mejorado básico tampoco disponible: {e2}")
-        sistema_lcln_plus = None
-except Exception as e:
-    print(f"❌ Error cargando sistema LCLN mejorado: {e}")
-    sistema_lcln_plus = None
+_lock_sistemas = threading.Lock()
+
+def cargar_sistemas():
+    """
+    Construye los motores una sola vez. El sistema mejorado básico (que
+    arrastra el analizador léxico completo) solo se importa si el completo
+    no está disponible.
+    """
+    global sistema_lcln, sistema_lcln_plus
+    if sistema_lcln is not None:
+        return
+    with _lock_sistemas:
+        if sistema_lcln is not None:
+            return
+
+        # Intentar importar sistema mejorado completo PRIMERO
+        plus = None
+        try:
+            from sistema_lcln_mejorado_limpio import SistemaLCLNMejorado
+            plus = SistemaLCLNMejorado(almacen)
+            print("✅ Sistema LCLN Mejorado Completo cargado correctamente")
+        except ImportError as e:
+            print(f"⚠️ Sistema LCLN mejorado completo no disponible: {e}")
+            try:
+                from sistema_lcln_mejorado import sistema_lcln_mejorado
+                plus = sistema_lcln_mejorado
+                print("✅ Sistema LCLN mejorado básico cargado")
+            except ImportError as e2:
+                print(f"⚠️ Sistema LCLN mejorado básico tampoco disponible: {e2}")
+        except Exception as e:
+            print(f"❌ Error cargando sistema LCLN mejorado: {e}")
+
+        sistema_lcln_plus = plus
+        # Sistema LCLN original (el que ya funcionaba); se asigna al final
+        # porque marca la carga como completa
+        sistema_lcln = SistemaLCLNSimplificado(almacen)
+
+async def asegurar_sistemas():
+    """
+    ``cargar_sistemas`` para los handlers async: la primera construcción
+    (importar el analizador y armar los motores) corre en un hilo aparte
+    para no detener el event loop
+    """
+    if sistema_lcln is None:
+        await asyncio.to_thread(cargar_sistemas)
+
+# Consultas por petición de /search/batch
+MAX_CONSULTAS_LOTE = int(os.getenv('LCLN_BATCH_MAX', 50))
+
+# Autocompletado de /suggest: índice por prefijo del catálogo compartido
+sugerencias = sugerencias_catalogo(almacen)
+MAX_SUGERENCIAS = int(os.getenv('LCLN_SUGERENCIAS_MAX', 20))
+
+# El pipeline LCLN es síncrono: corre en un pool acotado para no detener el
+# event loop, y con la cola llena las peticiones se rechazan con 503
+ejecutor = EjecutorBusqueda(
+    'busqueda',
+    max_concurrencia=int(os.getenv('LCLN_BUSQUEDA_CONCURRENCIA', 4)),
+    max_cola=int(os.getenv('LCLN_BUSQUEDA_COLA', 32))
+)
+
+def _servicio_saturado(error: CargaExcedida) -> HTTPException:
+    print(f"[API] Petición rechazada: {error}")
+    return HTTPException(
+        status_code=503,
+        detail="Servicio saturado, intente de nuevo en unos segundos",
+        headers={"Retry-After": "1"}
+    )
+
+def _tamano_respuesta(respuesta: Dict[str, Any]) -> int:
+    """Tamaño aproximado de una respuesta: su longitud serializada en JSON"""
+    return len(json.dumps(respuesta, ensure_ascii=False, default=str))
+
+# Respuestas de /search por (versión del catálogo, consulta normalizada y
+# corregida, límite). Acotado por entradas y por memoria, con TTL; se vacía
+# cada vez que se publica una instantánea nueva del catálogo
+cache_busquedas = CacheLRU(
+    max_entradas=int(os.getenv('LCLN_CACHE_BUSQUEDAS_MAX', 5000)),
+    ttl_segundos=float(os.getenv('LCLN_CACHE_BUSQUEDAS_TTL', 300)),
+    max_bytes=int(os.getenv('LCLN_CACHE_BUSQUEDAS_BYTES', 32 * 1024 * 1024)),
+    tamano=_tamano_respuesta
+)
+almacen.suscribir(lambda instantanea: cache_busquedas.limpiar())
+
+# Métricas de /metrics: duración de cada petición por endpoint y resultado,
+# y el estado actual del catálogo, del cache de respuestas y del ejecutor
+# (sus tiempos de cola y de ejecución los registra ejecutor_busqueda en
+# ``lcln_ejecutor_segundos``)
+_latencia_peticiones = histograma('lcln_peticion_segundos', 'Duración de las peticiones por endpoint y resultado',
+                                  ('endpoint', 'resultado'))
+
+def _datos(estadisticas: Dict[str, Any], claves) -> Dict[tuple, Any]:
+    return {(clave,): estadisticas[clave] for clave in claves}
+
+indicador('lcln_catalogo_version', 'Versión publicada del catálogo', lambda: almacen.version)
+indicador('lcln_catalogo_productos', 'Productos en el catálogo publicado', lambda: len(almacen.instantanea.por_id))
+indicador('lcln_catalogo_bytes_aproximados', 'Memoria aproximada del catálogo publicado y su índice',
+          lambda: almacen.estadisticas_memoria()['bytes_aproximados'])
+indicador('lcln_catalogo_edad_segundos', 'Segundos desde la última recarga exitosa del catálogo',
+          lambda: almacen.refrescador.edad_segundos)
+indicador('lcln_cache_respuestas', 'Estado del cache de respuestas de /search',
+          lambda: _datos(cache_busquedas.estadisticas(),
+                         ('entradas', 'bytes', 'aciertos', 'fallos', 'desalojos', 'caducadas', 'rechazadas')),
+          ('dato',))
+indicador('lcln_ejecutor_busqueda', 'Estado del ejecutor de búsquedas',
+          lambda: _datos(ejecutor.estadisticas(), ('en_ejecucion', 'en_cola', 'completadas', 'errores', 'rechazadas')),
+          ('dato',))
+
+def _con_tiempo(respuesta: Dict[str, Any], inicio: float, endpoint: str, resultado: str) -> Dict[str, Any]:
+    """Registra la petición y pone en la respuesta su duración medida"""
+    segundos = time.perf_counter() - inicio
+    _latencia_peticiones.observar(segundos, endpoint, resultado)
+    respuesta['processing_time_ms'] = round(segundos * 1000, 3)
+    return respuesta
+
+def _clave_busqueda(consulta: str, limite: int):
+    """
+    Clave del cache de respuestas y resultado de la corrección ortográfica.
+    Dos consultas que quedan iguales tras normalizar espacios, mayúsculas y
+    errores de escritura comparten entrada.
+    """
+    texto = ' '.join(consulta.lower().split())
+    correccion = None
+    if sistema_lcln_plus and hasattr(sistema_lcln_plus, '_fase_correccion_ortografica'):
+        with latencia_fases.tramo('correccion'):
+            correccion = sistema_lcln_plus._fase_correccion_ortografica(texto)
+        texto = ' '.join(correccion['texto_corregido'].split())
+    return (almacen.version, texto, limite), correccion
+
+def _preparar_busqueda(consulta: str, limite: int):
+    """
+    Clave, corrección y respuesta cacheada (o None) de una consulta. Corre
+    en el ejecutor: la corrección ortográfica no debe ocupar el event loop
+    """
+    clave, correccion = _clave_busqueda(consulta, limite)
+    return clave, correccion, cache_busquedas.obtener(clave)
+
+def _claves_lote(textos: List[str], limite: int) -> Dict[str, Any]:
+    """``_clave_busqueda`` de cada texto de un lote, en una sola tarea del ejecutor"""
+    return {texto: _clave_busqueda(texto, limite) for texto in textos}
+
+def _respuesta_desde_cache(respuesta: Dict[str, Any], consulta: str, correccion: Optional[Dict]) -> Dict[str, Any]:
+    """Copia de una respuesta cacheada con los datos propios de esta consulta"""
+    respuesta = dict(respuesta)
+    respuesta['recommendations'] = list(respuesta.get('recommendations') or [])
+    respuesta['original_query'] = consulta
+    respuesta['metadata'] = dict(respuesta.get('metadata') or {})
+    if correccion is not None and 'correccion_ortografica' in respuesta['metadata']:
+        respuesta['metadata']['correccion_ortografica'] = correccion.get('correcciones_aplicadas', False)
+    respuesta['metadata']['cache'] = True
+    return respuesta
 
 def obtener_productos_bd():
-    """Obtener productos de la base de datos para el sistema mejorado"""
+    """Productos del catálogo compartido para el sistema mejorado"""
     try:
-        conexion = mysql.connector.connect(**mysql_config)
-        cursor = conexion.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT p.id_producto as id, p.nombre, p.precio, p.cantidad, p.id_categoria, p.imagen,
-                   c.nombre as categoria_nombre
-            FROM productos p
-            LEFT JOIN categorias c ON p.id_categoria = c.id_categoria
-        """)
-        productos = cursor.fetchall()
-        
-        cursor.close()
-        conexion.close()
-        
-        return productos
+        return almacen.actual().productos()
     except Exception as e:
         print(f"Error obteniendo productos: {e}")
         return []
@@ -77,7 +202,12 @@ async def lifespan(app: FastAPI):
     # Startup
     print("Inicializando Sistema LCLN API...")
     try:
-        # El sistema se inicializa automáticamente en la primera búsqueda
+        await asegurar_sistemas()
+        # El catálogo se carga y se mantiene fresco en segundo plano, una
+        # sola vez para todos los sistemas; las búsquedas usan la última
+        # instantánea mientras se recarga
+        almacen.refrescador.iniciar()
+        sugerencias.refrescador.iniciar()
         print("Sistema LCLN API listo")
     except Exception as e:
         print(f"Error inicializando: {e}")
@@ -86,6 +216,9 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("Cerrando Sistema LCLN API...")
+    sugerencias.refrescador.detener()
+    almacen.refrescador.detener()
+    ejecutor.cerrar()
 
 # Inicializar FastAPI
 app = FastAPI(
@@ -120,6 +253,12 @@ app.add_middleware(
 class SearchRequest(BaseModel):
     query: str
     limit: Optional[int] = 20
+    # Devuelve la traza de depuración de esta búsqueda (sin pasar por el cache)
+    trace: Optional[bool] = False
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    limit: Optional[int] = 20
 
 class SearchResponse(BaseModel):
     success: bool
@@ -130,6 +269,7 @@ class SearchResponse(BaseModel):
     recommendations: List[Dict[str, Any]]
     metadata: Dict[str, Any]
     sql_query: Optional[str] = None
+    trace: Optional[List[Dict[str, Any]]] = None
 
 class HealthResponse(BaseModel):
     status: str
@@ -159,7 +299,10 @@ def root():
         },
         "endpoints": {
             "/search": "Búsqueda inteligente de productos",
+            "/search/batch": "Varias búsquedas en una petición",
+            "/suggest": "Autocompletado por prefijo, de lo más vendido a lo menos",
             "/health": "Estado del sistema",
+            "/metrics": "Métricas de latencia en formato Prometheus",
             "/analisis-lexico-plus": "Análisis léxico formal avanzado"
         }
     }
@@ -184,8 +327,58 @@ def health_check():
 @app.post("/search", response_model=SearchResponse)
 async def search_products(request: SearchRequest):
     """
-    Búsqueda inteligente de productos usando sistema LCLN
+    Búsqueda inteligente de productos usando sistema LCLN, con cache de
+    respuestas por consulta normalizada. Con ``trace`` la búsqueda se
+    resuelve siempre en el motor y la respuesta incluye su traza
     """
+    inicio = time.perf_counter()
+    await asegurar_sistemas()
+    if request.trace:
+        try:
+            respuesta = await ejecutor.ejecutar(_resolver_con_traza, request)
+        except CargaExcedida as e:
+            raise _servicio_saturado(e)
+        return _con_tiempo(respuesta, inicio, '/search', 'traza')
+
+    clave = correccion = None
+    if request.query and request.query.strip():
+        try:
+            clave, correccion, cacheada = await ejecutor.ejecutar(_preparar_busqueda, request.query,
+                                                                  request.limit)
+        except CargaExcedida as e:
+            _latencia_peticiones.observar(time.perf_counter() - inicio, '/search', 'saturado')
+            raise _servicio_saturado(e)
+        if cacheada is not None:
+            return _con_tiempo(_respuesta_desde_cache(cacheada, request.query, correccion),
+                               inicio, '/search', 'cache')
+
+    try:
+        respuesta = await ejecutor.ejecutar(_resolver_busqueda, request, correccion)
+    except CargaExcedida as e:
+        _latencia_peticiones.observar(time.perf_counter() - inicio, '/search', 'saturado')
+        raise _servicio_saturado(e)
+    except Exception:
+        _latencia_peticiones.observar(time.perf_counter() - inicio, '/search', 'error')
+        raise
+    if clave is not None and respuesta.get('success'):
+        # Copia propia: la respuesta entregada no debe compartir objetos con el cache
+        cache_busquedas.guardar(clave, copy.deepcopy(respuesta))
+    return _con_tiempo(respuesta, inicio, '/search', 'motor')
+
+def _resolver_con_traza(request: SearchRequest) -> Dict[str, Any]:
+    """``_resolver_busqueda`` con los registros de traza de esta búsqueda"""
+    with capturar_traza() as registro:
+        respuesta = _resolver_busqueda(request)
+    respuesta['trace'] = registro.registros()
+    return respuesta
+
+def _resolver_busqueda(request: SearchRequest, correccion: Optional[Dict] = None) -> Dict[str, Any]:
+    """
+    Ejecuta la búsqueda con el mejor sistema LCLN disponible (en un hilo
+    del ejecutor). ``correccion`` es la fase 1 ya calculada para la clave
+    del cache
+    """
+    inicio = time.perf_counter()
     try:
         if not request.query or request.query.strip() == "":
             raise HTTPException(
@@ -193,20 +386,20 @@ async def search_products(request: SearchRequest):
                 detail="Query parameter is required and cannot be empty"
             )
 
-        print(f"[API] Procesando consulta: '{request.query}'")
+        trazar('API', "Procesando consulta: '{}'", request.query)
         
         # PRIORIDAD 1: Usar sistema LCLN mejorado completo si está disponible
         if sistema_lcln_plus and hasattr(sistema_lcln_plus, 'analizar_consulta_lcln'):
-            print(f"[API] 🧠 Usando sistema LCLN MEJORADO COMPLETO para '{request.query}'")
+            trazar('API', "🧠 Usando sistema LCLN MEJORADO COMPLETO para '{}'", request.query)
             
             # Usar el método completo del sistema mejorado
-            resultado_completo = sistema_lcln_plus.analizar_consulta_lcln(request.query)
+            resultado_completo = sistema_lcln_plus.analizar_consulta_lcln(request.query, correccion)
             
             if resultado_completo:
                 fase_5 = resultado_completo.get('fase_5_motor_recomendaciones', {})
                 productos_encontrados = fase_5.get('productos_encontrados', [])
                 
-                print(f"[API] ✅ Sistema mejorado completo exitoso: {len(productos_encontrados)} productos")
+                trazar('API', "✅ Sistema mejorado completo exitoso: {} productos", len(productos_encontrados))
                 
                 # Convertir formato del sistema mejorado al formato de respuesta
                 productos_formateados = []
@@ -226,7 +419,7 @@ async def search_products(request: SearchRequest):
                 
                 return {
                     'success': True,
-                    'processing_time_ms': 0.0,
+                    'processing_time_ms': round((time.perf_counter() - inicio) * 1000, 3),
                     'original_query': request.query,
                     'products_found': len(productos_formateados),
                     'user_message': f'Búsqueda LCLN Completa: {len(productos_formateados)} productos encontrados',
@@ -250,17 +443,17 @@ async def search_products(request: SearchRequest):
         
         # PRIORIDAD 2: Sistema mejorado básico
         elif sistema_lcln_plus:
-            print(f"[API] 🧠 Usando sistema LCLN MEJORADO BÁSICO para '{request.query}'")
+            trazar('API', "🧠 Usando sistema LCLN MEJORADO BÁSICO para '{}'", request.query)
             
             # Obtener productos de la BD
             productos_bd = obtener_productos_bd()
-            print(f"[API] 📊 Productos BD obtenidos: {len(productos_bd)}")
+            trazar('API', "📊 Productos BD obtenidos: {}", len(productos_bd))
             
             # Usar sistema mejorado
             resultado_mejorado = sistema_lcln_plus(request.query, productos_bd)
             
             if resultado_mejorado.get('status') == 'success':
-                print(f"[API] ✅ Sistema mejorado básico exitoso: {len(resultado_mejorado.get('recomendaciones', []))} productos")
+                trazar('API', "✅ Sistema mejorado básico exitoso: {} productos", len(resultado_mejorado.get('recomendaciones', [])))
                 
                 # Convertir formato del sistema mejorado al formato de respuesta
                 productos_formateados = []
@@ -280,7 +473,7 @@ async def search_products(request: SearchRequest):
                 
                 return {
                     'success': True,
-                    'processing_time_ms': 0.0,
+                    'processing_time_ms': round((time.perf_counter() - inicio) * 1000, 3),
                     'original_query': request.query,
                     'products_found': len(productos_formateados),
                     'user_message': f'Búsqueda LCLN Mejorada: {len(productos_formateados)} productos encontrados',
@@ -291,7 +484,7 @@ async def search_products(request: SearchRequest):
                         'analisis_contextual': True,
                         'bnf_grammar': True,
                         'semantic_categorization': True,
-                        'tokens': resultado_mejorado.get('tokens', []),
+                        'tokens': tokens_a_dicts(resultado_mejorado.get('tokens', [])),
                         'interpretacion': resultado_mejorado.get('interpretacion', {})
                     },
                     'sql_query': 'LCLN Sistema Mejorado'
@@ -300,15 +493,15 @@ async def search_products(request: SearchRequest):
                 print(f"[API] ⚠️ Sistema mejorado básico falló, usando fallback original")
         
         # FALLBACK: Usar sistema LCLN original
-        print(f"[API] 🔄 Usando sistema LCLN ORIGINAL para '{request.query}'")
+        trazar('API', "🔄 Usando sistema LCLN ORIGINAL para '{}'", request.query)
         productos = sistema_lcln.buscar_productos(request.query, request.limit)
         
-        print(f"[API] 📊 Productos recibidos del sistema original: {len(productos)}")
+        trazar('API', "📊 Productos recibidos del sistema original: {}", len(productos))
         
         # Formatear respuesta en el formato esperado
         resultado = {
             'success': True,
-            'processing_time_ms': 0.0,
+            'processing_time_ms': round((time.perf_counter() - inicio) * 1000, 3),
             'original_query': request.query,
             'products_found': len(productos),
             'user_message': f'Búsqueda LCLN original: {len(productos)} productos encontrados',
@@ -346,18 +539,10 @@ async def search_products(request: SearchRequest):
             # Si falla el análisis plus, no afecta la funcionalidad principal
             resultado['metadata']['analisis_lexico_plus'] = {'error': str(e), 'sistema': 'Error'}
         
-        print(f"[API] Búsqueda completada: {resultado['products_found']} productos en {resultado['processing_time_ms']:.1f}ms")
+        trazar('API', "Búsqueda completada: {} productos en {:.1f}ms", resultado['products_found'], resultado['processing_time_ms'])
         
-        return SearchResponse(
-            success=resultado['success'],
-            processing_time_ms=resultado['processing_time_ms'],
-            original_query=resultado['original_query'],
-            products_found=resultado['products_found'],
-            user_message=resultado['user_message'],
-            recommendations=resultado['recommendations'],
-            metadata=resultado['metadata'],
-            sql_query=resultado.get('sql_query', 'LCLN Sistema Original')
-        )
+        resultado.setdefault('sql_query', 'LCLN Sistema Original')
+        return resultado
         
     except HTTPException:
         raise
@@ -368,6 +553,128 @@ async def search_products(request: SearchRequest):
             detail=f"Error interno del servidor: {str(e)}"
         )
 
+@app.post("/search/batch")
+async def search_batch(request: BatchSearchRequest):
+    """
+    Varias búsquedas en una sola petición. Las consultas que quedan iguales
+    tras normalizar y corregir se resuelven una vez; las distintas que no
+    están en el cache corren en paralelo en el ejecutor, sin ocupar más
+    plazas que su concurrencia. Cada resultado lleva su tiempo y si salió
+    del cache o de otra consulta repetida del lote.
+    """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="queries cannot be empty")
+    if len(request.queries) > MAX_CONSULTAS_LOTE:
+        raise HTTPException(status_code=400,
+                            detail=f"A batch accepts at most {MAX_CONSULTAS_LOTE} queries")
+
+    inicio_lote = time.perf_counter()
+    await asegurar_sistemas()
+
+    # Corrección una sola vez por texto normalizado (todas en el ejecutor),
+    # resolución una sola vez por clave
+    textos = {posicion: ' '.join((consulta or '').lower().split())
+              for posicion, consulta in enumerate(request.queries)}
+    try:
+        normalizadas = await ejecutor.ejecutar(_claves_lote, list(dict.fromkeys(filter(None, textos.values()))),
+                                               request.limit)
+    except CargaExcedida as e:
+        _latencia_peticiones.observar(time.perf_counter() - inicio_lote, '/search/batch', 'saturado')
+        raise _servicio_saturado(e)
+    correcciones: Dict[int, Optional[Dict]] = {}
+    grupos: Dict[Any, List[int]] = {}
+    for posicion, texto in textos.items():
+        if not texto:
+            continue
+        clave, correcciones[posicion] = normalizadas[texto]
+        grupos.setdefault(clave, []).append(posicion)
+
+    resultados: List[Optional[Dict[str, Any]]] = [None] * len(request.queries)
+    limite_paralelo = asyncio.Semaphore(ejecutor.max_concurrencia)
+
+    async def resolver(clave, posiciones: List[int]):
+        inicio = time.perf_counter()
+        primera = request.queries[posiciones[0]]
+        respuesta = cache_busquedas.obtener(clave)
+        cacheada = respuesta is not None
+        error = None
+        if not cacheada:
+            try:
+                async with limite_paralelo:
+                    respuesta = await ejecutor.ejecutar(
+                        _resolver_busqueda, SearchRequest(query=primera, limit=request.limit),
+                        correcciones[posiciones[0]])
+                if respuesta.get('success'):
+                    cache_busquedas.guardar(clave, copy.deepcopy(respuesta))
+            except CargaExcedida:
+                error = "Servicio saturado, intente de nuevo en unos segundos"
+            except Exception as e:
+                print(f"[API] Error en búsqueda del lote '{primera}': {e}")
+                error = f"Error interno del servidor: {str(e)}"
+        tiempo_ms = round((time.perf_counter() - inicio) * 1000, 3)
+
+        for orden, posicion in enumerate(posiciones):
+            consulta = request.queries[posicion]
+            entrada = {
+                'query': consulta,
+                'success': error is None,
+                'cached': cacheada,
+                'deduplicated': orden > 0,
+                'time_ms': tiempo_ms if orden == 0 else 0.0
+            }
+            if error is None:
+                if cacheada or orden > 0:
+                    entrada['response'] = _respuesta_desde_cache(respuesta, consulta, correcciones[posicion])
+                else:
+                    entrada['response'] = respuesta
+                entrada['response']['processing_time_ms'] = tiempo_ms
+            else:
+                entrada['error'] = error
+            resultados[posicion] = entrada
+
+    await asyncio.gather(*(resolver(clave, posiciones) for clave, posiciones in grupos.items()))
+
+    for posicion, consulta in enumerate(request.queries):
+        if resultados[posicion] is None:
+            resultados[posicion] = {'query': consulta, 'success': False, 'cached': False,
+                                    'deduplicated': False, 'time_ms': 0.0,
+                                    'error': "Query cannot be empty"}
+
+    return _con_tiempo({
+        'success': True,
+        'total_queries': len(request.queries),
+        'unique_queries': len(grupos),
+        'cache_hits': sum(1 for resultado in resultados if resultado['cached'] and not resultado['deduplicated']),
+        'results': resultados
+    }, inicio_lote, '/search/batch', 'motor')
+
+@app.get("/suggest")
+async def suggest(q: str = "", limit: int = 10):
+    """
+    Autocompletado mientras se escribe: nombres de productos, categorías y
+    sinónimos con una palabra que empieza con ``q``, de los más vendidos a
+    los menos. Con el índice ya construido se responde en el event loop,
+    sin pasar por el ejecutor; solo la primera construcción espera en él
+    """
+    inicio = time.perf_counter()
+    if not 1 <= limit <= MAX_SUGERENCIAS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_SUGERENCIAS}")
+
+    if sugerencias.listo:
+        resultado = sugerencias.sugerir(q, limit)
+    else:
+        try:
+            resultado = await ejecutor.ejecutar(sugerencias.sugerir, q, limit)
+        except CargaExcedida as e:
+            _latencia_peticiones.observar(time.perf_counter() - inicio, '/suggest', 'saturado')
+            raise _servicio_saturado(e)
+    return _con_tiempo({
+        'success': True,
+        'query': q,
+        'catalog_version': sugerencias.version,
+        'suggestions': resultado
+    }, inicio, '/suggest', 'ok')
+
 @app.get("/analisis-lexico-plus")
 async def analisis_lexico_plus(query: str):
     """
@@ -380,24 +687,14 @@ async def analisis_lexico_plus(query: str):
                 detail="Query parameter is required"
             )
 
-        import time
-        start_time = time.time()
-        
-        # Usar sistema LCLN mejorado si está disponible, sino usar simple
-        if sistema_lcln_plus:
-            try:
-                resultado_completo = sistema_lcln_plus(query)
-                analisis_resultado = resultado_completo
-                tokens_count = len(resultado_completo.get('tokens', query.split()))
-            except Exception as e:
-                print(f"Error en sistema mejorado, usando simple: {e}")
-                analisis_resultado = sistema_lcln.analizar_consulta(query)
-                tokens_count = len(query.split())
-        else:
-            analisis_resultado = sistema_lcln.analizar_consulta(query)
-            tokens_count = len(query.split())
-        
-        processing_time = (time.time() - start_time) * 1000
+        await asegurar_sistemas()
+        start_time = time.perf_counter()
+        try:
+            analisis_resultado, tokens_count = await ejecutor.ejecutar(_analizar_lexico, query)
+        except CargaExcedida as e:
+            raise _servicio_saturado(e)
+        processing_time = (time.perf_counter() - start_time) * 1000
+        _latencia_peticiones.observar(processing_time / 1000, '/analisis-lexico-plus', 'motor')
         
         return AnalysisResponse(
             query=query,
@@ -406,6 +703,8 @@ async def analisis_lexico_plus(query: str):
             processing_time_ms=processing_time
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[API] Error en análisis plus: {str(e)}")
         raise HTTPException(
@@ -413,6 +712,25 @@ async def analisis_lexico_plus(query: str):
             detail=f"Error en análisis léxico: {str(e)}"
         )
 
+def _analizar_lexico(query: str):
+    """Análisis léxico de /analisis-lexico-plus (en un hilo del ejecutor)"""
+    # Usar sistema LCLN mejorado si está disponible, sino usar simple
+    if sistema_lcln_plus:
+        try:
+            resultado_completo = sistema_lcln_plus(query)
+            analisis_resultado = dict(resultado_completo)
+            if 'tokens' in analisis_resultado:
+                analisis_resultado['tokens'] = tokens_a_dicts(analisis_resultado['tokens'])
+            tokens_count = len(resultado_completo.get('tokens', query.split()))
+        except Exception as e:
+            print(f"Error en sistema mejorado, usando simple: {e}")
+            analisis_resultado = sistema_lcln.analizar_consulta(query)
+            tokens_count = len(query.split())
+    else:
+        analisis_resultado = sistema_lcln.analizar_consulta(query)
+        tokens_count = len(query.split())
+    return analisis_resultado, tokens_count
+
 @app.get("/toggle-plus/{mode}")
 def toggle_plus_mode(mode: str):
     """
@@ -426,20 +744,46 @@ def toggle_plus_mode(mode: str):
 @app.get("/cache-stats")
 def get_cache_stats():
     """
-    Estadísticas del cache del sistema
+    Estadísticas de caches e índices: entradas, memoria aproximada,
+    aciertos, fallos y desalojos; versión, edad y refresco del catálogo, y
+    memoria del proceso
     """
     try:
-        # Obtener estadísticas del cache si está disponible
+        instantanea = almacen.instantanea
+        motores = {}
+        if sistema_lcln is not None:
+            motores['lcln'] = sistema_lcln.estadisticas()
+        if sistema_lcln_plus is not None and hasattr(sistema_lcln_plus, 'estadisticas'):
+            motores['lcln_plus'] = sistema_lcln_plus.estadisticas()
+
         stats = {
             "cache_enabled": True,
-            "products_cached": len(sistema_lcln._cache_productos) if hasattr(sistema_lcln, '_cache_productos') else 0,
-            "categories_cached": len(sistema_lcln._cache_categorias) if hasattr(sistema_lcln, '_cache_categorias') else 0,
-            "last_update": "dynamic"
+            "products_cached": len(instantanea.por_id),
+            "categories_cached": len(instantanea.categorias),
+            "last_update": instantanea.creada.isoformat() if instantanea.creada else None,
+            "process": dict(memoria_proceso(), pid=os.getpid()),
+            "catalog": almacen.estadisticas(),
+            "catalog_memory": almacen.estadisticas_memoria(),
+            "engines": motores,
+            "response_cache": cache_busquedas.estadisticas(),
+            "suggestions": sugerencias.estadisticas(),
+            "spell_correctors": estadisticas_correctores(),
+            "search_executor": ejecutor.estadisticas(),
+            "db_pools": estadisticas_pools(),
+            "metrics_writers": estadisticas_escritores()
         }
         return stats
     except Exception as e:
         return {"error": str(e), "cache_enabled": False}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Histogramas de latencia (peticiones, fases del análisis LCLN, recargas
+    del catálogo) y estado actual en el formato de texto de Prometheus
+    """
+    return PlainTextResponse(exposicion(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Ejecutar servidor
 if __name__ == "__main__":
     print("Iniciando Servidor LCLN API...")
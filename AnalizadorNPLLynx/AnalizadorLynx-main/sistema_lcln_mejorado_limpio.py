@@ -3,34 +3,30 @@
 Sistema LCLN Mejorado con Integración Completa de Sinónimos
 Adaptado para Railway con MySQL dinámico
 """
-import mysql.connector
-import os
 from pathlib import Path
 import json
-from typing import List, Dict, Optional
+import re
+from typing import List, Dict, Mapping, Optional
 import difflib
-from datetime import datetime, timedelta
+from datetime import datetime
+from heapq import merge
+from itertools import islice
+from operator import itemgetter
 
-class SistemaLCLNMejorado:
-    def __init__(self):
-        # Configuración MySQL dinámica para Railway
-        self.mysql_config = {
-            'host': os.getenv('MYSQLHOST', os.getenv('MYSQL_HOST', 'mysql.railway.internal')),
-            'port': int(os.getenv('MYSQLPORT', os.getenv('MYSQL_PORT', 3306))),
-            'database': os.getenv('MYSQLDATABASE', os.getenv('MYSQL_DATABASE', 'railway')),
-            'user': os.getenv('MYSQLUSER', os.getenv('MYSQL_USER', 'root')),
-            'password': os.getenv('MYSQLPASSWORD', os.getenv('MYSQL_PASSWORD', '')),
-            'charset': 'utf8mb4',
-            'ssl_disabled': True,
-            'autocommit': True
-        }
+from almacen_catalogo import AlmacenCatalogo, almacen_compartido
+from indice_busqueda import IndiceBusqueda
+from metricas_latencia import latencia_fases
+from tamano_memoria import tamano_profundo
+from token_lcln import Token
+from traza import trazando, trazar
 
-        # Cache dinámico de la BD
-        self._cache_productos = {}
-        self._cache_categorias = {}
-        self._cache_sinonimos = {}
-        self._cache_timestamp = None
-        self._cache_duration = timedelta(minutes=5)
+# Productos que devuelve el motor de recomendaciones
+LIMITE_RESULTADOS = 20
+
+class SistemaLCLNMejorado:
+    def __init__(self, almacen: Optional[AlmacenCatalogo] = None):
+        # Catálogo compartido con los demás sistemas del proceso
+        self.almacen = almacen or almacen_compartido()
 
         # Correcciones ortográficas específicas mejoradas - SEGÚN DOCUMENTACIÓN TÉCNICA LCLN
         self.correcciones_manuales = {
@@ -78,108 +74,90 @@ class SistemaLCLNMejorado:
             'dulce': [{'categoria': 'golosinas', 'tipo': 'categoria', 'confianza': 0.9}],
             'picante': [{'categoria': 'picante', 'tipo': 'atributo', 'confianza': 0.9}]
         }
+        self._cache_sinonimos = self.sinonimos_basicos.copy()
 
-    def _necesita_actualizar_cache(self) -> bool:
-        """Verificar si el cache necesita actualizarse"""
-        if not self._cache_timestamp:
-            return True
-        return datetime.now() - self._cache_timestamp > self._cache_duration
+    # Vistas de la instantánea publicada del catálogo compartido
 
-    def _actualizar_cache_dinamico(self):
-        """Actualizar cache con datos actuales de MySQL"""
-        if not self._necesita_actualizar_cache():
-            return
+    @property
+    def _cache_productos(self) -> Mapping[str, Dict]:
+        return self.almacen.instantanea.por_nombre
 
-        print("Actualizando cache dinamico desde MySQL...")
+    @property
+    def _cache_categorias(self) -> Mapping[str, Dict]:
+        return self.almacen.instantanea.categorias
 
-        # Actualizar productos desde MySQL
-        self._actualizar_cache_productos()
+    @property
+    def _indice_busqueda(self) -> IndiceBusqueda:
+        return self.almacen.instantanea.indice
 
-        # Usar sinónimos básicos integrados
-        self._cache_sinonimos = self.sinonimos_basicos.copy()
+    @property
+    def _cache_timestamp(self) -> Optional[datetime]:
+        return self.almacen.instantanea.creada
 
-        self._cache_timestamp = datetime.now()
-        print(f"Cache actualizado: {len(self._cache_productos)} productos, {len(self._cache_categorias)} categorias, {len(self._cache_sinonimos)} sinonimos")
-
-    def _actualizar_cache_productos(self):
-        """Actualizar productos desde MySQL"""
-        try:
-            conn = mysql.connector.connect(**self.mysql_config)
-            cursor = conn.cursor(dictionary=True)
-
-            cursor.execute("""
-                SELECT p.id_producto, p.nombre, p.precio, p.cantidad, p.imagen,
-                       c.id_categoria, c.nombre as categoria_nombre
-                FROM productos p
-                JOIN categorias c ON p.id_categoria = c.id_categoria
-                WHERE p.cantidad > 0
-                ORDER BY p.nombre
-            """)
-
-            productos = cursor.fetchall()
-            self._cache_productos = {}
-            self._cache_categorias = {}
-
-            for producto in productos:
-                # Cache de productos por nombre (normalizado)
-                nombre_key = producto['nombre'].lower()
-                self._cache_productos[nombre_key] = {
-                    'id': producto['id_producto'],
-                    'nombre': producto['nombre'],
-                    'precio': float(producto['precio']),
-                    'cantidad': producto['cantidad'],
-                    'imagen': producto['imagen'] or 'default.jpg',
-                    'categoria_id': producto['id_categoria'],
-                    'categoria_nombre': producto['categoria_nombre']
-                }
-
-                # Cache de categorías
-                cat_key = producto['categoria_nombre'].lower()
-                if cat_key not in self._cache_categorias:
-                    self._cache_categorias[cat_key] = {
-                        'id': producto['id_categoria'],
-                        'nombre': producto['categoria_nombre']
-                    }
-
-            cursor.close()
-            conn.close()
-
-        except Exception as e:
-            print(f"[ERROR] Error actualizando cache MySQL: {e}")
-
-    def analizar_consulta_lcln(self, consulta: str) -> Dict:
+    def estadisticas(self) -> Dict:
         """
-        Análisis LCLN completo mejorado con sinónimos
+        Caches propios del motor; el índice de búsqueda y los productos son
+        los de la instantánea del almacén compartido
         """
-        # Asegurar cache actualizado
-        self._actualizar_cache_dinamico()
+        return {
+            'catalogo_version': self.almacen.version,
+            'sinonimos': {'entradas': len(self._cache_sinonimos),
+                          'bytes_aproximados': tamano_profundo(self._cache_sinonimos)},
+            'correcciones_manuales': {'entradas': len(self.correcciones_manuales),
+                                      'bytes_aproximados': tamano_profundo(self.correcciones_manuales)}
+        }
+
+    def _actualizar_cache_dinamico(self):
+        """
+        Asegura un catálogo cargado. Solo la primera carga hace esperar a la
+        búsqueda; si el catálogo está vencido se pide la recarga y se sigue
+        con la instantánea actual.
+        """
+        self.almacen.asegurar()
+
+    def analizar_consulta_lcln(self, consulta: str, correccion: Optional[Dict] = None) -> Dict:
+        """
+        Análisis LCLN completo mejorado con sinónimos. ``correccion`` es el
+        resultado de la fase 1 si quien llama ya lo calculó
+        """
+        # Asegurar cache actualizado (solo espera en la primera carga)
+        with latencia_fases.tramo('catalogo'):
+            self._actualizar_cache_dinamico()
 
         consulta_original = consulta
         consulta = consulta.lower().strip()
 
+        # Fase 1: Corrección ortográfica (si quien llama no la calculó ya)
+        if correccion is None:
+            with latencia_fases.tramo('correccion'):
+                correccion = self._fase_correccion_ortografica(consulta)
+
         resultado_analisis = {
             'consulta_original': consulta_original,
-            'fase_1_correccion': self._fase_correccion_ortografica(consulta),
+            'fase_1_correccion': correccion,
             'fase_2_expansion_sinonimos': None,
             'fase_3_tokenizacion': None,
             'fase_4_interpretacion': None,
             'fase_5_motor_recomendaciones': None
         }
 
-        # Fase 1: Corrección ortográfica
         consulta_corregida = resultado_analisis['fase_1_correccion']['texto_corregido']
 
         # Fase 2: Expansión con sinónimos
-        resultado_analisis['fase_2_expansion_sinonimos'] = self._fase_expansion_sinonimos(consulta_corregida)
+        with latencia_fases.tramo('expansion_sinonimos'):
+            resultado_analisis['fase_2_expansion_sinonimos'] = self._fase_expansion_sinonimos(consulta_corregida)
 
         # Fase 3: Tokenización mejorada
-        resultado_analisis['fase_3_tokenizacion'] = self._fase_tokenizacion_mejorada(consulta_corregida, resultado_analisis['fase_2_expansion_sinonimos'])
+        with latencia_fases.tramo('tokenizacion'):
+            resultado_analisis['fase_3_tokenizacion'] = self._fase_tokenizacion_mejorada(consulta_corregida, resultado_analisis['fase_2_expansion_sinonimos'])
 
         # Fase 4: Interpretación semántica
-        resultado_analisis['fase_4_interpretacion'] = self._fase_interpretacion_semantica(resultado_analisis['fase_3_tokenizacion'], resultado_analisis['fase_2_expansion_sinonimos'])
+        with latencia_fases.tramo('interpretacion'):
+            resultado_analisis['fase_4_interpretacion'] = self._fase_interpretacion_semantica(resultado_analisis['fase_3_tokenizacion'], resultado_analisis['fase_2_expansion_sinonimos'])
 
         # Fase 5: Motor de recomendaciones
-        resultado_analisis['fase_5_motor_recomendaciones'] = self._fase_motor_recomendaciones(resultado_analisis['fase_4_interpretacion'])
+        with latencia_fases.tramo('recomendaciones'):
+            resultado_analisis['fase_5_motor_recomendaciones'] = self._fase_motor_recomendaciones(resultado_analisis['fase_4_interpretacion'])
 
         return resultado_analisis
 
@@ -210,7 +188,7 @@ class SistemaLCLNMejorado:
 
     def _fase_expansion_sinonimos(self, consulta: str) -> Dict:
         """Fase 2: Expansión con sinónimos"""
-        print(f"[DEBUG] Expansión sinónimos para: '{consulta}'")
+        trazar('SINÓNIMOS', "Expansión sinónimos para: '{}'", consulta)
         palabras = consulta.split()
         expansion_info = {
             'terminos_expandidos': [],
@@ -229,19 +207,22 @@ class SistemaLCLNMejorado:
             combinacion = ' '.join(palabras[i:i+2])
             terminos_busqueda.append(combinacion)
 
-        print(f"[DEBUG] Términos a buscar: {terminos_busqueda}")
+        trazar('SINÓNIMOS', "Términos a buscar: {}", terminos_busqueda)
+        rastreando = trazando()
 
         for termino in terminos_busqueda:
             termino_key = termino.lower()
             if termino_key in self._cache_sinonimos:
-                print(f"[DEBUG] Encontrado sinónimo para '{termino_key}'")
+                if rastreando:
+                    trazar('SINÓNIMOS', "Encontrado sinónimo para '{}'", termino_key)
                 sinonimos_del_termino = self._cache_sinonimos[termino_key]
                 
                 # Si el sinónimo es una lista (multiple sinónimos para una frase)
                 if isinstance(sinonimos_del_termino, list):
                     for sinonimo in sinonimos_del_termino:
                         if sinonimo['confianza'] >= 0.7:
-                            print(f"[DEBUG] Agregando sinónimo: {sinonimo}")
+                            if rastreando:
+                                trazar('SINÓNIMOS', "Agregando sinónimo: {}", sinonimo)
                             if sinonimo['tipo'] == 'categoria':
                                 expansion_info['categorias_detectadas'].add(sinonimo['categoria'])
                             elif sinonimo['tipo'] == 'producto':
@@ -263,12 +244,11 @@ class SistemaLCLNMejorado:
             'atributos_detectados': list(expansion_info['atributos_detectados'])
         }
         
-        print(f"[DEBUG] Resultado expansión: {resultado}")
+        trazar('SINÓNIMOS', "Resultado expansión: {}", resultado)
         return resultado
 
     def _fase_tokenizacion_mejorada(self, consulta: str, expansion: Dict) -> Dict:
         """Fase 3: Tokenización mejorada con contexto de sinónimos"""
-        palabras = consulta.split()
         tokens = []
 
         # Detectar atributos específicos
@@ -280,30 +260,31 @@ class SistemaLCLNMejorado:
             'caro': ['caro', 'caros', 'cara', 'caras', 'costoso', 'premium']
         }
 
-        for palabra in palabras:
-            token = {
-                'palabra': palabra,
-                'tipo': 'PALABRA_GENERICA',
-                'valor': palabra,
-                'confianza': 0.5
-            }
+        categorias_detectadas = {cat.lower() for cat in expansion['categorias_detectadas']}
+        productos_detectados = {prod.lower() for prod in expansion['productos_detectados']}
+
+        # Cada palabra es un intervalo sobre la consulta
+        for coincidencia in re.finditer(r'\S+', consulta):
+            palabra = coincidencia.group()
+            token = Token('PALABRA_GENERICA', consulta, coincidencia.start(), coincidencia.end(),
+                          palabra=palabra, confianza=0.5)
 
             # Verificar si es un atributo conocido
             for atributo, variantes in atributos_conocidos.items():
                 if palabra in variantes:
-                    token['tipo'] = 'ATRIBUTO'
+                    token.tipo = 'ATRIBUTO'
                     token['atributo'] = atributo
                     token['confianza'] = 0.9
                     break
 
             # Verificar si es una categoría (de sinónimos)
-            if palabra in [cat.lower() for cat in expansion['categorias_detectadas']]:
-                token['tipo'] = 'CATEGORIA'
+            if palabra in categorias_detectadas:
+                token.tipo = 'CATEGORIA'
                 token['confianza'] = 0.8
 
             # Verificar si es un producto específico (de sinónimos)
-            if palabra in [prod.lower() for prod in expansion['productos_detectados']]:
-                token['tipo'] = 'PRODUCTO_ESPECIFICO'
+            if palabra in productos_detectados:
+                token.tipo = 'PRODUCTO_ESPECIFICO'
                 token['confianza'] = 0.9
 
             tokens.append(token)
@@ -337,7 +318,7 @@ class SistemaLCLNMejorado:
 
         # Detectar atributos de tokens y sinónimos
         for token in tokens:
-            if token['tipo'] == 'ATRIBUTO':
+            if token.tipo == 'ATRIBUTO':
                 interpretacion['atributos'].append(token['atributo'])
 
                 # Mapear atributos de precio
@@ -362,7 +343,8 @@ class SistemaLCLNMejorado:
             productos_especificos = self._buscar_productos_especificos(
                 interpretacion['productos_especificos'],
                 interpretacion['filtros_precio'],
-                interpretacion['atributos']
+                interpretacion['atributos'],
+                LIMITE_RESULTADOS
             )
 
             if productos_especificos:
@@ -374,7 +356,8 @@ class SistemaLCLNMejorado:
             productos_categoria = self._buscar_por_categoria(
                 interpretacion['categoria_principal'],
                 interpretacion['filtros_precio'],
-                interpretacion['atributos']
+                interpretacion['atributos'],
+                LIMITE_RESULTADOS
             )
 
             if productos_categoria:
@@ -385,7 +368,8 @@ class SistemaLCLNMejorado:
         if not productos_encontrados and interpretacion['atributos']:
             productos_atributos = self._buscar_por_atributos(
                 interpretacion['atributos'],
-                interpretacion['filtros_precio']
+                interpretacion['filtros_precio'],
+                LIMITE_RESULTADOS
             )
 
             if productos_atributos:
@@ -399,7 +383,7 @@ class SistemaLCLNMejorado:
 
         # Formatear productos para frontend
         productos_formateados = []
-        for producto in productos_encontrados[:20]:
+        for producto in productos_encontrados[:LIMITE_RESULTADOS]:
             productos_formateados.append({
                 'id': producto['id'],
                 'nombre': producto['nombre'],
@@ -417,133 +401,62 @@ class SistemaLCLNMejorado:
             'tiene_recomendaciones': len(productos_formateados) > 0
         }
 
-    def _buscar_productos_especificos(self, productos_especificos: List[str], filtros_precio: Dict, atributos: List[str]) -> List[Dict]:
+    def _buscar_productos_especificos(self, productos_especificos: List[str], filtros_precio: Dict,
+                                      atributos: List[str], limite: Optional[int] = None) -> List[Dict]:
         """Buscar productos específicos detectados por sinónimos"""
-        productos = []
-
-        for producto_nombre in productos_especificos:
-            for nombre_producto, data in self._cache_productos.items():
-                # Normalizar nombres para mejor coincidencia
-                producto_normalizado = producto_nombre.lower().replace('-', ' ').replace('  ', ' ').strip()
-                nombre_normalizado = data['nombre'].lower().replace('-', ' ').replace('  ', ' ').strip()
-
-                # Buscar coincidencia
-                if (producto_normalizado in nombre_normalizado or 
-                    any(palabra in nombre_normalizado for palabra in producto_normalizado.split())):
-                    
-                    # Aplicar filtros de precio
-                    precio = data['precio']
-                    if filtros_precio.get('min') and precio < filtros_precio['min']:
-                        continue
-                    if filtros_precio.get('max') and precio > filtros_precio['max']:
-                        continue
-
-                    # Aplicar filtros de atributos
-                    if atributos and not self._producto_cumple_atributos(data, atributos):
-                        continue
-
-                    productos.append(data)
-
-        return sorted(productos, key=lambda x: x['precio'])
-
-    def _buscar_por_categoria(self, categoria: str, filtros_precio: Dict, atributos: List[str]) -> List[Dict]:
+        indice = self._indice_busqueda
+        minimo, maximo = filtros_precio.get('min'), filtros_precio.get('max')
+
+        # Una lista en orden de precio por producto específico. Un producto
+        # puede repetirse si lo nombran varios, como en el recorrido original;
+        # con precios iguales la mezcla respeta el orden de los nombres
+        listas = [indice.por_texto(producto_nombre, minimo, maximo)
+                  for producto_nombre in productos_especificos]
+        coincidencias = merge(*listas, key=itemgetter(0))
+
+        # Filtro de atributos con la máscara precalculada de cada producto
+        if atributos:
+            mascara = indice.reglas.mascara(atributos)
+            mascaras = indice.mascaras
+            coincidencias = (par for par in coincidencias if mascaras[par[1]] & mascara)
+
+        return self._tomar_productos(indice, coincidencias, limite)
+
+    def _buscar_por_categoria(self, categoria: str, filtros_precio: Dict, atributos: List[str],
+                              limite: Optional[int] = None) -> List[Dict]:
         """Buscar productos por categoría con filtros"""
-        productos = []
-
-        for nombre_producto, data in self._cache_productos.items():
-            categoria_producto = data['categoria_nombre'].lower()
+        indice = self._indice_busqueda
+        bitmap = indice.bitmap_categoria(categoria) & indice.bitmap_rango(filtros_precio.get('min'),
+                                                                          filtros_precio.get('max'))
+        if atributos:
+            bitmap &= indice.bitmap_atributos(atributos)
 
-            # Verificar categoría
-            if categoria.lower() not in categoria_producto and categoria_producto not in categoria.lower():
-                continue
+        return self._tomar_productos(indice, indice.recorrer(bitmap), limite)
 
-            # Aplicar filtros de precio
-            precio = data['precio']
-            if filtros_precio.get('min') and precio < filtros_precio['min']:
-                continue
-            if filtros_precio.get('max') and precio > filtros_precio['max']:
-                continue
-
-            # Aplicar filtros de atributos
-            if atributos and not self._producto_cumple_atributos(data, atributos):
-                continue
-
-            productos.append(data)
-
-        return sorted(productos, key=lambda x: x['precio'])
-
-    def _buscar_por_atributos(self, atributos: List[str], filtros_precio: Dict) -> List[Dict]:
+    def _buscar_por_atributos(self, atributos: List[str], filtros_precio: Dict,
+                              limite: Optional[int] = None) -> List[Dict]:
         """Buscar productos por atributos específicos"""
-        productos = []
-
-        for nombre_producto, data in self._cache_productos.items():
-            if self._producto_cumple_atributos(data, atributos):
-                # Aplicar filtros de precio
-                precio = data['precio']
-                if filtros_precio.get('min') and precio < filtros_precio['min']:
-                    continue
-                if filtros_precio.get('max') and precio > filtros_precio['max']:
-                    continue
+        indice = self._indice_busqueda
+        bitmap = indice.bitmap_atributos(atributos) & indice.bitmap_rango(filtros_precio.get('min'),
+                                                                          filtros_precio.get('max'))
+        return self._tomar_productos(indice, indice.recorrer(bitmap), limite)
 
-                productos.append(data)
-
-        return sorted(productos, key=lambda x: x['precio'])
+    @staticmethod
+    def _tomar_productos(indice: IndiceBusqueda, pares, limite: Optional[int]) -> List[Dict]:
+        """Productos de pares (precio, slot) ya ordenados, hasta el límite"""
+        productos = indice.productos
+        return [productos[slot] for _, slot in islice(pares, limite)]
 
     def _producto_cumple_atributos(self, producto: Dict, atributos: List[str]) -> bool:
-        """Verificar si un producto cumple con los atributos especificados"""
-        nombre_lower = producto['nombre'].lower()
-        categoria_lower = producto['categoria_nombre'].lower()
-
-        for atributo in atributos:
-            if atributo == 'picante':
-                if any(keyword in nombre_lower for keyword in ['fuego', 'picante', 'hot', 'flamin', 'dinamita', 'chile', 'adobadas']):
-                    return True
-            elif atributo == 'dulce':
-                es_picante = any(keyword in nombre_lower for keyword in ['fuego', 'picante', 'hot', 'flamin', 'dinamita', 'chile', 'adobadas'])
-                if not es_picante and (categoria_lower in ['golosinas', 'snacks']):
-                    return True
-            elif atributo == 'sin azucar':
-                # LÓGICA CLAVE: Solo productos que explícitamente son sin azúcar
-                sin_azucar_keywords = ['sin azúcar', 'light', 'zero', 'diet']
-                
-                # NUEVO: El agua es naturalmente sin azúcar
-                es_agua = 'agua' in nombre_lower
-                
-                cumple_sin_azucar = (any(keyword in nombre_lower for keyword in sin_azucar_keywords) or es_agua)
-                
-                if cumple_sin_azucar:
-                    if es_agua:
-                        print(f"[DEBUG] Producto '{producto['nombre']}' SÍ cumple 'sin azucar' (es agua)")
-                    else:
-                        print(f"[DEBUG] Producto '{producto['nombre']}' SÍ cumple 'sin azucar' (keywords)")
-                    return True
-                else:
-                    print(f"[DEBUG] Producto '{producto['nombre']}' NO cumple 'sin azucar' - keywords buscadas: {sin_azucar_keywords}, es_agua: {es_agua}")
-            elif atributo == 'barato':
-                if producto['precio'] <= 15.0:
-                    return True
-            elif atributo == 'caro':
-                if producto['precio'] >= 25.0:
-                    return True
-
-        return False
-
-    def _buscar_fallback(self, filtros_precio: Dict) -> List[Dict]:
-        """Búsqueda fallback con filtros de precio"""
-        productos = []
+        """Verificar si un producto cumple con alguno de los atributos especificados"""
+        reglas = self._indice_busqueda.reglas
+        return bool(reglas.mascara_producto(producto) & reglas.mascara(atributos))
 
-        for nombre_producto, data in self._cache_productos.items():
-            precio = data['precio']
-
-            # Aplicar filtros de precio si existen
-            if filtros_precio.get('min') and precio < filtros_precio['min']:
-                continue
-            if filtros_precio.get('max') and precio > filtros_precio['max']:
-                continue
-
-            productos.append(data)
-
-        return sorted(productos, key=lambda x: x['precio'])[:10]
+    def _buscar_fallback(self, filtros_precio: Dict, limite: int = 10) -> List[Dict]:
+        """Búsqueda fallback con filtros de precio"""
+        indice = self._indice_busqueda
+        inicio, fin = indice.rango_precio(indice.por_precio, filtros_precio.get('min'), filtros_precio.get('max'))
+        return [indice.productos[slot] for _, slot in indice.por_precio[inicio:min(fin, inicio + limite)]]
 
 # Instancia global
 sistema_lcln_mejorado = SistemaLCLNMejorado()
@@ -9,12 +9,19 @@ from pathlib import Path
 import json
 import os
 import re
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Mapping, Optional
 import difflib
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from almacen_catalogo import AlmacenCatalogo, InstantaneaCatalogo, almacen_compartido
+from indice_sugerencias import sugerencias_catalogo
+from metricas_busqueda import escritor_metricas
+from pool_conexiones import PoolAgotado, pool_mysql
+from tamano_memoria import tamano_profundo
+from traza import trazando, trazar
 
 class SistemaLCLNSimplificado:
-    def __init__(self):
+    def __init__(self, almacen: Optional[AlmacenCatalogo] = None):
         # Configuración MySQL para Railway
         self.mysql_config = {
             'host': os.getenv('MYSQLHOST', os.getenv('MYSQL_HOST', 'mysql.railway.internal')),
@@ -27,12 +34,8 @@ class SistemaLCLNSimplificado:
             'autocommit': True
         }
         
-        # Cache dinámico
-        self._cache_productos = {}
-        self._cache_categorias = {}
-        self._cache_sinonimos = {}
-        self._cache_timestamp = None
-        self._cache_expiry = timedelta(minutes=5)
+        # Catálogo compartido con los demás sistemas del proceso
+        self.almacen = almacen or almacen_compartido()
         
         # Patrones semánticos básicos
         self.categorias_semanticas = {
@@ -53,76 +56,53 @@ class SistemaLCLNSimplificado:
         }
 
     def _conectar_bd(self):
-        """Conectar a la base de datos MySQL"""
+        """Conexión del pool compartido (``close()`` la devuelve al pool)"""
         try:
-            print(f"[DB] Intentando conectar a MySQL:")
-            print(f"[DB] Host: {self.mysql_config['host']}")
-            print(f"[DB] Port: {self.mysql_config['port']}")
-            print(f"[DB] Database: {self.mysql_config['database']}")
-            print(f"[DB] User: {self.mysql_config['user']}")
-            
-            conexion = mysql.connector.connect(**self.mysql_config)
-            print(f"[DB] ✅ Conexión exitosa a MySQL")
-            return conexion
-        except mysql.connector.Error as e:
-            print(f"[DB] ❌ Error conectando a MySQL: {e}")
-            print(f"[DB] ❌ Config: {self.mysql_config}")
+            return pool_mysql(self.mysql_config).obtener()
+        except (mysql.connector.Error, PoolAgotado) as e:
+            print(f"[DB] ❌ Error conectando a MySQL ({self.mysql_config['host']}:{self.mysql_config['port']}): {e}")
             return None
 
-    def _cargar_cache_productos(self):
-        """Cargar productos desde la base de datos al cache"""
-        if (self._cache_timestamp and 
-            datetime.now() - self._cache_timestamp < self._cache_expiry):
-            print(f"[CACHE] Usando cache existente con {len(self._cache_productos)} productos")
-            return
-            
-        print("[CACHE] Cargando productos desde base de datos...")
-        conexion = self._conectar_bd()
-        if not conexion:
-            print("[CACHE] ❌ No se pudo conectar a la base de datos")
-            return
-            
-        try:
-            cursor = conexion.cursor(dictionary=True)
-            
-            # Cargar productos
-            cursor.execute("""
-                SELECT p.id_producto as id, p.nombre, p.precio, p.cantidad, p.id_categoria, p.imagen,
-                       c.nombre as categoria_nombre
-                FROM productos p
-                LEFT JOIN categorias c ON p.id_categoria = c.id_categoria
-            """)
-            productos = cursor.fetchall()
-            
-            print(f"[CACHE] ✅ Obtenidos {len(productos)} productos de la base de datos")
-            
-            self._cache_productos = {}
-            for producto in productos:
-                self._cache_productos[producto['id']] = producto
-                
-            print(f"[CACHE] Productos en cache: {[p['nombre'] for p in list(self._cache_productos.values())[:5]]}")
-                
-            # Cargar sinónimos (opcional, puede no existir la tabla)
-            try:
-                cursor.execute("SELECT * FROM producto_sinonimos")
-                sinonimos = cursor.fetchall()
-                
-                self._cache_sinonimos = {}
-                for sinonimo in sinonimos:
-                    if sinonimo['producto_id'] not in self._cache_sinonimos:
-                        self._cache_sinonimos[sinonimo['producto_id']] = []
-                    self._cache_sinonimos[sinonimo['producto_id']].append(sinonimo['sinonimo'])
-            except mysql.connector.Error:
-                print("Tabla producto_sinonimos no existe, usando solo productos")
-                
-            self._cache_timestamp = datetime.now()
-            
-        except mysql.connector.Error as e:
-            print(f"Error cargando cache: {e}")
-        finally:
-            if conexion.is_connected():
-                cursor.close()
-                conexion.close()
+    # Vistas de la instantánea publicada del catálogo compartido
+
+    @property
+    def _cache_productos(self) -> Mapping[Any, Dict]:
+        return self.almacen.instantanea.por_id
+
+    @property
+    def _cache_categorias(self) -> Mapping[str, Dict]:
+        return self.almacen.instantanea.categorias
+
+    @property
+    def _cache_sinonimos(self) -> Mapping[Any, List[str]]:
+        return self.almacen.instantanea.sinonimos
+
+    @property
+    def _cache_timestamp(self) -> Optional[datetime]:
+        return self.almacen.instantanea.creada
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """
+        Tablas propias del motor; los productos y sinónimos son los de la
+        instantánea del almacén compartido
+        """
+        return {
+            'catalogo_version': self.almacen.version,
+            'categorias_semanticas': {'entradas': len(self.categorias_semanticas),
+                                      'bytes_aproximados': tamano_profundo(self.categorias_semanticas)},
+            'modificadores': {'entradas': len(self.modificadores),
+                              'bytes_aproximados': tamano_profundo(self.modificadores)}
+        }
+
+    def _cargar_cache_productos(self) -> InstantaneaCatalogo:
+        """
+        Instantánea del catálogo para una búsqueda. Solo la primera carga
+        hace esperar; si está vencido se pide el refresco y se sigue usando
+        la actual.
+        """
+        catalogo = self.almacen.actual()
+        trazar('CACHE', "Usando catálogo v{} con {} productos", catalogo.version, len(catalogo.por_id))
+        return catalogo
 
     def _extraer_filtro_precio_completo(self, consulta: str) -> Optional[Dict]:
         """Extraer filtros de precio avanzados con operadores"""
@@ -148,13 +128,13 @@ class SistemaLCLNSimplificado:
                 precio = float(match.group(1))
                 # Identificar si es "mayor a" vs "menor a" basado en el índice del patrón
                 if i in [2, 3]:  # mayores? patrones (con y sin "a")
-                    print(f"Filtro precio detectado (mayor a): >= ${precio}")
+                    trazar('FILTRO', "Filtro precio detectado (mayor a): >= ${}", precio)
                     return {'precio': precio, 'operador': '>=', 'tipo': 'mayor_que'}
                 elif i == 5:  # más de patrón
-                    print(f"Filtro precio detectado (más de): >= ${precio}")
+                    trazar('FILTRO', "Filtro precio detectado (más de): >= ${}", precio)
                     return {'precio': precio, 'operador': '>=', 'tipo': 'mayor_que'}
                 else:  # menores?, menos, máximo, hasta, no más de
-                    print(f"Filtro precio detectado (operador): <= ${precio}")
+                    trazar('FILTRO', "Filtro precio detectado (operador): <= ${}", precio)
                     return {'precio': precio, 'operador': '<=', 'tipo': 'menor_que'}
         
         return None
@@ -214,7 +194,7 @@ class SistemaLCLNSimplificado:
                 'agua mineral', 'fuze tea',
                 '# Bebidas sin azúcar'
             ]
-            print("Detectando bebidas sin azúcar")
+            trazar('ANÁLISIS', "Detectando bebidas sin azúcar")
             
         # 4. Lógica específica para snacks picantes
         elif (resultado['categoria_detectada'] == 'snacks' and 
@@ -224,7 +204,7 @@ class SistemaLCLNSimplificado:
                 'cheetos flamin hot', 'doritos dinamita', 'fritos con chile',
                 'crujitos fuegos', '# Snacks picantes'
             ]
-            print("Detectando snacks picantes")
+            trazar('ANÁLISIS', "Detectando snacks picantes")
             
         # 5. Lógica de hidratación
         elif any(palabra in consulta for palabra in ['agua', 'hidratante', 'refrescante']):
@@ -270,7 +250,8 @@ class SistemaLCLNSimplificado:
         if consulta in mapeo_sinonimos:
             for sinonimo in mapeo_sinonimos[consulta]:
                 if sinonimo.lower() in nombre_producto.lower():
-                    print(f"[SINÓNIMO] ✅ '{consulta}' -> '{sinonimo}' encontrado en '{nombre_producto}'")
+                    if trazando():
+                        trazar('SINÓNIMO', "✅ '{}' -> '{}' encontrado en '{}'", consulta, sinonimo, nombre_producto)
                     return True
         
         # Verificar cada palabra de la consulta individualmente
@@ -279,7 +260,8 @@ class SistemaLCLNSimplificado:
             if palabra in mapeo_sinonimos:
                 for sinonimo in mapeo_sinonimos[palabra]:
                     if sinonimo.lower() in nombre_producto.lower():
-                        print(f"[SINÓNIMO] ✅ Palabra '{palabra}' -> '{sinonimo}' encontrado en '{nombre_producto}'")
+                        if trazando():
+                            trazar('SINÓNIMO', "✅ Palabra '{}' -> '{}' encontrado en '{}'", palabra, sinonimo, nombre_producto)
                         return True
         
         # Análisis de similitud fonética/ortográfica
@@ -304,46 +286,53 @@ class SistemaLCLNSimplificado:
 
     def buscar_productos(self, consulta: str, limite: int = 10) -> List[Dict]:
         """Búsqueda de productos usando análisis semántico"""
-        print(f"[BÚSQUEDA] Iniciando búsqueda para: '{consulta}' (límite: {limite})")
-        self._cargar_cache_productos()
+        trazar('BÚSQUEDA', "Iniciando búsqueda para: '{}' (límite: {})", consulta, limite)
+        catalogo = self._cargar_cache_productos()
         
-        print(f"[BÚSQUEDA] Cache tiene {len(self._cache_productos)} productos")
+        trazar('BÚSQUEDA', "Cache tiene {} productos", len(catalogo.por_id))
         
         # Análisis semántico
         analisis = self.analizar_consulta(consulta)
-        print(f"[ANÁLISIS] Resultado: {analisis}")
+        trazar('ANÁLISIS', "Resultado: {}", analisis)
+        rastreando = trazando()
         
         productos_encontrados = []
         consulta_lower = consulta.lower()
         
         # Buscar en productos y sinónimos
-        for producto_id, producto in self._cache_productos.items():
+        for producto_id, producto in catalogo.por_id.items():
             score = 0
             nombre_producto = producto['nombre'].lower()
             
             # 1. Coincidencia exacta en nombre
             if consulta_lower in nombre_producto:
                 score += 100
-                print(f"[MATCH] ✅ Coincidencia exacta en '{producto['nombre']}' - Score: {score}")
+                if rastreando:
+                    trazar('MATCH', "✅ Coincidencia exacta en '{}' - Score: {}", producto['nombre'], score)
             
             # 2. Coincidencia parcial inteligente (NUEVA FUNCIONALIDAD)
             elif self._coincidencia_inteligente(consulta_lower, nombre_producto):
                 score += 80
-                print(f"[MATCH] 🧠 Coincidencia inteligente en '{producto['nombre']}' - Score: {score}")
+                if rastreando:
+                    trazar('MATCH', "🧠 Coincidencia inteligente en '{}' - Score: {}", producto['nombre'], score)
                 
             # 3. Coincidencia en sinónimos
-            if producto_id in self._cache_sinonimos:
-                for sinonimo in self._cache_sinonimos[producto_id]:
+            if producto_id in catalogo.sinonimos:
+                for sinonimo in catalogo.sinonimos[producto_id]:
                     if consulta_lower in sinonimo.lower():
                         score += 75
-                        print(f"[MATCH] ✅ Coincidencia en sinónimo '{sinonimo}' para '{producto['nombre']}' - Score: {score}")
+                        if rastreando:
+                            trazar('MATCH', "✅ Coincidencia en sinónimo '{}' para '{}' - Score: {}",
+                                   sinonimo, producto['nombre'], score)
                         
             # 4. Coincidencia por categoría detectada
             if analisis['categoria_detectada']:
                 categoria_producto = producto.get('categoria_nombre', '').lower()
                 if analisis['categoria_detectada'] in categoria_producto:
                     score += 30
-                    print(f"[MATCH] ✅ Coincidencia de categoría '{analisis['categoria_detectada']}' en '{producto['nombre']}' - Score: {score}")
+                    if rastreando:
+                        trazar('MATCH', "✅ Coincidencia de categoría '{}' en '{}' - Score: {}",
+                               analisis['categoria_detectada'], producto['nombre'], score)
                     
             if score > 0:
                 producto_resultado = producto.copy()
@@ -351,55 +340,27 @@ class SistemaLCLNSimplificado:
                 producto_resultado['analisis'] = analisis
                 productos_encontrados.append(producto_resultado)
                 
-        print(f"[BÚSQUEDA] Encontrados {len(productos_encontrados)} productos con score > 0")
+        trazar('BÚSQUEDA', "Encontrados {} productos con score > 0", len(productos_encontrados))
         
         # Ordenar por score y limitar resultados
         productos_encontrados.sort(key=lambda x: x['score'], reverse=True)
         resultado_final = productos_encontrados[:limite]
         
-        print(f"[BÚSQUEDA] Devolviendo {len(resultado_final)} productos finales")
+        trazar('BÚSQUEDA', "Devolviendo {} productos finales", len(resultado_final))
         return resultado_final
 
-    def obtener_sugerencias(self, consulta_parcial: str) -> List[str]:
-        """Obtener sugerencias de autocompletado"""
-        self._cargar_cache_productos()
-        
-        sugerencias = set()
-        consulta_lower = consulta_parcial.lower()
-        
-        # Sugerencias desde nombres de productos
-        for producto in self._cache_productos.values():
-            nombre = producto['nombre'].lower()
-            if consulta_lower in nombre:
-                sugerencias.add(producto['nombre'])
-                
-        # Sugerencias desde sinónimos
-        for sinonimos_lista in self._cache_sinonimos.values():
-            for sinonimo in sinonimos_lista:
-                if consulta_lower in sinonimo.lower():
-                    sugerencias.add(sinonimo)
-                    
-        return sorted(list(sugerencias))[:10]
+    def obtener_sugerencias(self, consulta_parcial: str, limite: int = 10) -> List[str]:
+        """
+        Sugerencias de autocompletado: nombres, categorías y sinónimos con
+        una palabra que empieza con lo escrito, de los más vendidos a los
+        menos (ver indice_sugerencias)
+        """
+        sugerencias = sugerencias_catalogo(self.almacen).sugerir(consulta_parcial, limite)
+        return [sugerencia['texto'] for sugerencia in sugerencias]
 
     def registrar_busqueda(self, consulta: str, productos_encontrados: int):
-        """Registrar métricas de búsqueda"""
-        conexion = self._conectar_bd()
-        if not conexion:
-            return
-            
-        try:
-            cursor = conexion.cursor()
-            cursor.execute("""
-                INSERT INTO busqueda_metricas (consulta, productos_encontrados, timestamp)
-                VALUES (%s, %s, %s)
-            """, (consulta, productos_encontrados, datetime.now()))
-            conexion.commit()
-        except mysql.connector.Error as e:
-            print(f"Error registrando búsqueda: {e}")
-        finally:
-            if conexion.is_connected():
-                cursor.close()
-                conexion.close()
+        """Registrar métricas de búsqueda (se escriben por lotes en segundo plano)"""
+        escritor_metricas(self.mysql_config).registrar(consulta, productos_encontrados)
 
 # Función de utilidad para uso directo
 def buscar_productos_lcln(consulta: str, limite: int = 10) -> Dict:
@@ -0,0 +1,142 @@
+# tamano_memoria.py
+"""
+Tamaño aproximado en memoria de las estructuras del catálogo y los caches.
+
+``sys.getsizeof`` solo mide el contenedor, no lo que contiene. Recorrer en
+profundidad un catálogo de cientos de miles de productos en cada consulta a
+``/cache-stats`` costaría segundos, así que:
+
+- ``tamano_profundo`` recorre un objeto completo (para estructuras chicas o
+  para cada elemento de una muestra), contando una sola vez los objetos
+  compartidos;
+- ``tamano_muestreado`` mide el contenedor con ``getsizeof`` y estima sus
+  elementos midiendo a fondo una muestra repartida a lo largo del contenedor
+  y multiplicando por el total;
+- con ``profundidad_valores=False`` los valores de un diccionario o los
+  elementos de una lista cuentan solo como referencias: sirve para los
+  índices que apuntan a registros ya contados en otra estructura.
+
+Los resultados son estimaciones para dimensionar contenedores, no una
+contabilidad exacta del allocador.
+"""
+import gc
+import sys
+from itertools import islice
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Optional, Set
+
+_ATOMICOS = (str, bytes, int, float, bool, type(None))
+_CONTENEDORES = (dict, list, tuple, set, frozenset)
+
+
+def _contenedor(objeto: Any) -> Any:
+    """El diccionario detrás de un ``mappingproxy``"""
+    if isinstance(objeto, MappingProxyType):
+        referidos = gc.get_referents(objeto)
+        if referidos:
+            return referidos[0]
+    return objeto
+
+
+def tamano_profundo(objeto: Any, vistos: Optional[Set[int]] = None) -> int:
+    """Bytes de ``objeto`` y de todo lo que contiene (cada objeto una vez)"""
+    vistos = set() if vistos is None else vistos
+    total = 0
+    pendientes = [_contenedor(objeto)]
+    while pendientes:
+        actual = pendientes.pop()
+        if id(actual) in vistos:
+            continue
+        vistos.add(id(actual))
+        total += sys.getsizeof(actual)
+        if isinstance(actual, _ATOMICOS):
+            continue
+        if isinstance(actual, dict):
+            pendientes.extend(actual.keys())
+            pendientes.extend(actual.values())
+        elif isinstance(actual, (list, tuple, set, frozenset)):
+            pendientes.extend(actual)
+        elif isinstance(actual, MappingProxyType):
+            pendientes.append(_contenedor(actual))
+    return total
+
+
+def _muestra(elementos: Iterable, total: int, tamano_muestra: int):
+    paso = max(1, total // tamano_muestra)
+    return list(islice(elementos, 0, None, paso))[:tamano_muestra]
+
+
+def _items(contenedor: Any, limite: int):
+    if isinstance(contenedor, dict):
+        return islice(contenedor.items(), limite)
+    return islice(contenedor, limite)
+
+
+def tamano_muestreado(objeto: Any, tamano_muestra: int = 256, profundidad_valores: bool = True,
+                      items_por_elemento: int = 64) -> int:
+    """
+    Bytes estimados de un diccionario, lista o conjunto grande. El
+    contenedor, sus claves y sus elementos directos se miden todos (con
+    ``getsizeof``, sin recorrerlos); lo que hay dentro de cada elemento se
+    estima con una muestra de elementos, midiendo a fondo hasta
+    ``items_por_elemento`` de sus ítems y contando una sola vez los objetos
+    compartidos entre la muestra. Los objetos que se repiten en muchos
+    elementos (precios, slots) se cuentan en cada uno fuera de la muestra:
+    la estimación tiende a quedar por encima de la exacta
+    """
+    contenedor = _contenedor(objeto)
+    total = len(contenedor)
+    medido = sys.getsizeof(contenedor)
+    if not total:
+        return medido
+
+    elementos = contenedor.values() if isinstance(contenedor, dict) else contenedor
+    if isinstance(contenedor, dict):
+        medido += sum(map(sys.getsizeof, contenedor))
+    if not profundidad_valores:
+        return medido
+
+    medido += sum(map(sys.getsizeof, elementos))
+    muestra = [elemento for elemento in _muestra(iter(elementos), total, tamano_muestra)
+               if isinstance(elemento, _CONTENEDORES)]
+    if not muestra:
+        # Elementos atómicos (precios, slots, máscaras): ya están medidos
+        return medido
+    if len(muestra) == min(total, tamano_muestra):
+        internos = sum(map(len, elementos))
+    else:
+        internos = sum(len(elemento) for elemento in elementos if isinstance(elemento, _CONTENEDORES))
+
+    vistos: Set[int] = set()
+    bytes_muestra = items_muestra = 0
+    for elemento in muestra:
+        vistos.add(id(elemento))
+        for item in _items(elemento, items_por_elemento):
+            bytes_muestra += tamano_profundo(item, vistos)
+            items_muestra += 1
+    if not items_muestra:
+        return medido
+    return medido + int(bytes_muestra / items_muestra * internos)
+
+
+def memoria_proceso() -> Dict[str, Optional[int]]:
+    """RSS actual y máximo del proceso en bytes (None si no se puede leer)"""
+    actual = maximo = None
+    try:
+        with open('/proc/self/status') as estado:
+            for linea in estado:
+                if linea.startswith('VmRSS:'):
+                    actual = int(linea.split()[1]) * 1024
+                elif linea.startswith('VmHWM:'):
+                    maximo = int(linea.split()[1]) * 1024
+    except OSError:
+        pass
+    if maximo is None:
+        try:
+            import resource
+            uso = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Linux lo reporta en KiB y macOS en bytes
+            maximo = uso if sys.platform == 'darwin' else uso * 1024
+        except (ImportError, OSError):
+            pass
+    return {'rss_bytes': actual, 'rss_maximo_bytes': maximo}
@@ -0,0 +1,86 @@
+import pytest
+
+
+class CursorFalso:
+    """Responde las consultas de almacen_catalogo sobre tablas en memoria"""
+
+    def __init__(self, base):
+        self.base = base
+        self._filas = []
+
+    def execute(self, sql, parametros=()):
+        base = self.base
+        base.consultas.append(sql)
+        if 'MAX(id_log)' in sql:
+            self._filas = [{'marca': max((id_log for id_log, _ in base.inventorylog), default=0)}]
+        elif 'FROM inventorylog' in sql:
+            desde, hasta = parametros
+            ids = {id_producto for id_log, id_producto in base.inventorylog if desde < id_log <= hasta}
+            self._filas = [{'id_producto': id_producto} for id_producto in sorted(ids)]
+        elif 'MAX(id_producto)' in sql:
+            self._filas = [{'max_id': max(base.productos, default=0)}]
+        elif 'COUNT(*)' in sql:
+            self._filas = [{'total': len(base.productos)}]
+        elif 'producto_sinonimos' in sql:
+            self._filas = []
+        elif 'WHERE' in sql:
+            max_id, *tocados = parametros
+            self._filas = [dict(fila) for id_producto, fila in base.productos.items()
+                           if id_producto > max_id or id_producto in tocados]
+        else:
+            self._filas = [dict(fila) for fila in sorted(base.productos.values(), key=lambda fila: fila['nombre'])]
+
+    def fetchone(self):
+        return self._filas[0]
+
+    def fetchall(self):
+        return self._filas
+
+    def close(self):
+        pass
+
+
+class ConexionFalsa:
+    def __init__(self, base):
+        self.base = base
+
+    def cursor(self, dictionary=False):
+        return CursorFalso(self.base)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        return False
+
+
+class BaseDatosFalsa:
+    """Tablas productos e inventorylog mínimas para el catálogo"""
+
+    def __init__(self):
+        self.productos = {}
+        self.inventorylog = []
+        self.consultas = []
+
+    def producto(self, id_producto, nombre, precio, cantidad=10, categoria='Bebidas'):
+        self.productos[id_producto] = {
+            'id_producto': id_producto, 'nombre': nombre, 'precio': precio, 'cantidad': cantidad,
+            'imagen': None, 'id_categoria': 1, 'categoria_nombre': categoria
+        }
+
+    def movimiento(self, id_producto):
+        self.inventorylog.append((len(self.inventorylog) + 1, id_producto))
+
+    def conectar(self):
+        return ConexionFalsa(self)
+
+
+@pytest.fixture
+def base_datos():
+    base = BaseDatosFalsa()
+    base.producto(1, 'Coca Cola 600ml', 18.0)
+    base.producto(2, 'Pepsi 600ml', 16.0)
+    base.producto(3, 'Agua Mineral 1l', 12.0)
+    base.movimiento(1)
+    base.movimiento(2)
+    return base
@@ -0,0 +1,48 @@
+from almacen_catalogo import AlmacenCatalogo
+
+
+def almacen_cargado(base_datos):
+    almacen = AlmacenCatalogo({})
+    almacen._conectar = base_datos.conectar
+    assert almacen.refrescar()
+    return almacen
+
+
+def ids_con(indice, texto):
+    return sorted(indice.productos[slot]['id'] for _, slot in indice.por_texto(texto))
+
+
+def test_delta_aplica_cambio_alta_y_baja_sin_tocar_la_anterior(base_datos):
+    almacen = almacen_cargado(base_datos)
+    anterior = almacen.instantanea
+
+    base_datos.producto(1, 'Coca Cola Zero 600ml', 19.0)
+    base_datos.movimiento(1)
+    base_datos.producto(4, 'Sprite 600ml', 17.0)
+    del base_datos.productos[2]
+    base_datos.movimiento(2)
+
+    nueva = almacen._aplicar_cambios()
+
+    assert nueva is not None and nueva.version == anterior.version + 1
+    assert sorted(nueva.por_id) == [1, 3, 4]
+    assert sorted(nueva.por_nombre) == ['agua mineral 1l', 'coca cola zero 600ml', 'sprite 600ml']
+    assert ids_con(nueva.indice, 'zero') == [1]
+    assert ids_con(nueva.indice, 'sprite') == [4]
+    assert ids_con(nueva.indice, 'pepsi') == []
+    assert nueva.indice.producto(2) is None and nueva.indice.producto(1)['precio'] == 19.0
+
+    # La instantánea publicada antes sigue intacta para quien la esté usando
+    assert sorted(anterior.por_id) == [1, 2, 3]
+    assert sorted(anterior.por_nombre) == ['agua mineral 1l', 'coca cola 600ml', 'pepsi 600ml']
+    assert anterior.por_id[1]['nombre'] == 'Coca Cola 600ml'
+    assert ids_con(anterior.indice, 'pepsi') == [2]
+    assert ids_con(anterior.indice, 'zero') == []
+    assert anterior.indice.producto(4) is None
+
+
+def test_delta_sin_movimientos_conserva_la_instantanea(base_datos):
+    almacen = almacen_cargado(base_datos)
+    anterior = almacen.instantanea
+
+    assert almacen._aplicar_cambios() is anterior
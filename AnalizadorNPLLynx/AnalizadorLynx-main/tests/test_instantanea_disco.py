@@ -0,0 +1,62 @@
+from array import array
+
+from almacen_catalogo import AlmacenCatalogo
+from instantanea_disco import escribir_instantanea, leer_instantanea
+
+
+def almacen_con(base_datos, ruta):
+    almacen = AlmacenCatalogo({}, archivo_instantanea=str(ruta))
+    almacen._conectar = base_datos.conectar
+    return almacen
+
+
+def test_ida_y_vuelta_conserva_datos_y_secciones(tmp_path):
+    ruta = tmp_path / 'catalogo.bin'
+    datos = {'version': 3, 'categorias': {'bebidas': {'id': 1, 'nombre': 'Bebidas'}}, 'marca_inventario': 7}
+    secciones = {'ids': array('q', [1, 2, 3]), 'precios': array('d', [18.0, 16.5]), 'vacia': array('i')}
+
+    escritos = escribir_instantanea(str(ruta), datos, secciones)
+
+    assert escritos == ruta.stat().st_size
+    leidos, vistas = leer_instantanea(str(ruta))
+    assert leidos == datos
+    assert {nombre: vista.tolist() for nombre, vista in vistas.items()} == \
+        {nombre: columna.tolist() for nombre, columna in secciones.items()}
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_archivo_inexistente_no_es_error(tmp_path):
+    assert leer_instantanea(str(tmp_path / 'no_existe.bin')) is None
+
+
+def test_byte_alterado_se_rechaza_y_se_carga_de_mysql(tmp_path, base_datos, capsys):
+    ruta = tmp_path / 'catalogo.bin'
+    assert almacen_con(base_datos, ruta).refrescar()
+    contenido = bytearray(ruta.read_bytes())
+    contenido[-1] ^= 0x01
+    ruta.write_bytes(bytes(contenido))
+    capsys.readouterr()
+
+    assert leer_instantanea(str(ruta)) is None
+    assert 'corrupto' in capsys.readouterr().out
+
+    # El proceso que arranca con la copia dañada ignora el archivo y lee la base
+    base_datos.consultas.clear()
+    almacen = almacen_con(base_datos, ruta)
+    assert almacen.refrescar()
+    assert not almacen.disco['cargada']
+    assert any('ORDER BY p.nombre' in consulta for consulta in base_datos.consultas)
+    assert sorted(almacen.instantanea.por_id) == [1, 2, 3]
+
+
+def test_marca_guardada_mayor_que_la_base_fuerza_recarga_completa(tmp_path, base_datos):
+    ruta = tmp_path / 'catalogo.bin'
+    assert almacen_con(base_datos, ruta).refrescar()
+
+    # La base se restauró con una bitácora más corta que la guardada en disco
+    base_datos.inventorylog = base_datos.inventorylog[:1]
+    almacen = almacen_con(base_datos, ruta)
+    assert almacen._cargar_disco()
+    assert almacen._marca_inventario == 2
+
+    assert almacen._aplicar_cambios() is None
@@ -0,0 +1,61 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'api'))
+
+import main_lcln_dynamic
+from almacen_catalogo import AlmacenCatalogo
+from sistema_lcln_mejorado_limpio import SistemaLCLNMejorado
+
+PRODUCTOS = [
+    {'id': 1, 'nombre': 'Coca Cola 600ml', 'precio': 18.0, 'cantidad': 10,
+     'imagen': 'default.jpg', 'id_categoria': 1, 'categoria_nombre': 'Bebidas'},
+    {'id': 2, 'nombre': 'Doritos Nacho 62g', 'precio': 20.0, 'cantidad': 10,
+     'imagen': 'default.jpg', 'id_categoria': 2, 'categoria_nombre': 'Snacks'},
+]
+
+
+# Catálogo fijo en memoria: el análisis no debe tocar MySQL
+@pytest.fixture
+def cliente(monkeypatch):
+    almacen = AlmacenCatalogo()
+    almacen.publicar_registros(sorted(PRODUCTOS, key=lambda producto: producto['nombre']))
+    monkeypatch.setattr(almacen, 'asegurar', lambda: None)
+    monkeypatch.setattr(main_lcln_dynamic, 'sistema_lcln_completo', SistemaLCLNMejorado(almacen))
+    return TestClient(main_lcln_dynamic.app)
+
+
+def test_lote_en_flujo_analiza_cada_consulta(cliente):
+    respuesta = cliente.post('/api/nlp/batch/stream', json={'queries': ['coca cola', 'doritos']})
+
+    assert respuesta.status_code == 200
+    lineas = [json.loads(linea) for linea in respuesta.text.splitlines() if linea]
+    resultados = sorted(lineas[:-1], key=lambda linea: linea['index'])
+
+    assert [resultado['query'] for resultado in resultados] == ['coca cola', 'doritos']
+    assert all(resultado['success'] for resultado in resultados), resultados
+    assert lineas[-1]['summary'] and lineas[-1]['successful_queries'] == 2
+
+
+def test_analisis_reporta_tiempo_de_proceso(cliente):
+    respuesta = cliente.post('/api/nlp/analyze', json={'query': 'coca cola'})
+
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+    assert datos['success'] and datos['processing_time_ms'] >= 0
+    assert datos['metadata']['products_found'] == len(datos['recommendations'])
+
+
+def test_analisis_formal_devuelve_las_cinco_fases(cliente):
+    respuesta = cliente.post('/api/nlp/analyze-formal', json={'query': 'doritos'})
+
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+    assert datos['success'] and datos['processing_time_ms'] >= 0
+    assert all(datos[f'fase_{n}_' + fase] is not None for n, fase in
+               [(1, 'correccion'), (2, 'expansion_sinonimos'), (3, 'tokenizacion'),
+                (4, 'interpretacion'), (5, 'motor_recomendaciones')])
@@ -0,0 +1,153 @@
+import threading
+import time
+
+import pytest
+
+from pool_conexiones import PoolAgotado, PoolConexiones
+
+
+class ConexionFalsa:
+    def __init__(self, numero, responde=True):
+        self.numero = numero
+        self.responde = responde
+        self.cerrada = False
+
+    def ping(self, reconnect=False):
+        if not self.responde:
+            raise OSError('conexión perdida')
+
+    def close(self):
+        self.cerrada = True
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def fabrica():
+    creadas = []
+
+    def crear():
+        conexion = ConexionFalsa(len(creadas) + 1)
+        creadas.append(conexion)
+        return conexion
+    return crear, creadas
+
+
+def esperar_hasta(condicion, segundos=2.0):
+    limite = time.monotonic() + segundos
+    while not condicion():
+        assert time.monotonic() < limite, 'la condición no se cumplió a tiempo'
+        time.sleep(0.001)
+
+
+def en_hilo(funcion):
+    hilo = threading.Thread(target=funcion, daemon=True)
+    hilo.start()
+    return hilo
+
+
+def test_pool_agotado_sin_conexiones_libres():
+    crear, creadas = fabrica()
+    pool = PoolConexiones('prueba', crear, max_conexiones=1, reloj=Reloj())
+
+    prestada = pool.obtener()
+    with pytest.raises(PoolAgotado):
+        pool.obtener(timeout=0)
+
+    assert pool.timeouts == 1 and not pool._esperando
+    prestada.close()
+    # Devuelta, la misma conexión se reutiliza
+    assert pool.obtener(timeout=0).numero == 1 and len(creadas) == 1
+
+
+def test_conexion_devuelta_va_al_primero_en_la_fila():
+    crear, creadas = fabrica()
+    pool = PoolConexiones('prueba', crear, max_conexiones=1, reloj=Reloj())
+    prestada = pool.obtener()
+    turnos = []
+
+    def esperar(nombre):
+        def tomar():
+            conexion = pool.obtener()
+            turnos.append((nombre, conexion.numero))
+            conexion.close()
+        return tomar
+
+    # Las esperas entran a la fila en orden: primero A, luego B
+    hilos = [en_hilo(esperar('A'))]
+    esperar_hasta(lambda: len(pool._esperando) == 1)
+    hilos.append(en_hilo(esperar('B')))
+    esperar_hasta(lambda: len(pool._esperando) == 2)
+
+    prestada.close()
+    for hilo in hilos:
+        hilo.join(2)
+
+    assert turnos == [('A', 1), ('B', 1)]
+    assert len(creadas) == 1 and pool.en_uso == 0
+
+
+def test_fallo_al_crear_cede_el_cupo_a_quien_espera():
+    creadas = []
+    conectando = threading.Event()
+    fallar = threading.Event()
+
+    def crear():
+        if not creadas:
+            creadas.append(None)
+            conectando.set()
+            fallar.wait(2)
+            raise ConnectionError('MySQL no responde')
+        conexion = ConexionFalsa(len(creadas))
+        creadas.append(conexion)
+        return conexion
+
+    pool = PoolConexiones('prueba', crear, max_conexiones=1, reloj=Reloj())
+    errores, obtenidas = [], []
+
+    def primero():
+        try:
+            pool.obtener()
+        except ConnectionError as error:
+            errores.append(error)
+
+    hilos = [en_hilo(primero)]
+    conectando.wait(2)
+    # El único cupo está tomado por la conexión en curso: el segundo espera
+    hilos.append(en_hilo(lambda: obtenidas.append(pool.obtener())))
+    esperar_hasta(lambda: len(pool._esperando) == 1)
+
+    fallar.set()
+    for hilo in hilos:
+        hilo.join(2)
+
+    assert len(errores) == 1
+    assert [conexion.numero for conexion in obtenidas] == [1]
+    assert pool.estadisticas()['abiertas'] == 1 and pool.en_uso == 1
+
+
+def test_conexion_inactiva_sin_ping_se_descarta():
+    crear, creadas = fabrica()
+    reloj = Reloj()
+    pool = PoolConexiones('prueba', crear, max_conexiones=2, verificar_tras_segundos=30, reloj=reloj)
+    pool.obtener().close()
+
+    # Reciente: se reutiliza sin verificar
+    reloj.ahora = 10
+    creadas[0].responde = False
+    conexion = pool.obtener()
+    assert conexion.numero == 1
+    conexion.close()
+
+    # Tras el umbral se verifica, no responde y se reemplaza por una nueva
+    reloj.ahora = 50
+    conexion = pool.obtener()
+
+    assert conexion.numero == 2
+    assert creadas[0].cerrada and not creadas[1].cerrada
+    assert pool.descartadas == 1 and pool.estadisticas()['abiertas'] == 1
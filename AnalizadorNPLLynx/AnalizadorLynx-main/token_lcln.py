@@ -0,0 +1,123 @@
+# token_lcln.py
+"""
+Token compacto que recorre todo el pipeline LCLN.
+
+Un token guarda el tipo (cadena internada, así que todos los tokens del mismo
+tipo comparten el mismo objeto) y el intervalo ``[inicio, fin)`` sobre el
+texto analizado, en lugar de copiar el lexema. El valor se obtiene del texto
+solo cuando alguien lo pide, salvo que una fase lo reemplace (por ejemplo,
+el interpretador al mapear una palabra a su categoría).
+
+Los campos semánticos que solo algunos tokens llevan (interpretacion,
+valor_original, confianza...) viven en ``extras``, un diccionario que se crea
+la primera vez que se anota algo. Para no romper el código existente, el
+token también acepta el acceso estilo diccionario (``token['tipo']``); la
+conversión a ``dict`` se hace únicamente al serializar la respuesta.
+"""
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+# Claves del antiguo token-diccionario que se calculan a partir del intervalo
+_CLAVES_BASE = ('tipo', 'valor', 'posicion_inicial', 'posicion_final', 'longitud')
+
+
+class Token:
+    """Token léxico con tipo internado e intervalo sobre el texto original"""
+
+    __slots__ = ('tipo', 'texto', 'inicio', 'fin', '_valor', 'extras')
+
+    def __init__(self, tipo: str, texto: str, inicio: int, fin: int,
+                 valor: Optional[str] = None, **extras):
+        self.tipo = sys.intern(tipo)
+        self.texto = texto
+        self.inicio = inicio
+        self.fin = fin
+        self._valor = valor
+        self.extras: Optional[Dict[str, Any]] = extras or None
+
+    @property
+    def valor(self) -> str:
+        """Lexema reconocido, o el valor que una fase posterior le asignó"""
+        if self._valor is not None:
+            return self._valor
+        return self.texto[self.inicio:self.fin]
+
+    @valor.setter
+    def valor(self, valor: str):
+        self._valor = valor
+
+    @property
+    def posicion_inicial(self) -> int:
+        return self.inicio
+
+    @property
+    def posicion_final(self) -> int:
+        return self.fin
+
+    @property
+    def longitud(self) -> int:
+        if self._valor is not None:
+            return len(self._valor)
+        return self.fin - self.inicio
+
+    # --- Compatibilidad con el token-diccionario ---------------------------
+
+    def __getitem__(self, clave: str):
+        if clave in _CLAVES_BASE:
+            return getattr(self, clave)
+        if self.extras is not None and clave in self.extras:
+            return self.extras[clave]
+        raise KeyError(clave)
+
+    def __setitem__(self, clave: str, valor):
+        if clave == 'tipo':
+            self.tipo = sys.intern(valor)
+        elif clave == 'valor':
+            self._valor = valor
+        elif clave == 'posicion_inicial':
+            self.inicio = valor
+        elif clave == 'posicion_final':
+            self.fin = valor
+        elif clave == 'longitud':
+            raise KeyError("'longitud' se calcula a partir del intervalo del token")
+        else:
+            if self.extras is None:
+                self.extras = {}
+            self.extras[clave] = valor
+
+    def __contains__(self, clave: str) -> bool:
+        return clave in _CLAVES_BASE or (self.extras is not None and clave in self.extras)
+
+    def get(self, clave: str, defecto=None):
+        """Igual que ``dict.get``"""
+        try:
+            return self[clave]
+        except KeyError:
+            return defecto
+
+    def keys(self) -> List[str]:
+        """Claves equivalentes del token-diccionario (permite ``dict(token)``)"""
+        if self.extras:
+            return list(_CLAVES_BASE) + list(self.extras)
+        return list(_CLAVES_BASE)
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Convierte el token al formato JSON de la API"""
+        resultado = {
+            'tipo': self.tipo,
+            'valor': self.valor,
+            'posicion_inicial': self.inicio,
+            'posicion_final': self.fin,
+            'longitud': self.longitud
+        }
+        if self.extras:
+            resultado.update(self.extras)
+        return resultado
+
+    def __repr__(self):
+        return f"Token({self.tipo!r}, {self.valor!r}, {self.inicio}, {self.fin})"
+
+
+def tokens_a_dicts(tokens: Iterable) -> List[Dict[str, Any]]:
+    """Convierte una lista de tokens al formato JSON; deja intactos los que ya son dict"""
+    return [token.a_dict() if isinstance(token, Token) else token for token in tokens]
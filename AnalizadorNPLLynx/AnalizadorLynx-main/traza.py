@@ -0,0 +1,101 @@
+# traza.py
+"""
+Traza de depuración del pipeline LCLN sin costo cuando está apagada.
+
+Las búsquedas imprimían una línea por producto o candidato revisado; bajo
+carga, formatear esas cadenas y escribirlas en stdout consumía más CPU que
+la búsqueda misma. Los registros de traza:
+
+- se guardan como (categoría, formato, argumentos) y el texto se arma solo
+  al mostrarlos; con la traza apagada no se formatea nada;
+- en los ciclos se consulta ``trazando()`` una vez antes de entrar y cada
+  registro queda detrás de ``if``, de modo que apagada la traza no hay
+  llamadas ni tuplas de argumentos por iteración;
+- ``LCLN_TRAZA=1`` imprime todos los registros del proceso en stdout, como
+  los ``print`` de antes;
+- ``capturar_traza()`` junta los registros de una sola búsqueda (variable de
+  contexto, no afecta a las demás peticiones) para devolverlos en la
+  respuesta. Las variables de contexto no pasan solas a los hilos de un
+  ``ThreadPoolExecutor``: la captura se abre dentro del hilo que busca.
+"""
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Registros de una petición a lo sumo; los siguientes solo se cuentan
+MAX_REGISTROS = int(os.getenv('LCLN_TRAZA_MAX', 2000))
+
+_salida_global = os.getenv('LCLN_TRAZA', '').lower() in ('1', 'true', 'si', 'on')
+
+
+def _formatear(formato: str, argumentos: Tuple) -> str:
+    try:
+        return formato.format(*argumentos) if argumentos else formato
+    except (IndexError, KeyError, ValueError) as e:
+        return f"{formato} {argumentos!r} (formato inválido: {e})"
+
+
+class RegistroTraza:
+    """Registros de una petición, formateados al leerlos"""
+
+    def __init__(self, max_registros: int = MAX_REGISTROS):
+        self.max_registros = max_registros
+        self.descartados = 0
+        self._inicio = time.perf_counter()
+        # (segundos desde el inicio, categoría, formato, argumentos)
+        self._registros: List[Tuple[float, str, str, Tuple]] = []
+
+    def agregar(self, categoria: str, formato: str, argumentos: Tuple):
+        if len(self._registros) >= self.max_registros:
+            self.descartados += 1
+            return
+        self._registros.append((time.perf_counter() - self._inicio, categoria, formato, argumentos))
+
+    def registros(self) -> List[Dict[str, Any]]:
+        """Registros como diccionarios serializables"""
+        resultado = [{'ms': round(segundos * 1000, 3), 'categoria': categoria,
+                      'mensaje': _formatear(formato, argumentos)}
+                     for segundos, categoria, formato, argumentos in self._registros]
+        if self.descartados:
+            resultado.append({'ms': None, 'categoria': 'TRAZA',
+                              'mensaje': f"{self.descartados} registros descartados (máximo {self.max_registros})"})
+        return resultado
+
+
+_registro_peticion: ContextVar[Optional[RegistroTraza]] = ContextVar('lcln_traza', default=None)
+
+
+def trazando() -> bool:
+    """True si algún registro de traza se va a mostrar o guardar"""
+    return _salida_global or _registro_peticion.get() is not None
+
+
+def trazar(categoria: str, formato: str, *argumentos):
+    """
+    Registra un evento; ``formato`` usa la sintaxis de ``str.format`` y se
+    aplica a ``argumentos`` solo si el registro se muestra
+    """
+    registro = _registro_peticion.get()
+    if registro is not None:
+        registro.agregar(categoria, formato, argumentos)
+    if _salida_global:
+        print(f"[{categoria}] {_formatear(formato, argumentos)}")
+
+
+def configurar(salida_global: bool):
+    """Enciende o apaga la impresión de la traza en stdout para todo el proceso"""
+    global _salida_global
+    _salida_global = salida_global
+
+
+@contextmanager
+def capturar_traza(max_registros: int = MAX_REGISTROS) -> Iterator[RegistroTraza]:
+    """Junta los registros emitidos en este contexto (una petición)"""
+    registro = RegistroTraza(max_registros)
+    token = _registro_peticion.set(registro)
+    try:
+        yield registro
+    finally:
+        _registro_peticion.reset(token)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+"""
+Pool de conexiones PyMySQL para la API de recomendaciones.
+
+Cada llamada a /predict abría hasta dos conexiones nuevas (historial y
+productos populares). El pool reutiliza hasta ``max_size`` conexiones:
+entrega la libre usada más recientemente, abre una nueva si no se llegó al
+máximo o espera en fila hasta ``acquire_timeout`` segundos (``PoolTimeout``). Las
+conexiones inactivas más de ``ping_after`` segundos se verifican con
+``ping`` antes de entregarse. La conexión entregada es un envoltorio cuyo
+``close()`` la devuelve al pool.
+
+Las conexiones se abren con autocommit: una conexión reutilizada no debe
+conservar la instantánea de lectura de una transacción anterior.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger('recommender-api')
+
+
+class PoolTimeout(Exception):
+    """No se liberó ninguna conexión dentro del tiempo de adquisición"""
+
+
+class PooledConnection:
+    """Conexión prestada por el pool; ``close()`` la devuelve"""
+
+    def __init__(self, pool: 'ConnectionPool', connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name):
+        connection = self.__dict__.get('_connection')
+        if connection is None:
+            raise AttributeError(f"conexión ya devuelta al pool ({name})")
+        return getattr(connection, name)
+
+    def close(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool._release(connection)
+
+    def discard(self):
+        """Cierra la conexión de verdad (p. ej. después de un error de red)"""
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool._release(connection, discard=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
+
+
+class ConnectionPool:
+    """Conexiones reutilizables con tamaño máximo y espera acotada"""
+
+    def __init__(self, connect: Callable[[], Any], max_size: int = 5, acquire_timeout: float = 5.0,
+                 ping_after: float = 30.0):
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.ping_after = ping_after
+        self._connect = connect
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._open = 0
+        self._waiting = deque()
+
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.timeouts = 0
+        self.acquisitions = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        while True:
+            with self._cond:
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                elif self._open < self.max_size:
+                    self._open += 1
+                    connection, last_used = None, None
+                else:
+                    # En fila: las conexiones devueltas se entregan al primero que espera
+                    request = []
+                    self._waiting.append(request)
+                    while not request:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._waiting.remove(request)
+                            self.timeouts += 1
+                            raise PoolTimeout(f"sin conexiones libres tras {timeout:.1f}s ({self.max_size} en uso)")
+                        self._cond.wait(remaining)
+                    connection, last_used = request[0]
+
+            # Conectar y verificar fuera del lock
+            if connection is None:
+                try:
+                    connection = self._connect()
+                except Exception:
+                    self._free_slot()
+                    raise
+                self.created += 1
+            elif time.monotonic() - last_used > self.ping_after and not self._alive(connection):
+                logger.warning("Conexión inactiva sin respuesta a ping, se descarta")
+                self._close(connection)
+                self._free_slot()
+                self.discarded += 1
+                continue
+            else:
+                self.reused += 1
+
+            waited = time.monotonic() - start
+            self.acquisitions += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            return PooledConnection(self, connection)
+
+    @staticmethod
+    def _alive(connection) -> bool:
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _free_slot(self):
+        with self._cond:
+            if self._waiting:
+                # El cupo pasa al primero en la fila, que abrirá una nueva
+                self._waiting.popleft().append((None, None))
+                self._cond.notify_all()
+            else:
+                self._open -= 1
+
+    def _release(self, connection, discard: bool = False):
+        if discard:
+            self._close(connection)
+            self.discarded += 1
+            self._free_slot()
+            return
+        with self._cond:
+            if self._waiting:
+                self._waiting.popleft().append((connection, time.monotonic()))
+                self._cond.notify_all()
+            else:
+                self._idle.append((connection, time.monotonic()))
+
+    def close_idle(self):
+        """Cierra las conexiones libres (al apagar el servicio)"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for connection, _ in idle:
+            self._close(connection)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_size': self.max_size,
+            'open': self._open,
+            'in_use': self._open - len(self._idle),
+            'idle': len(self._idle),
+            'created': self.created,
+            'reused': self.reused,
+            'discarded': self.discarded,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': round(self.wait_total / self.acquisitions * 1000, 3) if self.acquisitions else 0.0,
+            'max_wait_ms': round(self.wait_max * 1000, 3)
+        }
@@ -10,6 +10,8 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+from db_pool import ConnectionPool
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,6 +25,8 @@ DB_PORT = int(os.environ.get('MYSQLPORT', 3306))
 DB_USER = os.environ.get('MYSQLUSER', 'root')
 DB_PASSWORD = os.environ.get('MYSQLPASSWORD', '12345678')
 DB_NAME = os.environ.get('MYSQLDATABASE', 'lynxshop')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5.0))
 
 # Directorio del modelo
 MODEL_DIR = os.environ.get('MODEL_DIR', './data')
@@ -69,25 +73,33 @@ async def load_model():
         logger.error(f"Error al cargar el modelo: {str(e)}")
         model = None
 
+def _connect():
+    """Abre una conexión nueva con la base de datos MySQL"""
+    return pymysql.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        charset='utf8mb4',
+        cursorclass=pymysql.cursors.DictCursor,
+        autocommit=True
+    )
+
+# Pool de conexiones compartido por todas las peticiones
+db_pool = ConnectionPool(_connect, max_size=DB_POOL_SIZE, acquire_timeout=DB_POOL_TIMEOUT)
+
 def get_db_connection():
-    """Establece conexión con la base de datos MySQL"""
+    """Toma una conexión del pool (``close()`` la devuelve al pool)"""
     try:
-        connection = pymysql.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        return connection
+        return db_pool.acquire()
     except Exception as e:
         logger.error(f"Error al conectar a MySQL: {str(e)}")
         raise
 
 def get_user_history(user_id: int, limit: int = 20) -> List[int]:
     """Obtiene los últimos productos comprados por el usuario"""
+    connection = None
     try:
         connection = get_db_connection()
         with connection.cursor() as cursor:
@@ -108,6 +120,9 @@ def get_user_history(user_id: int, limit: int = 20) -> List[int]:
             return product_ids
     except Exception as e:
         logger.error(f"Error al obtener historial de usuario {user_id}: {str(e)}")
+        if connection:
+            # Tras un error la conexión puede haber quedado inservible: no vuelve al pool
+            connection.discard()
         return []
     finally:
         if connection:
@@ -115,6 +130,7 @@ def get_user_history(user_id: int, limit: int = 20) -> List[int]:
 
 def get_popular_products(limit: int = 10) -> List[Dict[str, Union[int, float]]]:
     """Obtiene los productos más populares (más vendidos)"""
+    connection = None
     try:
         connection = get_db_connection()
         with connection.cursor() as cursor:
@@ -137,6 +153,9 @@ def get_popular_products(limit: int = 10) -> List[Dict[str, Union[int, float]]]:
             return recommendations
     except Exception as e:
         logger.error(f"Error al obtener productos populares: {str(e)}")
+        if connection:
+            # Tras un error la conexión puede haber quedado inservible: no vuelve al pool
+            connection.discard()
         return []
     finally:
         if connection:
@@ -239,6 +258,16 @@ async def health_check():
     """Endpoint para verificar el estado del servicio"""
     return {"status": "ok", "model_loaded": model is not None}
 
+@app.get("/pool-stats")
+async def pool_stats():
+    """Métricas del pool de conexiones a MySQL"""
+    return db_pool.stats()
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    """Cierra las conexiones libres del pool al apagar el servicio"""
+    db_pool.close_idle()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file